@@ -4,6 +4,10 @@ Centralized configuration for all robot parameters.
 """
 
 import json
+import sys
+
+# MicroPython's json.dump takes no indent argument
+MICROPYTHON = sys.implementation.name == 'micropython'
 
 
 class RobotConfig:
@@ -16,7 +20,10 @@ class RobotConfig:
                 "pwm_pin": 0,
                 "dir_pin1": 1,
                 "dir_pin2": 2,
-                "pwm_freq": 1000
+                "pwm_freq": 1000,
+                "brake_reverse_pulse_ms": 0,
+                "brake_reverse_duty": 0.5,
+                "stopping_distances": []
             },
             "servo": {
                 "pin": 3,
@@ -24,7 +31,9 @@ class RobotConfig:
                 "min_u16_duty": 1802,
                 "max_u16_duty": 7864,
                 "center_steering": 91,
-                "max_steering_offset": 11
+                "max_steering_offset": 11,
+                "degrees_per_second": 300.0,
+                "settle_margin_ms": 10
             },
             "compass": {
                 "i2c_id": 1,
@@ -52,7 +61,8 @@ class RobotConfig:
             "camera": {
                 "uart_id": 1,
                 "baudrate": 50,
-                "rx_pin": 9
+                "rx_pin": 9,
+                "protocol": "ascii"
             }
         },
         "navigation": {
@@ -62,7 +72,41 @@ class RobotConfig:
             "default_stop_distance": 5,
             "wall_distance": 50,
             "sonar_multiplier": 0.25,
-            "compass_multiplier": 0.1
+            "compass_multiplier": 0.1,
+            "rotate_speed_min": 0.2,
+            "rotate_speed_max": 0.4,
+            "corner_speed_min": 0.22,
+            "corner_speed_max": 0.4,
+            "open_wall_distance": 30,
+            "open_front_stop_distance": 15,
+            "open_blind_distance": 200,
+            "predictive_front_stop": True,
+            "front_handoff_distance": 20,
+            "sonar_latency_ms": 15,
+            "direction_threshold": 4.6,
+            "direction_open_distance": 120,
+            "direction_timeout": 1.0
+        },
+        "telemetry": {
+            "enabled": False,
+            "capacity": 512,
+            "directory": "logs",
+            "max_file_bytes": 65536,
+            "max_files": 8,
+            "flush_threshold": 64,
+            "min_interval_ms": 10
+        },
+        "profiling": {
+            "enabled": False,
+            "capacity": 32
+        },
+        "localization": {
+            "enabled": False,
+            "particles": 48,
+            "sonar_sigma": 4.0,
+            "max_range": 200,
+            "inner_walls": [100, 100, 200, 200],
+            "start_heading": 0
         },
         "safety": {
             "max_speed_limit": 1.0,
@@ -142,17 +186,22 @@ class RobotConfig:
             print(f"Failed to load config from {filename}: {e}")
             
     def save_to_file(self, filename=None):
-        """Save configuration to JSON file."""
+        """Save configuration to JSON file. Returns True if it was written."""
         filename = filename or self.config_file
         if not filename:
             raise ValueError("No filename provided for saving config")
             
         try:
             with open(filename, 'w') as f:
-                json.dump(self.config, f, indent=4)
+                if MICROPYTHON:
+                    json.dump(self.config, f)
+                else:
+                    json.dump(self.config, f, indent=4)
             print(f"Configuration saved to {filename}")
+            return True
         except Exception as e:
             print(f"Failed to save config to {filename}: {e}")
+            return False
             
     def _merge_configs(self, base, override):
         """Recursively merge configuration dictionaries."""
@@ -174,6 +223,18 @@ class RobotConfig:
         """Get safety configuration."""
         return self.get("safety", {})
         
+    def get_telemetry_config(self):
+        """Get flight recorder configuration."""
+        return self.get("telemetry", {})
+        
+    def get_profiling_config(self):
+        """Get profiler configuration."""
+        return self.get("profiling", {})
+        
+    def get_localization_config(self):
+        """Get particle filter localization configuration."""
+        return self.get("localization", {})
+        
     def get_calibration_config(self):
         """Get calibration configuration."""
         return self.get("calibration", {})
@@ -245,6 +306,6 @@ def load_config(filename):
 
 
 def save_config(filename=None):
-    """Save configuration to file."""
+    """Save configuration to file. Returns True if it was written."""
     global robot_config
-    robot_config.save_to_file(filename)
+    return robot_config.save_to_file(filename)
@@ -0,0 +1,123 @@
+"""
+Direction Detector
+Sequential test deciding the driving direction from left/right sonar
+evidence, one sonar packet at a time, while the car is already moving.
+
+Evidence is a log-likelihood ratio: positive favours clockwise (inner walls
+on the right), negative anticlockwise. Each packet adds:
+- Opening: one side reads beyond open_distance while the other sees a wall.
+  No corridor is that wide, so the open side is where the inner wall ended,
+  i.e. the inside of the track.
+- Wall offset (optional, for the parking lot start): the nearer wall is the
+  outer one. Scaled by the left/right difference and capped, so a single
+  glitch cannot decide alone.
+
+The test stops as soon as the evidence crosses the threshold in either
+direction; later packets are ignored.
+"""
+
+import math
+
+
+class DirectionDetector:
+    """Sequential probability ratio test on left/right sonar readings."""
+
+    def __init__(self, threshold=4.6, open_distance=120, open_weight=2.0, offset_scale=10.0,
+                 offset_cap=1.0):
+        """
+        Initialize detector (call start() to begin collecting).
+
+        Args:
+            threshold: Log-likelihood ratio that decides (4.6 is about 99% confidence)
+            open_distance: Side reading in cm beyond which there is no wall
+            open_weight: Evidence of one packet with exactly one open side
+            offset_scale: Left/right difference in cm worth one unit of evidence
+            offset_cap: Largest wall offset evidence of one packet
+        """
+        self.threshold = threshold
+        self.open_distance = open_distance
+        self.open_weight = open_weight
+        self.offset_scale = offset_scale
+        self.offset_cap = offset_cap
+
+        self.active = False
+        self.wall_offset = False
+        self.llr = 0.0
+        self.samples = 0
+        self.decision = None
+
+    def start(self, wall_offset=False):
+        """
+        Clear the evidence and start collecting.
+
+        Args:
+            wall_offset: Also count the nearer wall as the outer one (use when
+                the start position is against the outer wall, not mid-corridor)
+        """
+        self.active = True
+        self.wall_offset = wall_offset
+        self.llr = 0.0
+        self.samples = 0
+        self.decision = None
+
+    def stop(self):
+        """Stop collecting (the evidence so far is kept)."""
+        self.active = False
+
+    def add(self, left, right):
+        """
+        Add one sonar packet.
+
+        Args:
+            left, right: Side readings in cm (0 = no reading)
+
+        Returns:
+            bool: True if clockwise, False if anticlockwise, None while undecided
+        """
+        if not self.active:
+            return self.decision
+        if left <= 0 or right <= 0:
+            return None
+
+        left_open = left > self.open_distance
+        right_open = right > self.open_distance
+        if right_open and not left_open:
+            self.llr += self.open_weight
+        elif left_open and not right_open:
+            self.llr -= self.open_weight
+        elif self.wall_offset and not left_open:
+            evidence = (right - left) / self.offset_scale
+            if evidence > self.offset_cap:
+                evidence = self.offset_cap
+            elif evidence < -self.offset_cap:
+                evidence = -self.offset_cap
+            self.llr += evidence
+        self.samples += 1
+
+        if self.llr >= self.threshold:
+            self.decision = True
+        elif self.llr <= -self.threshold:
+            self.decision = False
+        if self.decision is not None:
+            self.active = False
+        return self.decision
+
+    def leaning(self):
+        """
+        Get the decision, or the direction the evidence favours so far.
+
+        Returns:
+            bool: True if clockwise, False if anticlockwise, None without evidence
+        """
+        if self.decision is not None:
+            return self.decision
+        if self.llr > 0:
+            return True
+        if self.llr < 0:
+            return False
+        return None
+
+    @property
+    def confidence(self):
+        """Probability of the favoured direction (0.5 without evidence)."""
+        return 1.0 / (1.0 + math.exp(-abs(self.llr)))
@@ -0,0 +1,270 @@
+"""
+Flight Recorder
+Records one fixed-size binary record per control tick into a preallocated
+RAM ring and flushes it in large blocks to rotating files on flash.
+
+Flushes only happen between motion segments. If a segment outlasts the ring
+(capacity x min_interval_ms), its oldest records are overwritten and counted
+in records_dropped.
+
+File layout (little-endian):
+    header:  magic b'WFR1', uint16 record size, uint16 format length,
+             uint16 field-names length, format string, comma-separated field names
+    records: RECORD_FORMAT, back to back
+
+The header carries the format, so host tools can decode files written by
+older firmware without importing this module.
+"""
+
+import os
+import struct
+
+# Primitive ids stored in each record
+PRIMITIVE_NONE = 0
+PRIMITIVE_MOVE_DISTANCE = 1
+PRIMITIVE_MOVE_LANE = 2
+PRIMITIVE_ROTATE = 3
+PRIMITIVE_CORNER_TURN = 4
+
+PRIMITIVE_NAMES = {
+    PRIMITIVE_NONE: 'none',
+    PRIMITIVE_MOVE_DISTANCE: 'move_distance',
+    PRIMITIVE_MOVE_LANE: 'move_lane',
+    PRIMITIVE_ROTATE: 'rotate',
+    PRIMITIVE_CORNER_TURN: 'corner_turn'
+}
+
+# Flag bits
+FLAG_REVERSE = 0x01
+FLAG_BRAKING = 0x02
+FLAG_HEADING_VALID = 0x04
+
+MAGIC = b'WFR1'
+HEADER_FORMAT = '<4sHHH'
+
+# t_us, sonar left/rear/right/front (cm), heading (0.1 deg), encoder steps,
+# speed (signed, 1/10000 of full duty), servo target (0.1 deg), primitive, flags,
+# camera color byte (0 = none, 1 = red, 2 = green, 3 = unknown)
+RECORD_FORMAT = '<I4BhihhBBB'
+RECORD_SIZE = struct.calcsize(RECORD_FORMAT)
+FIELD_NAMES = ('t_us', 'left', 'rear', 'right', 'front', 'heading', 'encoder',
+               'speed', 'servo', 'primitive', 'flags', 'camera')
+
+
+class FlightRecorder:
+    """Preallocated ring of control-tick records with block flushes to flash."""
+
+    def __init__(self, enabled=False, capacity=512, directory='logs', max_file_bytes=65536,
+                 max_files=8, flush_threshold=64, min_interval_ms=10, clock=None):
+        """
+        Initialize flight recorder.
+
+        Args:
+            enabled: Record ticks (when False, record() returns immediately)
+            capacity: Records held in RAM; the oldest are overwritten when full
+            directory: Flash directory for log files
+            max_file_bytes: Start a new file once the current one is this large
+            max_files: Number of log files kept; older ones are deleted
+            flush_threshold: Minimum buffered records before a non-forced flush writes
+            min_interval_ms: Skip ticks closer than this to the previous record, so
+                fast loops do not overrun the ring before the next flush
+            clock: Clock service used for timestamps (default: shared hardware clock)
+        """
+        if clock is None:
+            from hal import get_default_clock
+            clock = get_default_clock()
+        self._clock = clock
+        self.enabled = enabled
+        self.capacity = capacity
+        self.directory = directory
+        self.max_file_bytes = max_file_bytes
+        self.max_files = max_files
+        self.flush_threshold = flush_threshold
+        self._min_interval_us = min_interval_ms * 1000
+        self._last_record_us = None
+
+        self._buffer = bytearray(capacity * RECORD_SIZE)
+        self._view = memoryview(self._buffer)
+        self._head = 0
+        self._count = 0
+
+        self._file_index = None
+        self._file_bytes = 0
+
+        # Statistics
+        self.records_written = 0
+        self.records_dropped = 0
+        self.flush_count = 0
+        self.last_flush_ms = 0
+
+    # === Recording ===
+
+    def record(self, left, rear, right, front, heading, encoder, speed, servo,
+               primitive=PRIMITIVE_NONE, flags=0, camera=0):
+        """
+        Append one control tick to the ring (no allocation).
+
+        Args:
+            left, rear, right, front: Sonar distances in cm (0-255)
+            heading: Compass heading in degrees (None if unknown)
+            encoder: Encoder position in steps
+            speed: Commanded speed, negative when reversing (-1.0 to 1.0)
+            servo: Commanded servo angle in degrees
+            primitive: PRIMITIVE_* id of the active motion primitive
+            flags: FLAG_* bits
+            camera: Latest camera color byte (0 if none)
+        """
+        if not self.enabled:
+            return
+
+        now_us = self._clock.monotonic_us()
+        if self._last_record_us is not None and now_us - self._last_record_us < self._min_interval_us:
+            return
+        self._last_record_us = now_us
+
+        if heading is None:
+            heading_ddeg = -1
+        else:
+            heading_ddeg = int(heading * 10)
+            flags |= FLAG_HEADING_VALID
+
+        struct.pack_into(RECORD_FORMAT, self._buffer, self._head * RECORD_SIZE,
+                         now_us & 0xFFFFFFFF,
+                         left & 0xFF, rear & 0xFF, right & 0xFF, front & 0xFF,
+                         heading_ddeg, encoder, int(speed * 10000), int(servo * 10),
+                         primitive, flags, camera)
+
+        self._head += 1
+        if self._head == self.capacity:
+            self._head = 0
+        if self._count == self.capacity:
+            self.records_dropped += 1
+        else:
+            self._count += 1
+
+    def get_buffered_count(self):
+        """Get number of records waiting to be flushed."""
+        return self._count
+
+    def clear(self):
+        """Discard buffered records."""
+        self._head = 0
+        self._count = 0
+
+    # === Flushing ===
+
+    def flush(self, force=False):
+        """
+        Write buffered records to flash.
+
+        Call between motion segments, not inside control loops: a flash write
+        can block for tens of milliseconds.
+
+        Args:
+            force: Write even if fewer than flush_threshold records are buffered
+
+        Returns:
+            int: Number of records written
+        """
+        if not self.enabled or self._count == 0:
+            return 0
+        if not force and self._count < self.flush_threshold:
+            return 0
+
+        start_ms = self._clock.ticks_ms()
+        count = self._count
+        start = self._head - count
+        if start < 0:
+            start += self.capacity
+
+        try:
+            if self._file_index is None or self._file_bytes >= self.max_file_bytes:
+                self._open_next_file()
+
+            with open(self._file_path(self._file_index), 'ab') as f:
+                end = start + count
+                if end <= self.capacity:
+                    f.write(self._view[start * RECORD_SIZE:end * RECORD_SIZE])
+                else:
+                    f.write(self._view[start * RECORD_SIZE:])
+                    f.write(self._view[:(end - self.capacity) * RECORD_SIZE])
+        except OSError as e:
+            print(f"Flight recorder flush failed: {e}")
+            return 0
+
+        self._count = 0
+        self._file_bytes += count * RECORD_SIZE
+        self.records_written += count
+        self.flush_count += 1
+        self.last_flush_ms = self._clock.ticks_diff(self._clock.ticks_ms(), start_ms)
+        return count
+
+    def new_file(self):
+        """Start the next flush in a new file (e.g. at the start of a run)."""
+        self._file_index = None
+
+    def get_current_file(self):
+        """Get the path of the file being written, or None."""
+        if self._file_index is None:
+            return None
+        return self._file_path(self._file_index)
+
+    def _file_path(self, index):
+        return f"{self.directory}/flight_{index:04d}.bin"
+
+    def _list_indices(self):
+        indices = []
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return indices
+        for name in names:
+            if name.startswith('flight_') and name.endswith('.bin'):
+                try:
+                    indices.append(int(name[7:-4]))
+                except ValueError:
+                    pass
+        indices.sort()
+        return indices
+
+    def _open_next_file(self):
+        """Create the next log file with its header and delete the oldest ones."""
+        try:
+            os.mkdir(self.directory)
+        except OSError:
+            pass  # Already exists
+
+        indices = self._list_indices()
+        index = indices[-1] + 1 if indices else 0
+
+        # Keep max_files including the new one
+        while len(indices) >= self.max_files:
+            try:
+                os.remove(self._file_path(indices.pop(0)))
+            except OSError:
+                pass
+
+        fmt = RECORD_FORMAT.encode()
+        names = ','.join(FIELD_NAMES).encode()
+        with open(self._file_path(index), 'wb') as f:
+            f.write(struct.pack(HEADER_FORMAT, MAGIC, RECORD_SIZE, len(fmt), len(names)))
+            f.write(fmt)
+            f.write(names)
+
+        self._file_index = index
+        self._file_bytes = 0
+
+    # === Status ===
+
+    def get_statistics(self):
+        """Get recorder statistics."""
+        return {
+            'enabled': self.enabled,
+            'buffered': self._count,
+            'capacity': self.capacity,
+            'records_written': self.records_written,
+            'records_dropped': self.records_dropped,
+            'flush_count': self.flush_count,
+            'last_flush_ms': self.last_flush_ms,
+            'current_file': self.get_current_file()
+        }
@@ -3,6 +3,7 @@ Hardware Abstraction Layer Package
 Provides clean interfaces for all hardware components.
 """
 
+from .clock import Clock, get_default_clock, set_default_clock
 from .base_hal import BaseHAL, HALManager
 from .motor_hal import MotorHAL
 from .servo_hal import ServoHAL
@@ -13,6 +14,9 @@ from .button_hal import ButtonHAL
 from .camera_hal import CameraHAL
 
 __all__ = [
+    'Clock',
+    'get_default_clock',
+    'set_default_clock',
     'BaseHAL',
     'HALManager', 
     'MotorHAL',
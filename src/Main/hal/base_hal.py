@@ -3,13 +3,16 @@ Base Hardware Abstraction Layer
 Provides common functionality for all HAL components.
 """
 
+from .clock import get_default_clock
+
 
 class BaseHAL:
     """Base class for all hardware abstraction layer components."""
     
-    def __init__(self):
+    def __init__(self, clock=None):
         self._is_initialized = False
         self._error_callback = None
+        self._clock = clock if clock is not None else get_default_clock()
         
     def initialize(self):
         """Initialize hardware component. Must be implemented by subclasses."""
@@ -23,6 +26,14 @@ class BaseHAL:
         """Check if hardware component is initialized."""
         return self._is_initialized
         
+    def get_clock(self):
+        """Get the clock service used for timing."""
+        return self._clock
+        
+    def set_clock(self, clock):
+        """Replace the clock service (e.g. with a virtual clock)."""
+        self._clock = clock
+        
     def set_error_callback(self, callback):
         """Set error callback function."""
         self._error_callback = callback
@@ -37,9 +48,10 @@ class BaseHAL:
 class HALManager:
     """Manager for all HAL components."""
     
-    def __init__(self):
+    def __init__(self, clock=None):
         self._components = {}
         self._error_log = []
+        self._clock = clock if clock is not None else get_default_clock()
         
     def register_component(self, name, hal_component):
         """Register a HAL component."""
@@ -73,8 +85,7 @@ class HALManager:
         
     def _log_error(self, error_message):
         """Log errors from HAL components."""
-        import time
-        timestamp = time.time()
+        timestamp = self._clock.time()
         self._error_log.append((timestamp, error_message))
         print(f"HAL Manager Error: {error_message}")
         
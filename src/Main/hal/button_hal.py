@@ -10,7 +10,7 @@ from .base_hal import BaseHAL
 class ButtonHAL(BaseHAL):
     """Button input HAL with internal pull-up resistor."""
     
-    def __init__(self, pin=22, pull_up=True, debounce_ms=50):
+    def __init__(self, pin=22, pull_up=True, debounce_ms=50, clock=None):
         """
         Initialize button HAL.
         
@@ -18,8 +18,9 @@ class ButtonHAL(BaseHAL):
             pin: GPIO pin number for button (default: 22)
             pull_up: Enable internal pull-up resistor (default: True)
             debounce_ms: Debounce time in milliseconds (default: 50)
+            clock: Clock service (default: shared hardware clock)
         """
-        super().__init__()
+        super().__init__(clock)
         self.pin = pin
         self.pull_up = pull_up
         self.debounce_ms = debounce_ms
@@ -77,8 +78,7 @@ class ButtonHAL(BaseHAL):
         if not self._is_initialized or not self.button:
             return False
             
-        import time
-        current_time = time.ticks_ms()
+        current_time = self._clock.ticks_ms()
         current_state = self.is_pressed()
         
         # Check for button press (transition from not pressed to pressed)
@@ -107,8 +107,7 @@ class ButtonHAL(BaseHAL):
         if not self._is_initialized:
             return False
             
-        import time
-        start_time = time.ticks_ms()
+        start_time = self._clock.ticks_ms()
         
         # Check if button is already pressed (for boot scenarios)
         if self.is_pressed():
@@ -121,10 +120,10 @@ class ButtonHAL(BaseHAL):
                 return True
                 
             if timeout_ms is not None:
-                if time.ticks_diff(time.ticks_ms(), start_time) >= timeout_ms:
+                if self._clock.ticks_diff(self._clock.ticks_ms(), start_time) >= timeout_ms:
                     return False
                     
-            time.sleep_ms(10)  # Small delay to prevent busy waiting
+            self._clock.sleep_ms(10)  # Small delay to prevent busy waiting
             
     def get_state(self):
         """
@@ -1,11 +1,21 @@
 """
 Camera Hardware Abstraction Layer
-Reads obstacle color detection from camera via GPIO9 UART at 50 baud.
-Output: '1' = Red, '2' = Green, '3' = Unknown
+Reads obstacle color detection from camera via GPIO9 UART.
+
+Two protocols are supported:
+- 'ascii': legacy single byte at 50 baud, '1' = Red, '2' = Green, '3' = Unknown
+- 'framed': 9-byte binary frames at a high baud rate
+
+Framed layout (little-endian):
+    0xA5 0x5A | frame_id u8 | color u8 | x_offset i8 | confidence u8 | distance_mm u16 | checksum u8
+
+color uses the same codes as the ASCII protocol (1/2/3). x_offset is the
+pillar centre relative to the image centre in percent of half the image
+width (-100 = left edge, +100 = right edge). checksum is the XOR of the
+six bytes between the sync word and the checksum.
 """
 
 from machine import Pin, UART
-import time
 from .base_hal import BaseHAL
 
 
@@ -23,23 +33,79 @@ class CameraHAL(BaseHAL):
         COLOR_UNKNOWN: 'Unknown'
     }
     
-    def __init__(self, uart_id=1, baudrate=50, rx_pin=9):
+    # Protocols
+    PROTOCOL_ASCII = 'ascii'
+    PROTOCOL_FRAMED = 'framed'
+    
+    # Framed protocol constants
+    FRAME_SYNC1 = 0xA5
+    FRAME_SYNC2 = 0x5A
+    FRAME_SIZE = 9
+    FRAME_PAYLOAD_SIZE = 7  # frame_id .. checksum
+    
+    # Wire color byte -> color code (index 0 is invalid)
+    _FRAME_COLORS = (None, COLOR_RED, COLOR_GREEN, COLOR_UNKNOWN)
+    
+    def __init__(self, uart_id=1, baudrate=50, rx_pin=9, protocol='ascii', rx_buffer_size=64,
+                 history_size=64, clock=None):
         """
         Initialize camera HAL.
         
         Args:
             uart_id: UART interface ID (default: 1, to avoid conflict with main UART)
-            baudrate: Serial baud rate (default: 50)
+            baudrate: Serial baud rate (default: 50, use 115200 or more for 'framed')
             rx_pin: RX pin number (default: 9, GPIO9)
+            protocol: 'ascii' (legacy single byte) or 'framed' (binary detection frames)
+            rx_buffer_size: Size of the preallocated receive buffer for framed mode
+            history_size: Number of timestamped detections kept for windowed queries
+            clock: Clock service (default: shared hardware clock)
         """
-        super().__init__()
+        super().__init__(clock)
         self.uart_id = uart_id
         self.baudrate = baudrate
         self.rx_pin = rx_pin
+        self.protocol = protocol
         
         # Hardware component
         self._uart = None
         
+        # Framed protocol parser state, all preallocated so polling does not allocate
+        self._rx_buffer = bytearray(rx_buffer_size)
+        self._frame_buffer = bytearray(self.FRAME_PAYLOAD_SIZE)
+        self._parse_state = 0  # 0: sync1, 1: sync2, 2: payload
+        self._parse_index = 0
+        
+        # Latest detection from the framed protocol
+        self._frame_id = -1
+        self._x_offset = 0
+        self._distance_mm = 0
+        self._confidence = 0
+        self._detection_ticks = 0
+        self._new_frames = 0
+        
+        # Record returned by get_detection, updated in place so reading it does not allocate
+        self._detection = {
+            'frame_id': -1,
+            'color': None,
+            'x_offset': 0,
+            'distance_cm': 0.0,
+            'confidence': 0,
+            'age_ms': 0
+        }
+        
+        # Framed protocol statistics
+        self._frames_received = 0
+        self._frames_bad_checksum = 0
+        self._frames_dropped = 0
+        
+        # Detection history ring buffer (ticks_ms, wire color byte, confidence)
+        self._history_size = history_size
+        self._history_ticks = [0] * history_size
+        self._history_colors = bytearray(history_size)
+        self._history_confidence = bytearray(history_size)
+        self._history_head = 0
+        self._history_count = 0
+        
         # Current color state
         self._last_color = None
         self._last_color_time = None
@@ -66,7 +132,7 @@ class CameraHAL(BaseHAL):
                 self._uart.read(self._uart.any())
             
             self._is_initialized = True
-            print(f"Camera initialized on GPIO{self.rx_pin} (UART{self.uart_id}, {self.baudrate} baud)")
+            print(f"Camera initialized on GPIO{self.rx_pin} (UART{self.uart_id}, {self.baudrate} baud, {self.protocol})")
             
         except Exception as e:
             self._handle_error(f"Camera initialization failed: {e}")
@@ -92,6 +158,11 @@ class CameraHAL(BaseHAL):
         """
         if not self._is_initialized:
             return None
+            
+        if self.protocol == self.PROTOCOL_FRAMED:
+            if self.poll() > 0:
+                return self._last_color
+            return None
         
         try:
             available = self._uart.any()
@@ -108,9 +179,10 @@ class CameraHAL(BaseHAL):
                 color_code = chr(byte)
                 if color_code in [self.COLOR_RED, self.COLOR_GREEN, self.COLOR_UNKNOWN]:
                     self._last_color = color_code
-                    self._last_color_time = time.time()
+                    self._last_color_time = self._clock.time()
                     self._color_reads += 1
                     self._color_counts[color_code] = self._color_counts.get(color_code, 0) + 1
+                    self._record_detection(byte - 48, 255, self._clock.ticks_ms())
                     return color_code
                 else:
                     # Invalid color code received, continue searching older bytes
@@ -122,6 +194,295 @@ class CameraHAL(BaseHAL):
             self._handle_error(f"Color read failed: {e}")
             return None
     
+    def poll(self):
+        """
+        Drain the UART and parse any complete detection frames (framed protocol).
+        
+        Uses only preallocated buffers, so it is safe to call every control tick.
+        
+        Returns:
+            int: Number of valid frames parsed during this call
+        """
+        if not self._is_initialized or self.protocol != self.PROTOCOL_FRAMED:
+            return 0
+            
+        self._new_frames = 0
+        try:
+            buf = self._rx_buffer
+            size = len(buf)
+            while True:
+                available = self._uart.any()
+                if not available:
+                    break
+                count = self._uart.readinto(buf, available if available < size else size)
+                if not count:
+                    break
+                for i in range(count):
+                    self._parse_byte(buf[i])
+        except Exception as e:
+            self._handle_error(f"Camera frame read failed: {e}")
+            
+        if self._new_frames:
+            self._last_color_time = self._clock.time()
+        return self._new_frames
+        
+    def _parse_byte(self, byte):
+        """Advance the frame parser state machine by one byte."""
+        state = self._parse_state
+        if state == 0:
+            if byte == self.FRAME_SYNC1:
+                self._parse_state = 1
+        elif state == 1:
+            if byte == self.FRAME_SYNC2:
+                self._parse_state = 2
+                self._parse_index = 0
+            elif byte != self.FRAME_SYNC1:
+                self._parse_state = 0
+        else:
+            self._frame_buffer[self._parse_index] = byte
+            self._parse_index += 1
+            if self._parse_index == self.FRAME_PAYLOAD_SIZE:
+                self._parse_state = 0
+                self._decode_frame()
+                
+    def _decode_frame(self):
+        """Validate and decode the payload held in the frame buffer."""
+        f = self._frame_buffer
+        if (f[0] ^ f[1] ^ f[2] ^ f[3] ^ f[4] ^ f[5]) != f[6]:
+            self._frames_bad_checksum += 1
+            return
+            
+        color_byte = f[1]
+        if color_byte < 1 or color_byte > 3:
+            self._frames_bad_checksum += 1
+            return
+            
+        frame_id = f[0]
+        if self._frame_id >= 0:
+            gap = (frame_id - self._frame_id - 1) & 0xFF
+            if gap < 128:
+                self._frames_dropped += gap
+                
+        x_offset = f[2]
+        if x_offset > 127:
+            x_offset -= 256
+            
+        color_code = self._FRAME_COLORS[color_byte]
+        now = self._clock.ticks_ms()
+        self._frame_id = frame_id
+        self._x_offset = x_offset
+        self._confidence = f[3]
+        self._distance_mm = f[4] | (f[5] << 8)
+        self._detection_ticks = now
+        self._record_detection(color_byte, f[3], now)
+        self._last_color = color_code
+        
+        detection = self._detection
+        detection['frame_id'] = frame_id
+        detection['color'] = color_code
+        detection['x_offset'] = x_offset
+        detection['distance_cm'] = self._distance_mm / 10
+        detection['confidence'] = self._confidence
+        self._frames_received += 1
+        self._new_frames += 1
+        self._color_reads += 1
+        self._color_counts[color_code] += 1
+        
+    def update(self):
+        """
+        Drain pending camera data into the detection history.
+        
+        Call regularly (e.g. every control tick) so detections are timestamped
+        close to their arrival and windowed queries see data gathered on the move.
+        
+        Returns:
+            int: Number of new detections recorded
+        """
+        if self.protocol == self.PROTOCOL_FRAMED:
+            return self.poll()
+        return 1 if self.read_color() is not None else 0
+        
+    # === Detection history ===
+    
+    def _record_detection(self, color_byte, confidence, ticks):
+        """Append a detection to the ring buffer, overwriting the oldest."""
+        head = self._history_head
+        self._history_ticks[head] = ticks
+        self._history_colors[head] = color_byte
+        self._history_confidence[head] = confidence
+        head += 1
+        if head == self._history_size:
+            head = 0
+        self._history_head = head
+        if self._history_count < self._history_size:
+            self._history_count += 1
+            
+    def count_color(self, color_code, window_ms, weighted=False):
+        """
+        Count detections of one color within the last window_ms.
+        
+        Allocation-free, so it can be used from the control loop.
+        
+        Args:
+            color_code: '1', '2' or '3'
+            window_ms: Look-back window in milliseconds
+            weighted: Sum confidences instead of counting detections
+            
+        Returns:
+            int: Detection count (or summed confidence)
+        """
+        target = ord(color_code) - 48
+        now = self._clock.ticks_ms()
+        total = 0
+        index = self._history_head
+        for _ in range(self._history_count):
+            index -= 1
+            if index < 0:
+                index = self._history_size - 1
+            if self._clock.ticks_diff(now, self._history_ticks[index]) > window_ms:
+                break
+            if self._history_colors[index] == target:
+                total += self._history_confidence[index] if weighted else 1
+        return total
+        
+    def color_counts(self, window_ms, weighted=False):
+        """
+        Get per-color detection counts within the last window_ms.
+        
+        Returns:
+            dict: {color_code: count}
+        """
+        return {
+            self.COLOR_RED: self.count_color(self.COLOR_RED, window_ms, weighted),
+            self.COLOR_GREEN: self.count_color(self.COLOR_GREEN, window_ms, weighted),
+            self.COLOR_UNKNOWN: self.count_color(self.COLOR_UNKNOWN, window_ms, weighted)
+        }
+        
+    def color_majority(self, window_ms, min_samples=1, include_unknown=False, weighted=False):
+        """
+        Vote on the pillar color over the last window_ms.
+        
+        Args:
+            window_ms: Look-back window in milliseconds
+            min_samples: Minimum number of detections needed to vote
+            include_unknown: Let 'Unknown' detections win the vote
+            weighted: Weight votes by detection confidence
+            
+        Returns:
+            str: Winning color code, or None if too few samples or a tie
+        """
+        red = self.count_color(self.COLOR_RED, window_ms)
+        green = self.count_color(self.COLOR_GREEN, window_ms)
+        unknown = self.count_color(self.COLOR_UNKNOWN, window_ms) if include_unknown else 0
+        if red + green + unknown < min_samples:
+            return None
+            
+        if weighted:
+            red = self.count_color(self.COLOR_RED, window_ms, True)
+            green = self.count_color(self.COLOR_GREEN, window_ms, True)
+            if include_unknown:
+                unknown = self.count_color(self.COLOR_UNKNOWN, window_ms, True)
+                
+        if red > green and red > unknown:
+            return self.COLOR_RED
+        if green > red and green > unknown:
+            return self.COLOR_GREEN
+        if unknown > red and unknown > green:
+            return self.COLOR_UNKNOWN
+        return None
+        
+    def latest(self, max_age_ms):
+        """
+        Get the most recent detection if it is fresh enough.
+        
+        Args:
+            max_age_ms: Maximum accepted age in milliseconds
+            
+        Returns:
+            str: Color code or None if no detection within max_age_ms
+        """
+        if self._history_count == 0:
+            return None
+        index = self._history_head - 1
+        if index < 0:
+            index = self._history_size - 1
+        if self._clock.ticks_diff(self._clock.ticks_ms(), self._history_ticks[index]) > max_age_ms:
+            return None
+        return self._FRAME_COLORS[self._history_colors[index]]
+        
+    def clear_history(self):
+        """Forget all recorded detections."""
+        self._history_head = 0
+        self._history_count = 0
+        
+    @staticmethod
+    def encode_frame(frame_id, color_code, x_offset, distance_mm, confidence):
+        """
+        Build a framed-protocol detection frame (camera side / test senders).
+        
+        Args:
+            frame_id: Frame counter (wraps at 256)
+            color_code: '1', '2' or '3'
+            x_offset: Pillar offset from image centre (-100..100)
+            distance_mm: Estimated pillar distance in millimetres
+            confidence: Detection confidence (0..255)
+            
+        Returns:
+            bytes: Encoded frame
+        """
+        x_offset = max(-128, min(127, int(x_offset))) & 0xFF
+        distance_mm = max(0, min(0xFFFF, int(distance_mm)))
+        payload = [
+            frame_id & 0xFF,
+            int(color_code),
+            x_offset,
+            max(0, min(255, int(confidence))),
+            distance_mm & 0xFF,
+            distance_mm >> 8
+        ]
+        checksum = 0
+        for byte in payload:
+            checksum ^= byte
+        return bytes([CameraHAL.FRAME_SYNC1, CameraHAL.FRAME_SYNC2] + payload + [checksum])
+        
+    def get_x_offset(self):
+        """Get pillar offset from image centre of the latest frame (-100..100)."""
+        return self._x_offset
+        
+    def get_distance_cm(self):
+        """Get estimated pillar distance of the latest frame in centimeters."""
+        return self._distance_mm / 10
+        
+    def get_confidence(self):
+        """Get confidence of the latest frame (0..255)."""
+        return self._confidence
+        
+    def get_frame_id(self):
+        """Get id of the latest frame (-1 if none received)."""
+        return self._frame_id
+        
+    def get_detection_age_ms(self):
+        """Get age of the latest frame in milliseconds (None if none received)."""
+        if self._frame_id < 0:
+            return None
+        return self._clock.ticks_diff(self._clock.ticks_ms(), self._detection_ticks)
+        
+    def get_detection(self):
+        """
+        Get the latest framed-protocol detection.
+        
+        The same preallocated dict is returned on every call and updated in
+        place as frames arrive; copy it to keep a detection.
+        
+        Returns:
+            dict: Detection fields or None if no frame received yet
+        """
+        if self._frame_id < 0:
+            return None
+        detection = self._detection
+        detection['age_ms'] = self._clock.ticks_diff(self._clock.ticks_ms(), self._detection_ticks)
+        return detection
+        
     def get_color(self):
         """
         Get the last detected color.
@@ -192,7 +553,7 @@ class CameraHAL(BaseHAL):
         Returns:
             str: Color code or None if timeout
         """
-        start_time = time.time()
+        start_time = self._clock.time()
         
         while True:
             color = self.read_color()
@@ -200,14 +561,18 @@ class CameraHAL(BaseHAL):
                 return color
             
             if timeout is not None:
-                if time.time() - start_time >= timeout:
+                if self._clock.time() - start_time >= timeout:
                     return None
             
-            time.sleep(0.01)  # Small delay to prevent busy waiting
+            self._clock.sleep(0.01)  # Small delay to prevent busy waiting
     
     def get_statistics(self):
         """Get camera statistics."""
         return {
+            'protocol': self.protocol,
+            'frames_received': self._frames_received,
+            'frames_bad_checksum': self._frames_bad_checksum,
+            'frames_dropped': self._frames_dropped,
             'total_reads': self._color_reads,
             'last_color': self._last_color,
             'last_color_name': self.get_color_name(),
@@ -226,12 +591,16 @@ class CameraHAL(BaseHAL):
             self.COLOR_GREEN: 0,
             self.COLOR_UNKNOWN: 0
         }
+        self._frames_received = 0
+        self._frames_bad_checksum = 0
+        self._frames_dropped = 0
         print("Camera statistics reset")
     
     def flush_input(self):
         """Flush input buffer."""
         if self._is_initialized and self._uart.any():
             self._uart.read(self._uart.any())
+            self._parse_state = 0
 
 
 
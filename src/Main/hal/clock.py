@@ -0,0 +1,131 @@
+"""
+Clock Service
+Single time source for the HAL and robot controller: monotonic microseconds,
+tick arithmetic and sleeping. The default clock uses the hardware timers;
+a host simulation can inject a virtual clock with the same interface.
+"""
+
+import time
+
+# CPython fallbacks so the HAL can be imported on a PC
+if hasattr(time, 'ticks_us'):
+    _ticks_us = time.ticks_us
+    _ticks_ms = time.ticks_ms
+    _ticks_diff = time.ticks_diff
+    _ticks_add = time.ticks_add
+    _sleep_ms = time.sleep_ms
+    _sleep_us = time.sleep_us
+else:
+    def _ticks_us():
+        return time.monotonic_ns() // 1000
+
+    def _ticks_ms():
+        return time.monotonic_ns() // 1000000
+
+    def _ticks_diff(new, old):
+        return new - old
+
+    def _ticks_add(ticks, delta):
+        return ticks + delta
+
+    def _sleep_ms(ms):
+        time.sleep(ms / 1000)
+
+    def _sleep_us(us):
+        time.sleep(us / 1000000)
+
+
+class Clock:
+    """Hardware clock backed by the MicroPython tick timers."""
+
+    def __init__(self):
+        self._last_us = _ticks_us()
+        self._elapsed_us = 0
+
+    def monotonic_us(self):
+        """
+        Get microseconds since the clock was created.
+
+        Unlike ticks_us() the value does not wrap around, as long as it is
+        read at least once every few minutes.
+
+        Returns:
+            int: Elapsed microseconds
+        """
+        now = _ticks_us()
+        self._elapsed_us += _ticks_diff(now, self._last_us)
+        self._last_us = now
+        return self._elapsed_us
+
+    def time(self):
+        """
+        Get monotonic time in seconds with microsecond resolution.
+
+        Use for durations; unlike time.time() on the Pico it is not
+        rounded to whole seconds.
+
+        Returns:
+            float: Elapsed seconds
+        """
+        return self.monotonic_us() / 1000000
+
+    def ticks_ms(self):
+        return _ticks_ms()
+
+    def ticks_us(self):
+        return _ticks_us()
+
+    def ticks_diff(self, new, old):
+        return _ticks_diff(new, old)
+
+    def ticks_add(self, ticks, delta):
+        return _ticks_add(ticks, delta)
+
+    def sleep(self, seconds):
+        """Sleep for a duration in seconds."""
+        us = int(seconds * 1000000)
+        if us >= 10000:
+            _sleep_ms(us // 1000)
+        elif us > 0:
+            _sleep_us(us)
+
+    def sleep_ms(self, ms):
+        """Sleep for a duration in milliseconds."""
+        if ms > 0:
+            _sleep_ms(int(ms))
+
+    def sleep_us(self, us):
+        """Sleep for a duration in microseconds."""
+        if us > 0:
+            _sleep_us(int(us))
+
+    def yield_now(self):
+        """Give other tasks and pending interrupts a chance to run."""
+        _sleep_ms(0)
+
+
+_default_clock = None
+
+
+def get_default_clock():
+    """
+    Get the clock used by HAL components created without an explicit clock.
+
+    Returns:
+        Clock: Shared clock instance
+    """
+    global _default_clock
+    if _default_clock is None:
+        _default_clock = Clock()
+    return _default_clock
+
+
+def set_default_clock(clock):
+    """
+    Replace the default clock (e.g. with a virtual clock for simulation).
+
+    Args:
+        clock: Object implementing the Clock interface, or None to restore the hardware clock
+    """
+    global _default_clock
+    _default_clock = clock
@@ -4,14 +4,13 @@ Provides a clean interface for UART and other communication protocols.
 """
 
 from machine import Pin, UART
-import time
 from .base_hal import BaseHAL
 
 
 class CommunicationHAL(BaseHAL):
     """Hardware abstraction layer for UART communication."""
     
-    def __init__(self, uart_id=0, baudrate=115200, tx_pin=16, rx_pin=17):
+    def __init__(self, uart_id=0, baudrate=115200, tx_pin=16, rx_pin=17, clock=None):
         """
         Initialize communication HAL.
         
@@ -20,8 +19,9 @@ class CommunicationHAL(BaseHAL):
             baudrate: Communication baud rate
             tx_pin: TX pin number
             rx_pin: RX pin number
+            clock: Clock service (default: shared hardware clock)
         """
-        super().__init__()
+        super().__init__(clock)
         self.uart_id = uart_id
         self.baudrate = baudrate
         self.tx_pin = tx_pin
@@ -183,7 +183,7 @@ class CommunicationHAL(BaseHAL):
         if self._is_initialized:
             # On most platforms, write() is blocking, so this is usually not needed
             # But we can add a small delay to ensure transmission
-            time.sleep(0.001)
+            self._clock.sleep(0.001)
             
     def get_statistics(self):
         """Get communication statistics."""
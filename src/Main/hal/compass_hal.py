@@ -16,7 +16,7 @@ except ImportError:
 class CompassHAL(BaseHAL):
     """Hardware abstraction layer for CMPS12 compass module."""
     
-    def __init__(self, i2c_id=1, sda_pin=14, scl_pin=15, addr=None, reg=0x02):
+    def __init__(self, i2c_id=1, sda_pin=14, scl_pin=15, addr=None, reg=0x02, clock=None):
         """
         Initialize compass HAL.
         
@@ -26,8 +26,9 @@ class CompassHAL(BaseHAL):
             scl_pin: SCL pin number
             addr: I2C address (auto-detected if None)
             reg: Register address for bearing data
+            clock: Clock service (default: shared hardware clock)
         """
-        super().__init__()
+        super().__init__(clock)
         self.i2c_id = i2c_id
         self.sda_pin = sda_pin
         self.scl_pin = scl_pin
@@ -155,6 +156,10 @@ class CompassHAL(BaseHAL):
         else:
             return self._last_valid_heading
             
+    def get_last_heading(self):
+        """Get the last valid heading without reading the sensor."""
+        return self._last_valid_heading
+        
     def get_heading_radians(self):
         """Get compass heading in radians."""
         heading = self.get_heading()
@@ -10,7 +10,7 @@ from .base_hal import BaseHAL
 class EncoderHAL(BaseHAL):
     """Hardware abstraction layer for rotary encoder."""
     
-    def __init__(self, pin_a=7, pin_b=6, steps_per_cm=67.28):
+    def __init__(self, pin_a=7, pin_b=6, steps_per_cm=67.28, clock=None):
         """
         Initialize encoder HAL.
         
@@ -18,8 +18,9 @@ class EncoderHAL(BaseHAL):
             pin_a: Encoder A signal pin (DT)
             pin_b: Encoder B signal pin (CLK)
             steps_per_cm: Number of encoder steps per centimeter
+            clock: Clock service (default: shared hardware clock)
         """
-        super().__init__()
+        super().__init__(clock)
         self.pin_a_num = pin_a
         self.pin_b_num = pin_b
         self.steps_per_cm = steps_per_cm
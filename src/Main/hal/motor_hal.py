@@ -10,7 +10,9 @@ from .base_hal import BaseHAL
 class MotorHAL(BaseHAL):
     """Hardware abstraction layer for motor control."""
     
-    def __init__(self, pwm_pin=0, dir_pin1=1, dir_pin2=2, pwm_freq=1000):
+    def __init__(self, pwm_pin=0, dir_pin1=1, dir_pin2=2, pwm_freq=1000,
+                 brake_reverse_pulse_ms=0, brake_reverse_duty=0.5, stopping_distances=None,
+                 clock=None):
         """
         Initialize motor HAL.
         
@@ -19,16 +21,28 @@ class MotorHAL(BaseHAL):
             dir_pin1: Direction control pin 1
             dir_pin2: Direction control pin 2
             pwm_freq: PWM frequency in Hz
+            brake_reverse_pulse_ms: Default reverse pulse applied before short-brake (0 to disable)
+            brake_reverse_duty: Duty cycle of the reverse pulse (0.0 to 1.0)
+            stopping_distances: Measured [speed, cm] pairs for braking from that speed
+            clock: Clock service (default: shared hardware clock)
         """
-        super().__init__()
+        super().__init__(clock)
         self.pwm_pin = pwm_pin
         self.dir_pin1 = dir_pin1
         self.dir_pin2 = dir_pin2
         self.pwm_freq = pwm_freq
+        self.brake_reverse_pulse_ms = brake_reverse_pulse_ms
+        self.brake_reverse_duty = brake_reverse_duty
+        
+        # Stopping-distance model, kept sorted by speed
+        self._stopping_distances = []
+        if stopping_distances:
+            self.set_stopping_distances(stopping_distances)
         
         # Motor state
         self._current_speed = 0.0
         self._current_direction = 0  # 1: forward, -1: backward, 0: stopped
+        self._is_braking = False
         
         # Hardware components
         self._m1 = None
@@ -86,6 +100,7 @@ class MotorHAL(BaseHAL):
             # Update state
             self._current_speed = speed
             self._current_direction = direction
+            self._is_braking = False
             
         except Exception as e:
             self._handle_error(f"Motor speed setting failed: {e}")
@@ -110,10 +125,109 @@ class MotorHAL(BaseHAL):
             
             self._current_speed = 0.0
             self._current_direction = 0
+            self._is_braking = False
             
         except Exception as e:
             self._handle_error(f"Motor stop failed: {e}")
             
+    def brake(self, reverse_pulse_ms=None, reverse_duty=None):
+        """
+        Actively brake the motor instead of letting it coast.
+        
+        Drives both direction pins high with full enable so the H-bridge
+        shorts the motor windings. An optional reverse pulse is applied first
+        to shed momentum faster. The brake holds until the next set_speed/stop.
+        
+        Args:
+            reverse_pulse_ms: Reverse pulse length (default: brake_reverse_pulse_ms)
+            reverse_duty: Reverse pulse duty cycle (default: brake_reverse_duty)
+        """
+        if not self._is_initialized:
+            return
+            
+        if reverse_pulse_ms is None:
+            reverse_pulse_ms = self.brake_reverse_pulse_ms
+        if reverse_duty is None:
+            reverse_duty = self.brake_reverse_duty
+            
+        try:
+            # Timed reverse pulse against the current direction of travel
+            if reverse_pulse_ms > 0 and self._current_direction != 0:
+                if self._current_direction == 1:
+                    self._m1.value(1)
+                    self._m2.value(0)
+                else:
+                    self._m1.value(0)
+                    self._m2.value(1)
+                self._m_pwm.duty_u16(int(max(0.0, min(1.0, reverse_duty)) * 65535))
+                self._clock.sleep_ms(reverse_pulse_ms)
+                
+            # Short-brake
+            self._m1.value(1)
+            self._m2.value(1)
+            self._m_pwm.duty_u16(65535)
+            
+            self._current_speed = 0.0
+            self._current_direction = 0
+            self._is_braking = True
+            
+        except Exception as e:
+            self._handle_error(f"Motor brake failed: {e}")
+            
+    def is_braking(self):
+        """Check if the motor is holding a short-brake."""
+        return self._is_braking
+        
+    def set_stopping_distances(self, stopping_distances):
+        """
+        Set the measured stopping-distance model.
+        
+        Args:
+            stopping_distances: Iterable of (speed, distance_cm) pairs
+        """
+        self._stopping_distances = sorted(
+            [(float(speed), float(distance)) for speed, distance in stopping_distances]
+        )
+        
+    def get_stopping_distances(self):
+        """Get the stopping-distance model as [speed, cm] pairs."""
+        return [[speed, distance] for speed, distance in self._stopping_distances]
+        
+    def has_stopping_model(self):
+        """Check if a measured stopping-distance model is available."""
+        return len(self._stopping_distances) > 0
+        
+    def get_stopping_distance(self, speed=None):
+        """
+        Predict braking distance from a speed using the measured model.
+        
+        Interpolates linearly between measured points and extrapolates
+        proportionally above the fastest measurement.
+        
+        Args:
+            speed: Motor speed (default: current speed)
+            
+        Returns:
+            Predicted stopping distance in cm (0 if no model)
+        """
+        if speed is None:
+            speed = self._current_speed
+        points = self._stopping_distances
+        if not points or speed <= 0:
+            return 0.0
+            
+        if speed <= points[0][0]:
+            return points[0][1] * speed / points[0][0] if points[0][0] > 0 else points[0][1]
+            
+        for i in range(1, len(points)):
+            if speed <= points[i][0]:
+                s0, d0 = points[i - 1]
+                s1, d1 = points[i]
+                return d0 + (d1 - d0) * (speed - s0) / (s1 - s0)
+                
+        s_last, d_last = points[-1]
+        return d_last * speed / s_last
+            
     def get_current_speed(self):
         """Get current motor speed."""
         return self._current_speed
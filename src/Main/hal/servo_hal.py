@@ -11,7 +11,8 @@ class ServoHAL(BaseHAL):
     """Hardware abstraction layer for servo motor control."""
     
     def __init__(self, pin=3, servo_pwm_freq=50, min_u16_duty=1802, max_u16_duty=7864,
-                 center_steering=91, max_steering_offset=11):
+                 center_steering=91, max_steering_offset=11, degrees_per_second=300.0,
+                 settle_margin_ms=10, clock=None):
         """
         Initialize servo HAL.
         
@@ -22,8 +23,11 @@ class ServoHAL(BaseHAL):
             max_u16_duty: Maximum PWM duty cycle value
             center_steering: Center position angle
             max_steering_offset: Maximum offset from center
+            degrees_per_second: Calibrated servo slew rate used to predict settle time
+            settle_margin_ms: Extra time added to every predicted settle time
+            clock: Clock service (default: shared hardware clock)
         """
-        super().__init__()
+        super().__init__(clock)
         self.pin = pin
         self.servo_pwm_freq = servo_pwm_freq
         self.min_u16_duty = min_u16_duty
@@ -39,6 +43,22 @@ class ServoHAL(BaseHAL):
         self._current_angle = 0.001  # Slightly off to force initial movement
         self._target_angle = center_steering
         
+        # Settle-time model: the servo has no position feedback, so its
+        # physical angle is estimated from the commanded-angle history
+        self.degrees_per_second = degrees_per_second
+        self.settle_margin_ms = settle_margin_ms
+        self._move_start_angle = center_steering
+        self._move_start_time = self._clock.ticks_ms()
+        self._move_duration_ms = 0
+        
+        # Command history ring, preallocated so recording a command allocates nothing
+        self._max_history = 8
+        self._history_ticks = [0] * self._max_history
+        self._history_start = [0.0] * self._max_history
+        self._history_target = [0.0] * self._max_history
+        self._history_head = 0
+        self._history_count = 0
+        
         # Hardware component
         self._motor = None
         self._angle_conversion_factor = 0
@@ -83,6 +103,10 @@ class ServoHAL(BaseHAL):
             return
             
         try:
+            # Estimate where the servo physically is before retargeting it
+            now = self._clock.ticks_ms()
+            start_angle = self._estimate_angle_at(now)
+            
             # Calculate duty cycle and move
             duty_u16 = self._angle_to_u16_duty(angle)
             self._motor.duty_u16(duty_u16)
@@ -90,6 +114,7 @@ class ServoHAL(BaseHAL):
             # Update state
             self._current_angle = angle
             self._target_angle = angle
+            self._record_command(now, start_angle, angle)
             
         except Exception as e:
             self._handle_error(f"Servo movement failed: {e}")
@@ -128,6 +153,113 @@ class ServoHAL(BaseHAL):
         """Get servo angle limits."""
         return self.min_angle, self.max_angle
         
+    def get_estimated_angle(self):
+        """Get the estimated physical servo angle from the command history."""
+        return self._estimate_angle_at(self._clock.ticks_ms())
+        
+    def predict_settle_time_ms(self, angle):
+        """
+        Predict how long the servo needs to reach an angle from where it is now.
+        
+        Args:
+            angle: Target angle in degrees
+            
+        Returns:
+            Predicted settle time in milliseconds (0 if already there)
+        """
+        angle = max(self.min_angle, min(self.max_angle, angle))
+        delta = abs(angle - self.get_estimated_angle())
+        return self._travel_time_ms(delta)
+        
+    def get_remaining_settle_time_ms(self):
+        """Get the time left until the last commanded move has settled."""
+        elapsed = self._clock.ticks_diff(self._clock.ticks_ms(), self._move_start_time)
+        remaining = self._move_duration_ms - elapsed
+        return remaining if remaining > 0 else 0
+        
+    def is_settled(self):
+        """Check if the last commanded move is predicted to have finished."""
+        return self.get_remaining_settle_time_ms() == 0
+        
+    def wait_until_settled(self, max_wait_ms=None):
+        """
+        Block only as long as the last commanded move still needs.
+        
+        Args:
+            max_wait_ms: Upper bound on the wait (None for no bound)
+            
+        Returns:
+            Time actually waited in milliseconds
+        """
+        remaining = self.get_remaining_settle_time_ms()
+        if max_wait_ms is not None and remaining > max_wait_ms:
+            remaining = max_wait_ms
+        if remaining > 0:
+            self._clock.sleep_ms(remaining)
+        return remaining
+        
+    def set_speed_model(self, degrees_per_second=None, settle_margin_ms=None):
+        """Update the calibrated settle-time model."""
+        if degrees_per_second is not None:
+            if degrees_per_second <= 0:
+                self._handle_error(f"Invalid servo speed: {degrees_per_second}")
+                return
+            self.degrees_per_second = degrees_per_second
+        if settle_margin_ms is not None:
+            self.settle_margin_ms = settle_margin_ms
+            
+    def get_speed_model(self):
+        """Get the settle-time model parameters."""
+        return {
+            'degrees_per_second': self.degrees_per_second,
+            'settle_margin_ms': self.settle_margin_ms
+        }
+        
+    def get_command_history(self):
+        """Get recent commands as (ticks_ms, start_angle, target_angle) tuples, oldest first."""
+        start = self._history_head - self._history_count
+        history = []
+        for i in range(start, self._history_head):
+            i %= self._max_history
+            history.append((self._history_ticks[i], self._history_start[i], self._history_target[i]))
+        return history
+        
+    def _travel_time_ms(self, delta):
+        """Convert an angle delta into a predicted travel time."""
+        if delta < 0.1:
+            return 0
+        return int(delta * 1000 / self.degrees_per_second) + self.settle_margin_ms
+        
+    def _estimate_angle_at(self, now):
+        """Interpolate the physical angle along the current move."""
+        elapsed = self._clock.ticks_diff(now, self._move_start_time)
+        if elapsed >= self._move_duration_ms or self._move_duration_ms <= 0:
+            return self._target_angle
+            
+        travelled = elapsed * self.degrees_per_second / 1000
+        delta = self._target_angle - self._move_start_angle
+        if travelled >= abs(delta):
+            return self._target_angle
+        return self._move_start_angle + (travelled if delta > 0 else -travelled)
+        
+    def _record_command(self, now, start_angle, angle):
+        """Start a new predicted move and keep a short command history."""
+        self._move_start_angle = start_angle
+        self._move_start_time = now
+        self._move_duration_ms = self._travel_time_ms(abs(angle - start_angle))
+        
+        head = self._history_head
+        self._history_ticks[head] = now
+        self._history_start[head] = start_angle
+        self._history_target[head] = angle
+        
+        head += 1
+        if head == self._max_history:
+            head = 0
+        self._history_head = head
+        if self._history_count < self._max_history:
+            self._history_count += 1
+        
     def update_settings(self, servo_pwm_freq=None, min_u16_duty=None, 
                        max_u16_duty=None, min_angle=None, max_angle=None):
         """Update servo settings dynamically."""
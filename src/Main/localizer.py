@@ -0,0 +1,444 @@
+"""
+Localizer
+Particle filter estimating the car's position on the WRO mat from the four
+sonar ranges, the compass heading and encoder odometry.
+
+The map is the 300x300cm outer wall square and the inner wall square;
+pillars and the parking lot are not modelled, readings that hit them fall
+into the outlier floor of the range model. Frame as in PoseEstimator: x
+towards mat heading 90°, y towards 0°, origin at the south-west corner.
+
+The mat looks the same after a quarter turn, so the filter cannot find out
+which side it started on. The mat frame is fixed at reset() instead, by
+mapping the compass heading at that moment to a mat heading (e.g. 270 when
+the car starts along the south corridor facing west).
+
+This is the fixed-size implementation for the Pico: particles live in
+preallocated float arrays and are updated in plain loops, so keep the count
+small. The simulator has a vectorised NumPy version of the same model
+(Simulator/sim/localization.py).
+"""
+
+import math
+import random
+from array import array
+
+DEG_TO_RAD = math.pi / 180.0
+
+# Packet order (left, rear, right, front): (forward cm, right cm, beam direction deg)
+DEFAULT_MOUNTS = (
+    (5.0, -6.0, -90.0),
+    (-10.0, 0.0, 180.0),
+    (5.0, 6.0, 90.0),
+    (10.0, 0.0, 0.0)
+)
+
+
+class TrackMap:
+    """Outer and inner wall squares of the mat, with ray casting."""
+
+    def __init__(self, size=300.0, inner=(100.0, 100.0, 200.0, 200.0)):
+        """
+        Initialize the map.
+
+        Args:
+            size: Side of the outer wall square in cm
+            inner: Inner wall square as (min_x, min_y, max_x, max_y) in cm
+        """
+        self.size = size
+        self.inner_min_x, self.inner_min_y, self.inner_max_x, self.inner_max_y = inner
+
+    def ray(self, x, y, dx, dy):
+        """
+        Distance along a ray to the first wall.
+
+        Args:
+            x, y: Ray origin in cm (inside the outer square)
+            dx, dy: Unit direction (sin, cos of the mat heading)
+
+        Returns:
+            float: Distance in cm
+        """
+        size = self.size
+
+        # Outer square, seen from inside
+        best = 1e9
+        if dx > 1e-9:
+            best = (size - x) / dx
+        elif dx < -1e-9:
+            best = -x / dx
+        if dy > 1e-9:
+            t = (size - y) / dy
+            if t < best:
+                best = t
+        elif dy < -1e-9:
+            t = -y / dy
+            if t < best:
+                best = t
+
+        # Inner square, seen from outside (slab test)
+        if -1e-9 < dx < 1e-9:
+            if x < self.inner_min_x or x > self.inner_max_x:
+                return best
+            tx_near, tx_far = -1e9, 1e9
+        else:
+            t1 = (self.inner_min_x - x) / dx
+            t2 = (self.inner_max_x - x) / dx
+            tx_near, tx_far = (t1, t2) if t1 < t2 else (t2, t1)
+        if -1e-9 < dy < 1e-9:
+            if y < self.inner_min_y or y > self.inner_max_y:
+                return best
+            ty_near, ty_far = -1e9, 1e9
+        else:
+            t1 = (self.inner_min_y - y) / dy
+            t2 = (self.inner_max_y - y) / dy
+            ty_near, ty_far = (t1, t2) if t1 < t2 else (t2, t1)
+
+        near = tx_near if tx_near > ty_near else ty_near
+        far = tx_far if tx_far < ty_far else ty_far
+        if 0.0 < near <= far and near < best:
+            return near
+        return best
+
+    def is_drivable(self, x, y, margin=0.0):
+        """Check that a point lies between the walls with a clearance in cm."""
+        if x < margin or y < margin or x > self.size - margin or y > self.size - margin:
+            return False
+        return not (self.inner_min_x - margin < x < self.inner_max_x + margin and
+                    self.inner_min_y - margin < y < self.inner_max_y + margin)
+
+
+def _gauss():
+    """Approximately standard normal sample (sum of three uniforms)."""
+    return (random.random() + random.random() + random.random() - 1.5) * 2.0
+
+
+class ParticleFilter:
+    """Fixed-size particle filter over (x, y) on a TrackMap."""
+
+    def __init__(self, track=None, count=48, mounts=DEFAULT_MOUNTS, sonar_sigma=4.0,
+                 max_range=200.0, outlier=0.02, odometry_noise=0.1, heading_noise=2.0,
+                 roughening=1.0, margin=5.0, alpha_slow=0.02, alpha_fast=0.3, inject_threshold=0.1,
+                 max_inject=0.25, seed=None):
+        """
+        Initialize the filter (call reset() before use).
+
+        Args:
+            track: TrackMap (default: 100cm corridors)
+            count: Number of particles
+            mounts: Sonar (forward, right, direction) offsets in packet order
+            sonar_sigma: Sonar range noise in cm
+            max_range: Readings at or above this (and 0) carry no information
+            outlier: Likelihood floor per reading, for pillars and echoes
+            odometry_noise: Relative odometry noise per prediction
+            heading_noise: Heading noise per prediction in degrees
+            roughening: Position jitter of resampled particles in cm (keeps copies apart)
+            margin: Clearance from the walls the car centre always keeps, in cm
+            alpha_slow, alpha_fast: Smoothing of the long and short term likelihood
+                averages; random particles are injected while the short term one is lower
+            inject_threshold: Relative likelihood drop ignored before injecting
+            max_inject: Largest fraction of particles replaced in one resampling
+            seed: Random seed (None keeps the current state)
+        """
+        self.track = track or TrackMap()
+        self.count = count
+        self.mounts = mounts
+        self.sonar_sigma = sonar_sigma
+        self.max_range = max_range
+        self.outlier = outlier
+        self.odometry_noise = odometry_noise
+        self.heading_noise = heading_noise
+        self.roughening = roughening
+        self.margin = margin
+        self.alpha_slow = alpha_slow
+        self.alpha_fast = alpha_fast
+        self.inject_threshold = inject_threshold
+        self.max_inject = max_inject
+        if seed is not None:
+            random.seed(seed)
+
+        self._x = array('f', [0.0] * count)
+        self._y = array('f', [0.0] * count)
+        self._w = array('f', [1.0 / count] * count)
+        self._x_spare = array('f', [0.0] * count)
+        self._y_spare = array('f', [0.0] * count)
+
+        self.heading_offset = 0.0
+        self._pending_x = 0.0
+        self._pending_y = 0.0
+        self._pending_path = 0.0
+        self._last_distance = None
+        self._slow = 0.0
+        self._fast = 0.0
+        self._est_x = 0.0
+        self._est_y = 0.0
+        self._est_spread = 0.0
+        self.updates = 0
+        self.resamples = 0
+        self.recoveries = 0
+        self.injections = 0
+
+    # === Setup ===
+
+    def reset(self, compass_heading, x=None, y=None, mat_heading=0.0, spread=5.0, distance_cm=None):
+        """
+        Fix the mat frame and scatter the particles.
+
+        Args:
+            compass_heading: Current compass heading in degrees
+            x, y: Known position in cm (None: anywhere between the walls)
+            mat_heading: Mat heading the car is facing now
+            spread: Standard deviation around a known position in cm
+            distance_cm: Current encoder distance (None: re-sync on the next update)
+        """
+        self.heading_offset = (mat_heading - compass_heading) % 360.0
+        if x is None or y is None:
+            self._scatter()
+        else:
+            for i in range(self.count):
+                self._x[i] = x + spread * _gauss()
+                self._y[i] = y + spread * _gauss()
+                self._w[i] = 1.0 / self.count
+        self._pending_x = 0.0
+        self._pending_y = 0.0
+        self._pending_path = 0.0
+        self._last_distance = distance_cm
+        self._slow = 0.0
+        self._fast = 0.0
+        self._update_estimate()
+
+    def _random_point(self):
+        """Uniformly random (x, y) between the walls."""
+        track = self.track
+        margin = self.margin
+        size = track.size - 2 * margin
+        while True:
+            x = margin + random.random() * size
+            y = margin + random.random() * size
+            if track.is_drivable(x, y, margin):
+                return x, y
+
+    def _scatter(self):
+        """Spread the particles uniformly between the walls."""
+        for i in range(self.count):
+            self._x[i], self._y[i] = self._random_point()
+            self._w[i] = 1.0 / self.count
+
+    def mat_heading(self, compass_heading):
+        """Convert a compass heading to the mat frame."""
+        return (compass_heading + self.heading_offset) % 360.0
+
+    # === Filter steps ===
+
+    def move(self, step_cm, compass_heading):
+        """
+        Accumulate one odometry step; particles move on the next predict().
+
+        Cheap enough for every control tick, so turns are integrated as arcs
+        even when no sonar packet arrives for a while.
+
+        Args:
+            step_cm: Signed encoder travel since the last step
+            compass_heading: Compass heading in degrees
+        """
+        if step_cm == 0:
+            return
+        rad = self.mat_heading(compass_heading) * DEG_TO_RAD
+        self._pending_x += step_cm * math.sin(rad)
+        self._pending_y += step_cm * math.cos(rad)
+        self._pending_path += abs(step_cm)
+
+    def predict(self):
+        """Move every particle by the accumulated odometry, with noise."""
+        path = self._pending_path
+        if path == 0:
+            return
+        dx = self._pending_x
+        dy = self._pending_y
+        self._pending_x = 0.0
+        self._pending_y = 0.0
+        self._pending_path = 0.0
+        self._est_x += dx
+        self._est_y += dy
+
+        # Per particle: rotate the displacement by a heading error, scale it by an odometry error
+        heading_noise = self.heading_noise * DEG_TO_RAD
+        scale_noise = self.odometry_noise
+        xs = self._x
+        ys = self._y
+        for i in range(self.count):
+            angle = heading_noise * _gauss()
+            scale = 1.0 + scale_noise * _gauss()
+            c = math.cos(angle) * scale
+            s = math.sin(angle) * scale
+            xs[i] += dx * c + dy * s
+            ys[i] += dy * c - dx * s
+
+    def correct(self, readings, compass_heading):
+        """
+        Weight the particles by a sonar packet and resample if needed.
+
+        Args:
+            readings: (left, rear, right, front) in cm
+            compass_heading: Compass heading in degrees
+        """
+        rad = self.mat_heading(compass_heading) * DEG_TO_RAD
+        fx = math.sin(rad)
+        fy = math.cos(rad)
+
+        # Beam origins relative to the car centre and directions, once per packet
+        beams = []
+        for reading, mount in zip(readings, self.mounts):
+            if 0 < reading < self.max_range:
+                forward, right, direction = mount
+                beam = rad + direction * DEG_TO_RAD
+                beams.append((reading, fx * forward + fy * right, fy * forward - fx * right,
+                              math.sin(beam), math.cos(beam)))
+
+        track = self.track
+        ray = track.ray
+        margin = self.margin
+        max_range = self.max_range
+        outlier = self.outlier
+        inv_var = -0.5 / (self.sonar_sigma * self.sonar_sigma)
+        xs = self._x
+        ys = self._y
+        ws = self._w
+        total = 0.0
+        for i in range(self.count):
+            x = xs[i]
+            y = ys[i]
+            if not track.is_drivable(x, y, margin):
+                ws[i] = 0.0
+                continue
+            weight = ws[i]
+            for reading, ox, oy, dx, dy in beams:
+                expected = ray(x + ox, y + oy, dx, dy)
+                if expected > max_range:
+                    expected = max_range
+                error = reading - expected
+                weight *= math.exp(error * error * inv_var) + outlier
+            ws[i] = weight
+            total += weight
+
+        self.updates += 1
+        if total <= 0.0:
+            # Every particle left the map: start over
+            self.recoveries += 1
+            self._scatter()
+            self._update_estimate()
+            return
+
+        # Augmented MCL: per-reading likelihood averages; a short term drop
+        # well below the long term level means the particles are losing track
+        inject = 0.0
+        if beams:
+            quality = total ** (1.0 / len(beams))
+            if self._slow == 0.0:
+                self._slow = self._fast = quality
+            self._slow += self.alpha_slow * (quality - self._slow)
+            self._fast += self.alpha_fast * (quality - self._fast)
+            inject = 1.0 - self._fast / self._slow - self.inject_threshold
+            if inject > self.max_inject:
+                inject = self.max_inject
+
+        squares = 0.0
+        for i in range(self.count):
+            w = ws[i] / total
+            ws[i] = w
+            squares += w * w
+        self._update_estimate()
+        if squares * self.count > 2.0 or inject > 0.0:
+            self._resample(inject)
+
+    def _resample(self, inject=0.0):
+        """
+        Systematic resampling into the spare arrays, then swap.
+
+        Args:
+            inject: Probability of replacing each new particle by a random one
+        """
+        count = self.count
+        roughening = self.roughening
+        xs = self._x
+        ys = self._y
+        ws = self._w
+        new_x = self._x_spare
+        new_y = self._y_spare
+        step = 1.0 / count
+        target = random.random() * step
+        cumulative = ws[0]
+        j = 0
+        for i in range(count):
+            while target > cumulative and j < count - 1:
+                j += 1
+                cumulative += ws[j]
+            if inject > 0.0 and random.random() < inject:
+                new_x[i], new_y[i] = self._random_point()
+            else:
+                new_x[i] = xs[j] + roughening * _gauss()
+                new_y[i] = ys[j] + roughening * _gauss()
+            target += step
+        for i in range(count):
+            ws[i] = step
+        self._x, self._x_spare = new_x, xs
+        self._y, self._y_spare = new_y, ys
+        self.resamples += 1
+        if inject > 0.0:
+            self.injections += 1
+
+    def update(self, distance_cm, compass_heading, readings=None):
+        """
+        Accumulate the encoder travel since the last call; with a sonar
+        packet, also predict and correct.
+
+        Args:
+            distance_cm: Absolute encoder distance in cm (signed)
+            compass_heading: Compass heading in degrees
+            readings: (left, rear, right, front) sonar packet, or None
+        """
+        if compass_heading is None:
+            return
+        if self._last_distance is not None:
+            self.move(distance_cm - self._last_distance, compass_heading)
+        self._last_distance = distance_cm
+        if readings is not None:
+            self.predict()
+            self.correct(readings, compass_heading)
+
+    # === Results ===
+
+    def _update_estimate(self):
+        """Weighted mean and spread of the particles as they are now."""
+        xs = self._x
+        ys = self._y
+        ws = self._w
+        mean_x = 0.0
+        mean_y = 0.0
+        for i in range(self.count):
+            mean_x += ws[i] * xs[i]
+            mean_y += ws[i] * ys[i]
+        variance = 0.0
+        for i in range(self.count):
+            dx = xs[i] - mean_x
+            dy = ys[i] - mean_y
+            variance += ws[i] * (dx * dx + dy * dy)
+        self._est_x = mean_x
+        self._est_y = mean_y
+        self._est_spread = math.sqrt(variance)
+
+    def estimate(self):
+        """
+        Get the position estimate: the weighted particle mean of the latest
+        correction (taken before resampling, so injected particles do not
+        pull it) moved by the odometry since.
+
+        Returns:
+            tuple: (x, y, spread) in cm, spread being the RMS distance of the
+            particles from the mean
+        """
+        return self._est_x + self._pending_x, self._est_y + self._pending_y, self._est_spread
+
+    def get_particles(self):
+        """Get (x, y, weight) of every particle."""
+        return [(self._x[i], self._y[i], self._w[i]) for i in range(self.count)]
@@ -3,10 +3,15 @@ Main Robot Application using Hardware Abstraction Layer
 Clean separation between business logic and hardware control.
 """
 
+import os
 import time
 from machine import Pin
+from config import load_config, save_config
 from robot_controller import RobotController
 
+# Optional tuned parameters (e.g. written by src/Simulator/tune.py)
+CONFIG_FILE = "robot_config.json"
+
 # Initialize status LED
 led = Pin(25, Pin.OUT)
 led.on()  # Turn on LED at boot
@@ -17,6 +22,11 @@ class RobotApplication:
     
     def __init__(self):
         """Initialize robot application."""
+        try:
+            os.stat(CONFIG_FILE)
+            load_config(CONFIG_FILE)
+        except OSError:
+            pass
         self.robot = RobotController()
         self.running = False
         
@@ -173,6 +183,37 @@ class RobotApplication:
             print(f"Calibration error: {e}")
             self.robot.stop()
             
+    def run_drive_calibration(self):
+        """Measure servo speed and stopping distances and save them to CONFIG_FILE."""
+        print("Starting drive calibration...")
+        print("WARNING: the car drives in arcs at full steering lock, then")
+        print("straight runs of about 60cm with hard braking. Needs a clear area.")
+        
+        if input("Type 'yes' to continue: ").strip().lower() != 'yes':
+            print("Drive calibration cancelled")
+            return
+            
+        try:
+            print("Measuring servo speed...")
+            degrees_per_second = self.robot.calibrate_servo_speed()
+            
+            print("Measuring stopping distances...")
+            stopping_distances = self.robot.calibrate_stopping_distance()
+            
+            if degrees_per_second is None and stopping_distances is None:
+                print("Drive calibration failed, nothing saved")
+                return
+                
+            # Loaded again at boot
+            if not save_config(CONFIG_FILE):
+                print("Drive calibration measured but NOT saved")
+                return
+            print("Drive calibration complete!")
+            
+        except Exception as e:
+            print(f"Drive calibration error: {e}")
+            self.robot.stop()
+            
     def run_open_challenge(self):
         """Run the open challenge sequence."""
         print("Starting Open Challenge...")
@@ -192,11 +233,8 @@ class RobotApplication:
             print("Robot is initialized, proceeding with challenge...")
             
             # Run the challenge
-            success = self.robot.run_open_challenge(
-                target_laps=3,
-                wall_distance=30,
-                front_stop_distance=15
-            )
+            # Wall and turn distances come from the navigation config
+            success = self.robot.run_open_challenge(target_laps=3)
             
             if success:
                 print("\n🎉 OPEN CHALLENGE COMPLETED SUCCESSFULLY! 🎉")
@@ -282,11 +320,12 @@ class RobotApplication:
             print("7. Obstacle Challenge (3 Laps)")
             print("8. Show Robot Status")
             print("9. Emergency Stop")
-            print("10. Exit")
+            print("10. Drive Calibration (servo speed, stopping distance)")
+            print("11. Exit")
             print("========================")
             
             try:
-                choice = input("Enter choice (1-10): ").strip()
+                choice = input("Enter choice (1-11): ").strip()
                 
                 if choice == '1':
                     self.run_demo_sequence()
@@ -308,6 +347,8 @@ class RobotApplication:
                 elif choice == '9':
                     self.emergency_stop()
                 elif choice == '10':
+                    self.run_drive_calibration()
+                elif choice == '11':
                     break
                 else:
                     print("Invalid choice, please try again.")
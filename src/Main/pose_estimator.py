@@ -0,0 +1,152 @@
+"""
+Pose Estimator
+Dead-reckons the car's world-frame pose (x, y, heading) from encoder travel
+and compass heading every control tick.
+
+Frame: x points to compass heading 90°, y to heading 0°, both in cm;
+headings are compass degrees (clockwise). The encoder distance is the
+absolute, signed count, so primitives can keep re-zeroing their own
+reference positions without disturbing the pose.
+"""
+
+import math
+
+DEG_TO_RAD = math.pi / 180.0
+
+
+class PoseEstimator:
+    """Integrates encoder deltas along the heading into (x, y, heading)."""
+
+    def __init__(self):
+        """Initialize the estimator at the origin with an unknown heading."""
+        self.x = 0.0
+        self.y = 0.0
+        self.heading = None
+        self._last_distance = None
+        self.distance_travelled = 0.0
+        self.updates = 0
+
+    def reset(self, x=0.0, y=0.0, heading=None, distance_cm=None):
+        """
+        Set the pose.
+
+        Args:
+            x, y: Position in cm
+            heading: Heading in degrees (None keeps the current one)
+            distance_cm: Current encoder distance (None: re-sync on the next update)
+        """
+        self.x = x
+        self.y = y
+        if heading is not None:
+            self.heading = heading % 360.0
+        self._last_distance = distance_cm
+
+    def update(self, distance_cm, heading=None):
+        """
+        Integrate one control tick.
+
+        The step is taken along the mean of the previous and current heading,
+        so turns are integrated as arcs rather than corners.
+
+        Args:
+            distance_cm: Absolute encoder distance in cm (signed)
+            heading: Compass heading in degrees (None keeps the last one)
+        """
+        if self._last_distance is None:
+            self._last_distance = distance_cm
+            if heading is not None:
+                self.heading = heading
+            return
+
+        step = distance_cm - self._last_distance
+        self._last_distance = distance_cm
+
+        previous = self.heading
+        if heading is not None:
+            self.heading = heading
+        if previous is None:
+            previous = self.heading
+        if previous is None or step == 0:
+            return
+
+        # Mean heading across the 0/360 wrap
+        delta = self.heading - previous
+        if delta > 180.0:
+            delta -= 360.0
+        elif delta < -180.0:
+            delta += 360.0
+        rad = (previous + delta * 0.5) * DEG_TO_RAD
+
+        self.x += step * math.sin(rad)
+        self.y += step * math.cos(rad)
+        self.distance_travelled += abs(step)
+        self.updates += 1
+
+    def get_pose(self):
+        """Get the current (x, y, heading) (heading None until known)."""
+        return self.x, self.y, self.heading
+
+    # === Frames ===
+
+    def make_frame(self, heading=None):
+        """
+        Capture the current pose as a reference frame, e.g. at a corner.
+
+        Args:
+            heading: Frame heading in degrees (default: current heading, e.g.
+                pass the lane's target heading to ignore steering wobble)
+
+        Returns:
+            tuple: (x, y, heading) frame for to_frame() / from_frame()
+        """
+        if heading is None:
+            heading = self.heading if self.heading is not None else 0.0
+        return self.x, self.y, heading
+
+    @staticmethod
+    def to_frame(frame, x, y):
+        """
+        Transform a world point into a frame.
+
+        Args:
+            frame: (x, y, heading) from make_frame()
+            x, y: World position in cm
+
+        Returns:
+            tuple: (forward, right) in cm along and across the frame heading
+        """
+        dx = x - frame[0]
+        dy = y - frame[1]
+        rad = frame[2] * DEG_TO_RAD
+        s = math.sin(rad)
+        c = math.cos(rad)
+        return dx * s + dy * c, dx * c - dy * s
+
+    @staticmethod
+    def from_frame(frame, forward, right):
+        """
+        Transform a frame point into the world.
+
+        Args:
+            frame: (x, y, heading) from make_frame()
+            forward, right: Position in the frame in cm
+
+        Returns:
+            tuple: (x, y) in cm
+        """
+        rad = frame[2] * DEG_TO_RAD
+        s = math.sin(rad)
+        c = math.cos(rad)
+        return frame[0] + forward * s + right * c, frame[1] + forward * c - right * s
+
+    def get_frame_position(self, frame):
+        """Get the current (forward, right) position in a frame."""
+        return self.to_frame(frame, self.x, self.y)
+
+    def distance_to(self, x, y):
+        """Get the straight-line distance to a world point in cm."""
+        return math.sqrt((x - self.x) ** 2 + (y - self.y) ** 2)
+
+    def bearing_to(self, x, y):
+        """Get the compass bearing from the current position to a world point."""
+        return math.atan2(x - self.x, y - self.y) / DEG_TO_RAD % 360.0
@@ -0,0 +1,210 @@
+"""
+Profiler
+Call counts and ticks_us totals per labelled region, kept in preallocated
+counters so profiling can run on the Pico without a debugger.
+
+When disabled nothing is wrapped: instrument() and profiled() return the
+original function and region() returns a shared do-nothing context
+manager, so the hot paths run exactly as without profiling.
+
+Times are inclusive: a primitive that calls another counts the inner time
+too.
+"""
+
+
+class _NullRegion:
+    """Context manager used for regions while profiling is off."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_REGION = _NullRegion()
+
+
+class _Region:
+    """Context manager timing one labelled slot."""
+
+    def __init__(self, profiler, slot):
+        self._profiler = profiler
+        self._slot = slot
+        self._start = 0
+
+    def __enter__(self):
+        self._start = self._profiler._clock.ticks_us()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        profiler = self._profiler
+        profiler._add(self._slot, profiler._clock.ticks_diff(profiler._clock.ticks_us(), self._start))
+        return False
+
+
+class Profiler:
+    """Preallocated per-label call counters and time totals."""
+
+    def __init__(self, enabled=False, capacity=32, clock=None):
+        """
+        Initialize profiler.
+
+        Args:
+            enabled: Wrap functions and time regions (when False, everything is a no-op)
+            capacity: Maximum number of labels
+            clock: Clock service used for ticks_us (default: shared hardware clock)
+        """
+        if clock is None:
+            from hal import get_default_clock
+            clock = get_default_clock()
+        self._clock = clock
+        self.enabled = enabled
+        self.capacity = capacity
+
+        self._labels = []
+        self._slots = {}
+        self._counts = [0] * capacity
+        self._totals = [0] * capacity
+        self._max = [0] * capacity
+        self._regions = {}
+
+    # === Slots ===
+
+    def _slot(self, label):
+        """Get the counter slot of a label, allocating one on first use."""
+        slot = self._slots.get(label)
+        if slot is None:
+            if len(self._labels) >= self.capacity:
+                print(f"Profiler full, not tracking {label}")
+                return None
+            slot = len(self._labels)
+            self._labels.append(label)
+            self._slots[label] = slot
+        return slot
+
+    def _add(self, slot, elapsed_us):
+        self._counts[slot] += 1
+        self._totals[slot] += elapsed_us
+        if elapsed_us > self._max[slot]:
+            self._max[slot] = elapsed_us
+
+    # === Instrumentation ===
+
+    def profiled(self, label):
+        """
+        Decorator timing every call of a function under a label.
+
+        Returns the function unchanged while profiling is disabled.
+        """
+        def decorator(func):
+            return self.wrap(func, label)
+        return decorator
+
+    def wrap(self, func, label):
+        """
+        Wrap a function so its calls are counted and timed.
+
+        Args:
+            func: Function or bound method
+            label: Region label
+
+        Returns:
+            The wrapper, or func itself when profiling is disabled
+        """
+        if not self.enabled:
+            return func
+        slot = self._slot(label)
+        if slot is None:
+            return func
+
+        ticks_us = self._clock.ticks_us
+        ticks_diff = self._clock.ticks_diff
+        add = self._add
+
+        def wrapper(*args, **kwargs):
+            start = ticks_us()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                add(slot, ticks_diff(ticks_us(), start))
+
+        return wrapper
+
+    def instrument(self, obj, method_names, prefix=None):
+        """
+        Replace methods of an object with timed wrappers (instance attributes).
+
+        Does nothing while profiling is disabled, so the object keeps its
+        plain methods.
+
+        Args:
+            obj: Object to instrument
+            method_names: Names of the methods to time
+            prefix: Label prefix (default: class name)
+        """
+        if not self.enabled:
+            return
+        if prefix is None:
+            prefix = type(obj).__name__
+        for name in method_names:
+            method = getattr(obj, name, None)
+            if method is not None:
+                setattr(obj, name, self.wrap(method, f"{prefix}.{name}"))
+
+    def region(self, label):
+        """
+        Context manager timing a block under a label.
+
+        Returns a shared no-op context manager while profiling is disabled.
+        Regions are reused per label, so nest different labels only.
+        """
+        if not self.enabled:
+            return _NULL_REGION
+        region = self._regions.get(label)
+        if region is None:
+            slot = self._slot(label)
+            if slot is None:
+                return _NULL_REGION
+            region = _Region(self, slot)
+            self._regions[label] = region
+        return region
+
+    # === Results ===
+
+    def reset(self):
+        """Zero all counters (labels are kept)."""
+        for i in range(self.capacity):
+            self._counts[i] = 0
+            self._totals[i] = 0
+            self._max[i] = 0
+
+    def get_results(self):
+        """
+        Get per-label results, slowest total first.
+
+        Returns:
+            list: (label, calls, total_us, mean_us, max_us) tuples
+        """
+        results = []
+        for slot, label in enumerate(self._labels):
+            calls = self._counts[slot]
+            if calls:
+                total = self._totals[slot]
+                results.append((label, calls, total, total // calls, self._max[slot]))
+        results.sort(key=lambda item: -item[2])
+        return results
+
+    def dump(self, write=print):
+        """
+        Write a summary table line by line.
+
+        Args:
+            write: Function taking one line without newline (default: print)
+        """
+        if not self.enabled:
+            return
+        write("=== Profile (inclusive us) ===")
+        write("{:36s} {:>7s} {:>10s} {:>7s} {:>7s}".format('label', 'calls', 'total', 'mean', 'max'))
+        for label, calls, total, mean, peak in self.get_results():
+            write("{:36s} {:7d} {:10d} {:7d} {:7d}".format(label, calls, total, mean, peak))
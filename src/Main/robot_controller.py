@@ -3,44 +3,57 @@ Robot Controller - Business Logic Layer
 Implements high-level robot behaviors using the Hardware Abstraction Layer.
 """
 
-import time
 import math
 from hal import HALManager, MotorHAL, ServoHAL, CompassHAL, EncoderHAL, CommunicationHAL, ButtonHAL, CameraHAL
+from hal import get_default_clock
 from config import get_config
+from flight_recorder import (FlightRecorder, PRIMITIVE_MOVE_DISTANCE, PRIMITIVE_MOVE_LANE, PRIMITIVE_ROTATE,
+                             PRIMITIVE_CORNER_TURN, FLAG_REVERSE, FLAG_BRAKING)
+from profiler import Profiler
+from pose_estimator import PoseEstimator
+from direction_detector import DirectionDetector
 
 
 class RobotController:
     """High-level robot controller implementing navigation and movement logic."""
     
-    def __init__(self, config=None):
-        """Initialize robot controller with HAL components."""
+    def __init__(self, config=None, clock=None):
+        """
+        Initialize robot controller with HAL components.
+        
+        Args:
+            config: RobotConfig (default: global configuration)
+            clock: Clock service shared by the controller and all HAL components
+                (default: hardware clock; pass a virtual clock to simulate)
+        """
         # Get configuration
         self._config = config or get_config()
+        self._clock = clock if clock is not None else get_default_clock()
         
         # Initialize HAL manager
-        self._hal_manager = HALManager()
+        self._hal_manager = HALManager(self._clock)
         
         # Create and register HAL components using configuration
         motor_config = self._config.get_hardware_config('motor')
-        self._motor_hal = MotorHAL(**motor_config)
+        self._motor_hal = MotorHAL(clock=self._clock, **motor_config)
         
         servo_config = self._config.get_hardware_config('servo')
-        self._servo_hal = ServoHAL(**servo_config)
+        self._servo_hal = ServoHAL(clock=self._clock, **servo_config)
         
         compass_config = self._config.get_hardware_config('compass')
-        self._compass_hal = CompassHAL(**compass_config)
+        self._compass_hal = CompassHAL(clock=self._clock, **compass_config)
         
         encoder_config = self._config.get_hardware_config('encoder')
-        self._encoder_hal = EncoderHAL(**encoder_config)
+        self._encoder_hal = EncoderHAL(clock=self._clock, **encoder_config)
         
         comm_config = self._config.get_hardware_config('communication')
-        self._comm_hal = CommunicationHAL(**comm_config)
+        self._comm_hal = CommunicationHAL(clock=self._clock, **comm_config)
         
         button_config = self._config.get_hardware_config('button')
-        self._button_hal = ButtonHAL(**button_config)
+        self._button_hal = ButtonHAL(clock=self._clock, **button_config)
         
         camera_config = self._config.get_hardware_config('camera')
-        self._camera_hal = CameraHAL(**camera_config)
+        self._camera_hal = CameraHAL(clock=self._clock, **camera_config)
         
         # Register components
         self._hal_manager.register_component('motor', self._motor_hal)
@@ -70,6 +83,42 @@ class RobotController:
         self._default_min_speed = nav_config.get('default_min_speed', 0.22)
         self._default_slow_distance = nav_config.get('default_slow_distance', 20)
         self._default_stop_distance = nav_config.get('default_stop_distance', 5)
+        self._sonar_multiplier = nav_config.get('sonar_multiplier', 0.25)
+        self._compass_multiplier = nav_config.get('compass_multiplier', 0.1)
+        self._rotate_speed_min = nav_config.get('rotate_speed_min', 0.2)
+        self._rotate_speed_max = nav_config.get('rotate_speed_max', 0.4)
+        self._corner_speed_min = nav_config.get('corner_speed_min', 0.22)
+        self._corner_speed_max = nav_config.get('corner_speed_max', 0.4)
+        self._open_wall_distance = nav_config.get('open_wall_distance', 30)
+        self._open_front_stop_distance = nav_config.get('open_front_stop_distance', 15)
+        self._open_blind_distance = nav_config.get('open_blind_distance', 200)
+        self._predictive_front_stop = nav_config.get('predictive_front_stop', True)
+        self._front_handoff_distance = nav_config.get('front_handoff_distance', 20)
+        self._sonar_latency_ms = nav_config.get('sonar_latency_ms', 15)
+        self._sensor_timeout_ms = int(self._config.get_safety_config().get('sensor_timeout', 1.0) * 1000)
+        self._direction_timeout = nav_config.get('direction_timeout', 1.0)
+        
+        # Track direction decided from sonar packets as they arrive (while driving)
+        self._direction = DirectionDetector(threshold=nav_config.get('direction_threshold', 4.6),
+                                            open_distance=nav_config.get('direction_open_distance', 120))
+        
+        # Arrival of the latest sonar packet, for dead-reckoning the front distance
+        self._sonar_ticks_ms = None
+        self._sonar_encoder_cm = 0.0
+        self._encoder_velocity = 0.0
+        
+        # Control-tick telemetry (disabled unless telemetry.enabled is set)
+        self._recorder = FlightRecorder(clock=self._clock, **self._config.get_telemetry_config())
+        
+        # World-frame pose dead-reckoned every control tick
+        self._pose = PoseEstimator()
+        
+        # Particle-filter position on the mat (None unless localization.enabled is set)
+        self._localizer = self._make_localizer(self._config.get_localization_config())
+        
+        # Region timing (disabled unless profiling.enabled is set; nothing is wrapped then)
+        self._profiler = Profiler(clock=self._clock, **self._config.get_profiling_config())
+        self._instrument_profiler()
         
     def initialize(self):
         """Initialize all robot systems."""
@@ -96,6 +145,8 @@ class RobotController:
     def shutdown(self):
         """Safely shutdown all robot systems."""
         self.stop()
+        self._recorder.flush(force=True)
+        self._profiler.dump()
         self._hal_manager.deinitialize_all()
         self._is_initialized = False
         print("Robot controller shut down")
@@ -134,11 +185,21 @@ class RobotController:
         self._current_direction = -1
         return True
         
-    def stop(self):
-        """Stop robot movement."""
+    def stop(self, center_steering=True, brake=False):
+        """
+        Stop robot movement.
+        
+        Args:
+            center_steering: Also recentre the servo (turns skip this because
+                they steer away again immediately)
+            brake: Actively brake the motor instead of coasting
+        """
         if self._motor_hal.is_initialized():
-            self._motor_hal.stop()
-        if self._servo_hal.is_initialized():
+            if brake:
+                self._motor_hal.brake()
+            else:
+                self._motor_hal.stop()
+        if center_steering and self._servo_hal.is_initialized():
             self._servo_hal.move_to_center()
         self._current_speed = 0.0
         
@@ -199,6 +260,11 @@ class RobotController:
         slowdown_started = False
         prev_speed = 0
         
+        # With a measured stopping model, hold speed and brake late instead of crawling
+        late_braking = self._motor_hal.has_stopping_model()
+        braked = False
+        
+        self._recorder.flush()
         while True:
             if relative:
                 current_distance = self._encoder_hal.get_relative_distance_cm()
@@ -226,7 +292,11 @@ class RobotController:
                 speed = min_speed + (speed_interval * (initial_diff - stop_distance) / distance_interval)
                 
             # Deceleration phase (approaching target)
-            if diff < stop_distance:
+            if late_braking:
+                if self._should_brake(diff):
+                    braked = True
+                    break
+            elif diff < stop_distance:
                 speed = min_speed
             elif diff < slow_distance:
                 if not slowdown_started:
@@ -249,11 +319,18 @@ class RobotController:
             if diff <= 0.5:  # 5mm tolerance
                 break
                 
-            time.sleep(0.001)  # Small delay for control loop
+            self._update_pose()
+            self._record_tick(PRIMITIVE_MOVE_DISTANCE)
+            self._clock.sleep(0.001)  # Small delay for control loop
             
-        self.stop()
+        self.stop(brake=braked)
         return True
         
+    def _should_brake(self, remaining_cm, tolerance_cm=0.5):
+        """Check if braking now would stop the car at the target."""
+        stopping_distance = self._motor_hal.get_stopping_distance(self._motor_hal.get_current_speed())
+        return remaining_cm <= stopping_distance + tolerance_cm
+        
     def rotate_angle(self, angle, reverse=False, relative=True, timeout=None):
         """
         Rotate robot to a specific compass heading.
@@ -267,7 +344,7 @@ class RobotController:
         if not self._is_initialized:
             return False
             
-        self.stop()
+        self.stop(center_steering=False)
 
         offeset_bak = self._compass_hal.get_angle_offset()
         
@@ -285,18 +362,19 @@ class RobotController:
         max_offset = 45
         margin = 0.75
         angle_min_adjustment = 2.5
-        speed_min = 0.2
-        speed_max = 0.4
+        speed_min = self._rotate_speed_min
+        speed_max = self._rotate_speed_max
         
-        start_time = time.time()
+        start_time = self._clock.time()
         is_first_loop = True
         
+        self._recorder.flush()
         while True:
             # Check timeout
-            if timeout and (time.time() - start_time) > timeout:
+            if timeout and (self._clock.time() - start_time) > timeout:
                 self.stop()
                 self._servo_hal.move_to_center()
-                time.sleep(0.2)
+                self._clock.sleep(0.2)
                 return False
                 
             current_bearing = self._compass_hal.get_relative_heading()
@@ -307,7 +385,7 @@ class RobotController:
             if abs(current_bearing - 180) <= margin:
                 self.stop()
                 self._servo_hal.move_to_center()
-                time.sleep(0.2)
+                self._clock.sleep(0.2)
                 break
                 
             # Calculate steering adjustment
@@ -331,9 +409,9 @@ class RobotController:
             servo_angle = self._servo_hal.center_steering - angle_adjustment
             self.steer(servo_angle)
             
-            # Wait for servo on first loop
+            # Wait for servo on first loop, only as long as the move needs
             if is_first_loop:
-                time.sleep(0.15)
+                self._servo_hal.wait_until_settled()
                 is_first_loop = False
                 
             # Calculate speed based on error
@@ -346,14 +424,19 @@ class RobotController:
             else:
                 self.move_forward(speed)
                 
-            time.sleep(1/500)  # Control loop delay
+            self._update_camera()
+            
+            self._update_pose()
+            self._record_tick(PRIMITIVE_ROTATE)
+            self._clock.sleep(1/500)  # Control loop delay
         
         self._compass_hal.set_angle_offset(offeset_bak)
         return True
         
     def move_lane(self, target_cm=None, relative=True, clockwise=True, wall_distance=50,
                   use_sonar=False, use_compass=False, until_front_distance=None, blind_distance=0,
-                  lock_compass_heading=False, until_rear_distance=None,compass_multiplier=0.1):
+                  lock_compass_heading=False, until_rear_distance=None, compass_multiplier=None,
+                  sonar_multiplier=None):
         """
         Move along a lane with wall following and compass guidance.
         
@@ -364,9 +447,11 @@ class RobotController:
             wall_distance: Desired distance from wall (if using sonar)
             use_sonar: Enable sonar-based wall following
             use_compass: Enable compass-based heading correction
-            sonar_multiplier: Weight for sonar correction
-            compass_multiplier: Weight for compass correction
-            until_front_distance: Stop when front sonar distance reaches this value (mutually exclusive with target_cm and until_rear_distance)
+            sonar_multiplier: Weight for sonar correction (default: navigation.sonar_multiplier)
+            compass_multiplier: Weight for compass correction (default: navigation.compass_multiplier)
+            until_front_distance: Stop when front sonar distance reaches this value (mutually exclusive with target_cm and until_rear_distance).
+                With navigation.predictive_front_stop the distance is estimated between sonar packets and the
+                final approach becomes an encoder-distance target
             until_rear_distance: Stop when rear sonar distance reaches this value (mutually exclusive with target_cm and until_front_distance)
             blind_distance: Distance to travel before checking front obstacle
             lock_compass_heading: If True and use_compass, lock current heading as target
@@ -379,10 +464,10 @@ class RobotController:
         if specified_modes != 1:
             raise ValueError("Specify exactly one of target_cm, until_front_distance, or until_rear_distance.")
 
-        sonar_multiplier=0.25
-
-        if wall_distance > 50:
-            sonar_multiplier = 0.25
+        if sonar_multiplier is None:
+            sonar_multiplier = self._sonar_multiplier
+        if compass_multiplier is None:
+            compass_multiplier = self._compass_multiplier
 
             
         # Optionally lock current heading as compass target
@@ -421,7 +506,14 @@ class RobotController:
         stop_distance = self._default_stop_distance
         slowdown_started = False
         prev_speed = 0
+        late_braking = use_distance_mode and self._motor_hal.has_stopping_model()
+        braked = False
+        
+        # Predictive front stop: encoder position of the stop point once handed off
+        predictive = use_front_distance_mode and self._predictive_front_stop
+        front_target = None
         
+        self._recorder.flush()
         while True:
             # Get sensor data from communication
             #sensor_data = self._get_sensor_data()
@@ -457,7 +549,28 @@ class RobotController:
                     
             else:
                 # Front distance mode
-                if use_front_distance_mode:
+                if predictive:
+                    if front_target is None and front_distance is not None:
+                        estimate = self._estimate_front_distance()
+                        if estimate is None:
+                            diff = 0  # No recent valid front reading, maintain current speed
+                        elif estimate - until_front_distance <= self._front_handoff_distance:
+                            # Close enough to trust the encoder alone for the rest of the approach,
+                            # but never hand off a stop point behind the car
+                            front_target = current_distance + max(0, estimate - until_front_distance)
+                            late_braking = self._motor_hal.has_stopping_model()
+                            print(f"Front obstacle estimated at {estimate:.1f}cm after {current_distance:.1f}cm travel, stopping in {front_target - current_distance:.1f}cm")
+                        else:
+                            diff = estimate - until_front_distance
+                    elif front_target is None:
+                        diff = 0  # Still inside the blind distance
+                        
+                    if front_target is not None:
+                        diff = front_target - current_distance
+                        if abs(diff) <= 0.5:
+                            break
+                            
+                elif use_front_distance_mode:
                     if front_distance is not None and front_distance >= until_front_distance -3 and front_distance <= until_front_distance:
                         print(f"Front obstacle detected at {front_distance}cm after {current_distance:.1f}cm travel, stopping")
                         self.move_lane(
@@ -533,7 +646,12 @@ class RobotController:
                 speed = min_speed + (speed_interval * (initial_diff - stop_distance) / distance_interval)
                 
             # Deceleration phase
-            if use_distance_mode or current_distance >= blind_distance or blind_distance == 0:
+            if late_braking:
+                # Hold speed and brake at the measured stopping distance
+                if self._should_brake(diff):
+                    braked = True
+                    break
+            elif use_distance_mode or current_distance >= blind_distance or blind_distance == 0:
                 # Distance-based deceleration
                 if diff < stop_distance:
                     speed = min_speed
@@ -571,24 +689,33 @@ class RobotController:
                 
             prev_speed = speed
 
-            time.sleep(1/100)
+            self._update_camera()
+            
+            self._update_pose()
+            self._record_tick(PRIMITIVE_MOVE_LANE)
+            self._clock.sleep(1/100)
             
         # Restore compass offset if we locked it for this movement
         if did_lock_heading and previous_compass_offset is not None:
             self._compass_hal.set_angle_offset(previous_compass_offset)
 
-        self.stop()
+        self.stop(brake=braked)
         return True
         
-    def run_open_challenge(self, target_laps=3, wall_distance=30, front_stop_distance=30):
+    def run_open_challenge(self, target_laps=3, wall_distance=None, front_stop_distance=None):
         """
         Run the open challenge with automatic direction detection and wall following.
         
         Args:
             target_laps: Number of laps to complete (default: 3)
-            wall_distance: Target distance from outside wall in cm (default: 30)
-            front_stop_distance: Distance from front wall to start turning (default: 30)
+            wall_distance: Target distance from outside wall in cm (default: navigation.open_wall_distance)
+            front_stop_distance: Distance from front wall to start turning (default: navigation.open_front_stop_distance)
         """
+        if wall_distance is None:
+            wall_distance = self._open_wall_distance
+        if front_stop_distance is None:
+            front_stop_distance = self._open_front_stop_distance
+            
         print("DEBUG: run_open_challenge() function called")
         print(f"DEBUG: Robot initialization status: {self._is_initialized}")
         
@@ -597,6 +724,9 @@ class RobotController:
             return False
             
         print("=== STARTING OPEN CHALLENGE ===")
+        self._recorder.new_file()
+        self.reset_pose()
+        self.reset_localizer()
         print(f"Target laps: {target_laps}")
         print(f"Wall following distance: {wall_distance}cm")
         print(f"Turn trigger distance: {front_stop_distance}cm")
@@ -606,6 +736,9 @@ class RobotController:
         direction_detected = False
         is_clockwise = None
         current_lap = 1
+        
+        # Collect direction evidence on every sonar packet of the first lane
+        self._direction.start()
         lanes_completed = 0
         
         # Set reference position and get absolute heading
@@ -636,7 +769,7 @@ class RobotController:
                         
                         
                         if success:
-                            # Detect direction at the corner
+                            # Usually decided while passing the end of the inner wall
                             is_clockwise = self._detect_direction()
                             direction_detected = True
                             direction_str = "CLOCKWISE" if is_clockwise else "ANTICLOCKWISE"
@@ -656,8 +789,8 @@ class RobotController:
                             use_compass=True,
                             use_sonar=True,
                             wall_distance=wall_distance,
-                            until_front_distance=15,  # Front stop distance
-                            blind_distance=200  # Don't check front until 250cm
+                            until_front_distance=front_stop_distance,
+                            blind_distance=self._open_blind_distance  # Don't check front before the corner
                         )
                     
                     # Turn at the end of each lane (except the last lane of the last lap)
@@ -742,6 +875,7 @@ class RobotController:
             return False
         finally:
             self.stop()
+            self._recorder.flush(force=True)
             
     def _navigate_first_lane(self, front_stop_distance):
         """
@@ -808,7 +942,7 @@ class RobotController:
             if abs(heading_error) > 2:
                 print(f"Heading correction: error={heading_error:.1f}°, steering={steering_adjustment:.1f}")
             
-            time.sleep(0.05)  # Control loop delay
+            self._clock.sleep(0.05)  # Control loop delay
             
     def _navigate_first_lane_absolute(self, front_stop_distance, target_heading):
         """
@@ -869,49 +1003,55 @@ class RobotController:
                 print(f"Heading correction: target={target_heading:.1f}°, current={current_heading:.1f}°, "
                       f"error={heading_error:.1f}°, steering={steering_adjustment:.1f}")
             
-            time.sleep(0.05)  # Control loop delay
+            self._clock.sleep(0.05)  # Control loop delay
             
-    def _detect_direction(self):
+    def _detect_direction(self, timeout=None):
         """
-        Detect if the track is clockwise or anticlockwise by comparing sonar readings.
+        Finish direction detection started with self._direction.start().
         
+        Packets are fed to the detector as they arrive, also while driving, so
+        it has usually decided by the time this is called and returns at once.
+        Otherwise sonar packets are polled until it decides or the timeout runs
+        out, and the direction the evidence favours is used.
+        
+        Args:
+            timeout: Seconds to wait for a decision (default: navigation.direction_timeout)
+            
         Returns:
             bool: True if clockwise, False if anticlockwise
         """
-        print("Detecting track direction using sonar readings...")
-        
-        # Take multiple readings for reliability
-        right_readings = []
-        left_readings = []
-        
-        for i in range(5):
-            sensor_data = self._get_sensor_data()
-            right_distance = sensor_data.get('right', 0)
-            left_distance = sensor_data.get('left', 0)
-            
-            if right_distance > 0 and left_distance > 0:
-                right_readings.append(right_distance)
-                left_readings.append(left_distance)
-                
-            time.sleep(0.1)
-            
-        if not right_readings or not left_readings:
+        detector = self._direction
+        if not detector.active and detector.decision is None and detector.samples == 0:
+            detector.start()
+        if timeout is None:
+            timeout = self._direction_timeout
+            
+        deadline = self._clock.ticks_add(self._clock.ticks_ms(), int(timeout * 1000))
+        while detector.decision is None and self._clock.ticks_diff(deadline, self._clock.ticks_ms()) > 0:
+            self._get_sensor_data()
+            self._clock.sleep(0.01)
+        detector.stop()
+        
+        is_clockwise = detector.leaning()
+        if is_clockwise is None:
             print("Warning: Could not get reliable sonar readings for direction detection")
             return True  # Default to clockwise
             
-        # Calculate average distances
-        avg_right = sum(right_readings) / len(right_readings)
-        avg_left = sum(left_readings) / len(left_readings)
+        decided = "decided" if detector.decision is not None else "undecided, using best guess"
+        print(f"Direction determination: {'CLOCKWISE' if is_clockwise else 'ANTICLOCKWISE'} "
+              f"({decided}, confidence {detector.confidence:.3f} after {detector.samples} packets)")
         
-        print(f"Average distances - Right: {avg_right:.1f}cm, Left: {avg_left:.1f}cm")
-        
-        # If right distance > left distance, we're at a right corner (clockwise)
-        is_clockwise = avg_right > avg_left
+        return is_clockwise
         
-        print(f"Direction determination: {'CLOCKWISE' if is_clockwise else 'ANTICLOCKWISE'}")
-        print(f"Logic: Right({avg_right:.1f}) {'>' if is_clockwise else '<='} Left({avg_left:.1f})")
+    def get_direction_confidence(self):
+        """
+        Get the direction detector's confidence.
         
-        return is_clockwise
+        Returns:
+            tuple: (clockwise, confidence) - clockwise is None without evidence,
+            confidence the probability of that direction
+        """
+        return self._direction.leaning(), self._direction.confidence
         
     def _navigate_lane_with_distance_check(self, wall_distance, front_stop_distance, is_clockwise, min_distance_before_check):
         """
@@ -974,7 +1114,7 @@ class RobotController:
             if int(distance_traveled) % 50 == 0 and distance_traveled > 0:
                 print(f"Lane progress: {distance_traveled:.1f}cm traveled, front: {front_distance}cm")
                 
-            time.sleep(0.1)  # Brief pause between segments
+            self._clock.sleep(0.1)  # Brief pause between segments
         
     def _make_corner_turn(self, clockwise):
         """
@@ -991,7 +1131,7 @@ class RobotController:
         
         # Stop and prepare for turn
         self.stop()
-        time.sleep(0.2)
+        self._clock.sleep(0.2)
         
         # Get initial heading
         initial_heading = self._compass_hal.get_heading()
@@ -1035,7 +1175,7 @@ class RobotController:
         if not self._is_initialized:
             return False
             
-        self.stop()
+        self.stop(center_steering=False)
         
         # Get current heading for display
         initial_heading = self._compass_hal.get_heading()
@@ -1054,16 +1194,17 @@ class RobotController:
         max_offset = 50
         margin = 2  # Slightly larger margin for absolute turns
         angle_min_adjustment = 3
-        speed_min = 0.22
-        speed_max = 0.4
+        speed_min = self._corner_speed_min
+        speed_max = self._corner_speed_max
         timeout = 15  # 15 second timeout
         
-        start_time = time.time()
+        start_time = self._clock.time()
         is_first_loop = True
         
+        self._recorder.flush()
         while True:
             # Check timeout
-            if (time.time() - start_time) > timeout:
+            if (self._clock.time() - start_time) > timeout:
                 print("Turn timed out")
                 self.stop()
                 return False
@@ -1102,9 +1243,9 @@ class RobotController:
             servo_angle = int(self._servo_hal.center_steering - angle_adjustment)
             self.steer(servo_angle)
             
-            # Wait for servo on first loop
+            # Wait for servo on first loop, only as long as the move needs
             if is_first_loop:
-                time.sleep(0.15)
+                self._servo_hal.wait_until_settled()
                 is_first_loop = False
                 
             # Calculate speed based on error (same as rotate_angle)
@@ -1117,10 +1258,157 @@ class RobotController:
             else:
                 self.move_forward(speed)
                 
-            time.sleep(0.0002)  # Control loop delay (same as rotate_angle)
+            self._update_camera()
+            
+            self._update_pose()
+            self._record_tick(PRIMITIVE_CORNER_TURN)
+            self._clock.sleep(0.0002)  # Control loop delay (same as rotate_angle)
             
         return True
         
+    def calibrate_servo_speed(self, speed=0.3, trials=3, sample_time=1.0):
+        """
+        Measure the steering servo slew rate from the compass yaw response.
+        
+        The car drives straight at a constant speed and the servo is stepped
+        to full lock. Yaw rate follows the steering angle, so the time until
+        the yaw rate reaches its plateau is the servo travel time for that step.
+        
+        Args:
+            speed: Motor speed used while measuring
+            trials: Number of steps to average (alternating left/right)
+            sample_time: Time to sample the yaw response per step in seconds
+            
+        Returns:
+            float: Measured degrees per second, or None if measurement failed
+        """
+        if not self._is_initialized:
+            return None
+            
+        delta = self._servo_hal.max_steering_offset
+        results = []
+        
+        for trial in range(trials):
+            # Drive straight until the servo is centred and the car is steady
+            self.center_steering()
+            self.move_forward(speed)
+            self._clock.sleep(0.5)
+            
+            target = self._servo_hal.center_steering + (delta if trial % 2 == 0 else -delta)
+            samples = []
+            start = self._clock.ticks_ms()
+            self.steer(target)
+            
+            while self._clock.ticks_diff(self._clock.ticks_ms(), start) < sample_time * 1000:
+                heading = self._compass_hal.get_heading()
+                if heading is not None:
+                    samples.append((self._clock.ticks_diff(self._clock.ticks_ms(), start), heading))
+                self._clock.sleep_ms(5)
+                
+            self.stop()
+            self._clock.sleep(0.5)
+            
+            settle_ms = self._find_yaw_plateau_ms(samples)
+            if settle_ms:
+                results.append(delta * 1000 / settle_ms)
+                print(f"Servo step {trial + 1}: {delta}° settled in {settle_ms}ms")
+            else:
+                print(f"Servo step {trial + 1}: no yaw plateau found")
+                
+        if not results:
+            print("Servo speed calibration failed")
+            return None
+            
+        degrees_per_second = sum(results) / len(results)
+        self._servo_hal.set_speed_model(degrees_per_second=degrees_per_second)
+        self._config.set("hardware.servo.degrees_per_second", degrees_per_second)
+        print(f"Servo speed calibrated: {degrees_per_second:.0f}°/s")
+        return degrees_per_second
+        
+    def calibrate_stopping_distance(self, speeds=(0.3, 0.5, 0.7), run_up_cm=60, run_up_timeout=5.0):
+        """
+        Measure the braking distance at several speeds for late braking.
+        
+        For each speed the car accelerates over run_up_cm, brakes, and the
+        encoder distance covered until it is stationary is recorded.
+        
+        Args:
+            speeds: Motor speeds to measure
+            run_up_cm: Distance driven at speed before braking
+            run_up_timeout: Seconds allowed for each run-up before giving up
+            
+        Returns:
+            list: Measured [speed, cm] pairs, or None if measurement failed
+        """
+        if not self._is_initialized:
+            return None
+            
+        results = []
+        for speed in speeds:
+            self.center_steering()
+            self._encoder_hal.set_reference_position()
+            self.move_forward(speed)
+            start = self._clock.ticks_ms()
+            while self._encoder_hal.get_relative_distance_cm() < run_up_cm:
+                if self._clock.ticks_diff(self._clock.ticks_ms(), start) > run_up_timeout * 1000:
+                    # Stalled or encoder not counting
+                    self.stop()
+                    print(f"Stopping distance calibration failed: run-up at speed {speed:.2f} timed out")
+                    return None
+                self._clock.sleep_ms(2)
+                
+            brake_position = self._encoder_hal.get_relative_distance_cm()
+            self.stop(brake=True)
+            
+            # Wait until the encoder has not changed for 150ms
+            last_position = self._encoder_hal.get_position()
+            still_since = self._clock.ticks_ms()
+            while self._clock.ticks_diff(self._clock.ticks_ms(), still_since) < 150:
+                position = self._encoder_hal.get_position()
+                if position != last_position:
+                    last_position = position
+                    still_since = self._clock.ticks_ms()
+                self._clock.sleep_ms(5)
+                
+            distance = self._encoder_hal.get_relative_distance_cm() - brake_position
+            results.append([speed, round(distance, 2)])
+            print(f"Stopping distance at speed {speed:.2f}: {distance:.1f}cm")
+            
+            self.stop()
+            self._clock.sleep(0.5)
+            
+        self._motor_hal.set_stopping_distances(results)
+        self._config.set("hardware.motor.stopping_distances", results)
+        return results
+        
+    def _find_yaw_plateau_ms(self, samples):
+        """Return the time at which yaw rate first reaches 90% of its final value."""
+        rates = []
+        for i in range(1, len(samples)):
+            dt = samples[i][0] - samples[i - 1][0]
+            if dt <= 0:
+                continue
+            dh = samples[i][1] - samples[i - 1][1]
+            if dh > 180:
+                dh -= 360
+            elif dh < -180:
+                dh += 360
+            rates.append((samples[i][0], abs(dh) * 1000 / dt))
+            
+        if len(rates) < 6:
+            return None
+            
+        # Final yaw rate is the mean over the last third of the window
+        tail = rates[-(len(rates) // 3):]
+        final_rate = sum(r for _, r in tail) / len(tail)
+        if final_rate <= 0:
+            return None
+            
+        for t, rate in rates:
+            if rate >= final_rate * 0.9:
+                return t
+        return None
+        
     # === Sensor Reading Functions ===
     
     def get_compass_heading(self):
@@ -1183,6 +1471,7 @@ class RobotController:
                     'right': latest_data[2],
                     'front': latest_data[3]
                 }
+                self._stamp_sonar_packet()
                 
         except Exception as e:
             print(f"Sensor data read error: {e}")
@@ -1190,6 +1479,48 @@ class RobotController:
         # Always return the cached data (either updated or last known)
         return self._last_sensor_data.copy()
         
+    def _stamp_sonar_packet(self):
+        """Note when and where the latest sonar packet arrived."""
+        now = self._clock.ticks_ms()
+        position = self._encoder_hal.get_distance_cm()
+        if self._sonar_ticks_ms is not None:
+            elapsed = self._clock.ticks_diff(now, self._sonar_ticks_ms)
+            if elapsed > 0:
+                self._encoder_velocity = (position - self._sonar_encoder_cm) * 1000 / elapsed
+        self._sonar_ticks_ms = now
+        self._sonar_encoder_cm = position
+        
+        data = self._last_sensor_data
+        if self._direction.active:
+            self._direction.add(data['left'], data['right'])
+        if self._localizer is not None:
+            self._localizer.update(position, self._compass_hal.get_last_heading(),
+                                   (data['left'], data['rear'], data['right'], data['front']))
+        
+    def _estimate_front_distance(self):
+        """
+        Estimate the current front distance between sonar packets.
+        
+        The latest reading is dead-reckoned by the encoder travel since the
+        packet arrived, plus the encoder velocity over the sonar latency (the
+        echo was measured before the packet was sent).
+        
+        Returns:
+            float: Estimated front distance in cm, or None if the reading is too
+            old or had no echo
+        """
+        if self._sonar_ticks_ms is None:
+            return None
+        front = self._last_sensor_data['front']
+        if front <= 0:
+            return None  # SonarSlave sends 0 when there was no echo
+        age_ms = self._clock.ticks_diff(self._clock.ticks_ms(), self._sonar_ticks_ms)
+        if age_ms > self._sensor_timeout_ms:
+            return None
+        travelled = self._encoder_hal.get_distance_cm() - self._sonar_encoder_cm
+        latency_travel = self._encoder_velocity * self._sonar_latency_ms / 1000
+        return front - travelled - latency_travel
+        
     def get_fresh_sensor_data(self):
         """
         Force reading fresh sensor data and return with freshness info.
@@ -1203,7 +1534,7 @@ class RobotController:
         return {
             'data': new_data,
             'fresh': new_data != old_data,
-            'timestamp': time.time() if hasattr(time, 'time') else 0
+            'timestamp': self._clock.time()
         }
         
     # === Status and Debug Functions ===
@@ -1266,6 +1597,20 @@ class RobotController:
             return self._camera_hal.read_color()
         return None
     
+    def read_camera_detection(self):
+        """
+        Poll the camera and return the latest framed-protocol detection.
+        
+        Returns:
+            dict: Detection with color, x_offset, distance_cm, confidence,
+                  frame_id and age_ms, or None if none received (shared
+                  record, updated in place by later polls)
+        """
+        if self._camera_hal.is_initialized():
+            self._camera_hal.poll()
+            return self._camera_hal.get_detection()
+        return None
+    
     def get_camera_color(self):
         """
         Get the last detected obstacle color.
@@ -1323,6 +1668,167 @@ class RobotController:
             return self._camera_hal.wait_for_color(timeout)
         return None
     
+    def vote_camera_color(self, window_ms=400, min_samples=1, timeout=2.0):
+        """
+        Decide the obstacle color from detections gathered in the last window_ms.
+        
+        Falls back to waiting for a new reading only when the recent history
+        holds no decisive vote.
+        
+        Args:
+            window_ms: Look-back window in milliseconds
+            min_samples: Minimum detections needed for a vote
+            timeout: Maximum time to wait when there is no vote (seconds)
+            
+        Returns:
+            str: Color code or None if timeout
+        """
+        if not self._camera_hal.is_initialized():
+            return None
+            
+        self._camera_hal.update()
+        color = self._camera_hal.color_majority(window_ms, min_samples=min_samples)
+        if color is not None:
+            return color
+        return self._camera_hal.wait_for_color(timeout)
+    
+    def _record_tick(self, primitive):
+        """Append the current sensor and actuator state to the flight recorder."""
+        if not self._recorder.enabled:
+            return
+        sonar = self._last_sensor_data
+        direction = self._motor_hal.get_current_direction()
+        flags = 0
+        if direction < 0:
+            flags |= FLAG_REVERSE
+        if self._motor_hal.is_braking():
+            flags |= FLAG_BRAKING
+        color = self._camera_hal.get_color()
+        self._recorder.record(
+            sonar['left'], sonar['rear'], sonar['right'], sonar['front'],
+            self._compass_hal.get_last_heading(),
+            self._encoder_hal.get_position(),
+            self._motor_hal.get_current_speed() * direction,
+            self._servo_hal.get_target_angle(),
+            primitive,
+            flags,
+            ord(color) - 48 if color else 0
+        )
+        
+    def get_flight_recorder(self):
+        """Get the flight recorder (telemetry config controls whether it records)."""
+        return self._recorder
+        
+    def _update_pose(self):
+        """Integrate the encoder travel since the last tick into the pose (and the particles)."""
+        distance = self._encoder_hal.get_distance_cm()
+        heading = self._compass_hal.get_last_heading()
+        self._pose.update(distance, heading)
+        if self._localizer is not None:
+            self._localizer.update(distance, heading)
+        
+    def reset_pose(self, x=0.0, y=0.0, heading=None):
+        """
+        Set the dead-reckoned pose (e.g. the start position of a challenge).
+        
+        Args:
+            x, y: Position in cm
+            heading: Heading in degrees (default: last compass heading)
+        """
+        if heading is None:
+            heading = self._compass_hal.get_last_heading()
+        self._pose.reset(x, y, heading, self._encoder_hal.get_distance_cm())
+        
+    def get_pose(self):
+        """
+        Get the dead-reckoned pose.
+        
+        Returns:
+            tuple: (x, y, heading) in cm and compass degrees
+        """
+        self._update_pose()
+        return self._pose.get_pose()
+        
+    def get_pose_estimator(self):
+        """Get the pose estimator (frames and transforms)."""
+        return self._pose
+        
+    def _make_localizer(self, loc_config):
+        """Build the particle filter if localization is enabled (imported lazily to save RAM)."""
+        if not loc_config.get('enabled', False):
+            return None
+        from localizer import ParticleFilter, TrackMap
+        track = TrackMap(inner=tuple(loc_config.get('inner_walls', (100, 100, 200, 200))))
+        self._start_mat_heading = loc_config.get('start_heading', 0)
+        return ParticleFilter(track, count=loc_config.get('particles', 48),
+                              sonar_sigma=loc_config.get('sonar_sigma', 4.0),
+                              max_range=loc_config.get('max_range', 200))
+        
+    def reset_localizer(self, x=None, y=None, mat_heading=None):
+        """
+        Fix the mat frame at the current heading and restart the particle filter.
+        
+        Args:
+            x, y: Known position on the mat in cm (default: anywhere between the walls)
+            mat_heading: Mat heading the car is facing (default: localization.start_heading)
+        """
+        if self._localizer is None:
+            return
+        if mat_heading is None:
+            mat_heading = self._start_mat_heading
+        self._localizer.reset(self._compass_hal.get_heading(), x, y, mat_heading=mat_heading,
+                              distance_cm=self._encoder_hal.get_distance_cm())
+        
+    def get_location(self):
+        """
+        Get the particle filter's position on the mat.
+        
+        Returns:
+            tuple: (x, y, spread) in cm, or None if localization is disabled
+        """
+        if self._localizer is None:
+            return None
+        return self._localizer.estimate()
+        
+    def get_localizer(self):
+        """Get the particle filter (None if localization is disabled)."""
+        return self._localizer
+        
+    def _instrument_profiler(self):
+        """Time HAL reads and motion primitives when profiling is enabled."""
+        profiler = self._profiler
+        profiler.instrument(self._compass_hal, ('get_heading', 'get_relative_heading'), 'compass')
+        profiler.instrument(self._encoder_hal, ('get_distance_cm', 'get_relative_distance_cm'), 'encoder')
+        profiler.instrument(self._comm_hal, ('has_data', 'read_data'), 'sonar')
+        profiler.instrument(self._camera_hal, ('read_color', 'poll', 'get_color'), 'camera')
+        profiler.instrument(self._servo_hal, ('move',), 'servo')
+        if self._localizer is not None:
+            profiler.instrument(self._localizer, ('update',), 'localizer')
+        profiler.instrument(self, ('move_distance', 'move_lane', 'rotate_angle', '_make_corner_turn_absolute',
+                                   '_get_sensor_data', '_update_camera', '_record_tick'), 'robot')
+        
+    def get_profiler(self):
+        """Get the region profiler."""
+        return self._profiler
+        
+    def dump_profile(self, send=None):
+        """
+        Print the profile summary, or send it over a UART.
+        
+        Args:
+            send: Function sending one string, e.g. CommunicationHAL.send_message
+                (default: print to the USB console)
+        """
+        if send is None:
+            self._profiler.dump()
+        else:
+            self._profiler.dump(lambda line: send(line + '\n'))
+            
+    def _update_camera(self):
+        """Feed pending camera data into the detection history (called per control tick)."""
+        if self._camera_hal.is_initialized():
+            self._camera_hal.update()
+    
     def get_camera_statistics(self):
         """Get camera statistics."""
         if self._camera_hal.is_initialized():
@@ -1366,7 +1872,7 @@ class RobotController:
             
             # Read camera color with timeout
             print("Reading camera color for obstacle detection...")
-            color = self.wait_for_camera_color(timeout=2.0)  # Wait up to 2 seconds for color
+            color = self.vote_camera_color(timeout=2.0)  # Waits up to 2 seconds only if no recent data
             
             # Determine obstacle position based on color and direction
             if color:
@@ -1431,6 +1937,9 @@ class RobotController:
         from lane import Lane, LaneTraffic
         
         print("=== STARTING OBSTACLE CHALLENGE ===")
+        self._recorder.new_file()
+        self.reset_pose()
+        self.reset_localizer()
         
         if not self._is_initialized:
             print("ERROR: Robot not initialized!")
@@ -1471,33 +1980,31 @@ class RobotController:
         compass_offset = initial_heading + 180
         self._compass_hal.set_angle_offset(compass_offset)
         
-        # Detect direction using sonar
+        # Detect direction using sonar while backing up: parked against the outer wall,
+        # so the nearer wall is outside
         print("Detecting track direction...")
-        sensor_data = self._get_sensor_data()
-        left_distance = sensor_data.get('left', 0)
-        right_distance = sensor_data.get('right', 0)
-        
-        clockwise = left_distance < right_distance
-        side_sonar = 'left' if clockwise else 'right'
-        
-        print(f"Direction detected: {'CLOCKWISE' if clockwise else 'ANTICLOCKWISE'}")
-        print(f"Following {side_sonar} wall")
+        self._direction.start(wall_offset=True)
         
         try:
-            # Exit parking area
+            # Exit parking area (backing up does not depend on the direction)
             print("Exiting parking area...")
             self.move_lane(
                 relative=True,
-                clockwise=clockwise,
                 use_compass=True,
                 lock_compass_heading=True,
                 until_rear_distance=4
             )
+            
+            clockwise = self._detect_direction()
+            side_sonar = 'left' if clockwise else 'right'
+            print(f"Direction detected: {'CLOCKWISE' if clockwise else 'ANTICLOCKWISE'}")
+            print(f"Following {side_sonar} wall")
+            
             self.rotate_angle(25 if clockwise else -70)
             
             # Check initial lane alignment using camera
             print("Reading camera color for initial lane alignment...")
-            time.sleep(2)
+            self._clock.sleep(2)
             initial_color = self.wait_for_camera_color(timeout=60)
             
             previous_lane_alignment = False
@@ -1626,7 +2133,7 @@ class RobotController:
                     
                     # Detect final position using camera
                     print("Reading camera color for final position detection...")
-                    final_color = self.wait_for_camera_color(timeout=2.0)
+                    final_color = self.vote_camera_color(timeout=2.0)
                     
                     if final_color:
                         color_name = self.get_camera_color_name(final_color)
@@ -1796,4 +2303,5 @@ class RobotController:
             print(f"Obstacle challenge failed: {e}")
             return False
         finally:
-            self.stop()
\ No newline at end of file
+            self.stop()
+            self._recorder.flush(force=True)
\ No newline at end of file
@@ -6,6 +6,7 @@ This script tests the obstacle challenge functionality without requiring hardwar
 import sys
 import time
 from lane import Lane, LaneTraffic
+from direction_detector import DirectionDetector
 
 
 def test_lane_classes():
@@ -101,12 +102,26 @@ def test_direction_detection():
     print(f"Left distance: {left_distance}cm")
     print(f"Right distance: {right_distance}cm")
     
-    # Test direction detection
-    clockwise = left_distance < right_distance
+    # Test direction detection: feed packets until the sequential test decides
+    detector = DirectionDetector()
+    detector.start(wall_offset=True)
+    packets = 0
+    while detector.decision is None and packets < 20:
+        detector.add(left_distance, right_distance)
+        packets += 1
+    clockwise = detector.decision
     side_sonar = 'left' if clockwise else 'right'
     
-    print(f"Direction: {'CLOCKWISE' if clockwise else 'ANTICLOCKWISE'}")
+    print(f"Direction: {'CLOCKWISE' if clockwise else 'ANTICLOCKWISE'} "
+          f"after {packets} packets (confidence {detector.confidence:.3f})")
     print(f"Following {side_sonar} wall")
+    assert clockwise is True
+    
+    # A corner opening on the left decides anticlockwise
+    detector.start()
+    for _ in range(3):
+        detector.add(240, 40)
+    assert detector.decision is False
     
     print("✅ Direction detection test passed!\n")
 
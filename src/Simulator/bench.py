@@ -0,0 +1,223 @@
+"""
+Micro-benchmarks of the Main controller's per-tick hot paths.
+
+Runs under CPython and the MicroPython unix port against a fake `machine`
+module, and compares ns/op and allocations/op with a stored baseline.
+
+Usage:
+    python bench.py                      # compare with benchmarks/baseline.json
+    python bench.py --save               # store the current results as baseline
+    micropython bench.py --filter config --tolerance 0.5
+
+Options:
+    --baseline PATH   Baseline file (default benchmarks/baseline.json)
+    --save            Write this interpreter's results to the baseline
+    --tolerance X     Allowed slowdown as a fraction (default 0.3)
+    --filter TEXT     Only run cases whose name contains TEXT
+    --time S          Target measuring time per run in seconds (default 0.2)
+
+Exits with 1 if a case is slower than the baseline by more than the
+tolerance, allocates more than it, or has no baseline for this interpreter.
+"""
+
+import gc
+import json
+import sys
+import time
+
+from benchmarks.cases import build_cases
+
+IMPLEMENTATION = sys.implementation.name
+MICROPYTHON = IMPLEMENTATION == 'micropython'
+
+# Allocation bytes per op tolerated above the baseline
+ALLOC_SLACK = 8
+
+
+def _script_dir():
+    path = __file__.replace('\\', '/')
+    return path.rsplit('/', 1)[0] if '/' in path else '.'
+
+
+if MICROPYTHON:
+    def _start():
+        return time.ticks_us()
+
+    def _elapsed_ns(start):
+        return time.ticks_diff(time.ticks_us(), start) * 1000
+else:
+    def _start():
+        return time.perf_counter_ns()
+
+    def _elapsed_ns(start):
+        return time.perf_counter_ns() - start
+
+
+def measure_time(case, target_ns, repeat=5):
+    """
+    Time a case.
+
+    The call count is doubled until one run lasts target_ns; the fastest of
+    `repeat` runs is reported.
+
+    Returns:
+        float: Nanoseconds per operation
+    """
+    calls = 1
+    while True:
+        start = _start()
+        for _ in range(calls):
+            case()
+        if _elapsed_ns(start) >= target_ns or calls >= 1 << 20:
+            break
+        calls *= 2
+
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        ops = 0
+        start = _start()
+        for _ in range(calls):
+            ops += case()
+        per_op = _elapsed_ns(start) / ops
+        if best is None or per_op < best:
+            best = per_op
+    return best
+
+
+def measure_alloc(case, calls=64):
+    """
+    Heap bytes allocated per operation.
+
+    MicroPython: bytes allocated with the GC disabled (gc.mem_alloc).
+    CPython: smallest peak of traced bytes over a few calls (tracemalloc);
+    not comparable with MicroPython numbers.
+
+    Returns:
+        float: Bytes per operation
+    """
+    case()  # Warm caches and lazy attributes
+    if MICROPYTHON:
+        gc.collect()
+        gc.disable()
+        try:
+            before = gc.mem_alloc()
+            ops = 0
+            for _ in range(calls):
+                ops += case()
+            return (gc.mem_alloc() - before) / ops
+        finally:
+            gc.enable()
+
+    import tracemalloc
+    tracemalloc.start()
+    try:
+        best = None
+        for _ in range(5):
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+            ops = case()
+            per_op = (tracemalloc.get_traced_memory()[1] - base) / ops
+            if best is None or per_op < best:
+                best = per_op
+        return best
+    finally:
+        tracemalloc.stop()
+
+
+def load_baseline(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_baseline(path, baseline, results):
+    baseline[IMPLEMENTATION] = {name: {'ns_per_op': round(ns, 1), 'alloc_per_op': round(alloc, 1)}
+                                for name, ns, alloc in results}
+    with open(path, 'w') as f:
+        if MICROPYTHON:
+            json.dump(baseline, f)
+        else:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write('\n')
+
+
+def parse_args(argv):
+    options = {
+        'baseline': _script_dir() + '/benchmarks/baseline.json',
+        'save': False,
+        'tolerance': 0.3,
+        'filter': '',
+        'time': 0.2
+    }
+    i = 0
+    while i < len(argv):
+        arg = argv[i]
+        if arg == '--save':
+            options['save'] = True
+        elif arg in ('--baseline', '--tolerance', '--filter', '--time') and i + 1 < len(argv):
+            value = argv[i + 1]
+            key = arg[2:]
+            options[key] = value if key in ('baseline', 'filter') else float(value)
+            i += 1
+        else:
+            print(__doc__)
+            raise SystemExit(2)
+        i += 1
+    return options
+
+
+def main(argv):
+    options = parse_args(argv)
+    baseline = load_baseline(options['baseline'])
+    reference = baseline.get(IMPLEMENTATION, {})
+
+    cases = build_cases(_script_dir() + '/../Main')
+
+    # str.format keeps the report working on MicroPython's f-string subset
+    print("{} {}".format(IMPLEMENTATION, sys.version.split()[0]))
+    print("{:28s} {:>10s} {:>10s} {:>10s} {:>8s}".format('case', 'ns/op', 'alloc/op', 'baseline', 'change'))
+
+    results = []
+    regressions = 0
+    for name, case in cases:
+        if options['filter'] not in name:
+            continue
+        ns = measure_time(case, options['time'] * 1e9)
+        alloc = measure_alloc(case)
+        results.append((name, ns, alloc))
+
+        base = reference.get(name)
+        status = ''
+        if base:
+            change = ns / base['ns_per_op'] - 1
+            base_text = "{:10.0f}".format(base['ns_per_op'])
+            change_text = "{:+7.1f}%".format(change * 100)
+            if change > options['tolerance']:
+                status = ' SLOWER'
+            if alloc > base['alloc_per_op'] + ALLOC_SLACK:
+                status += ' ALLOC'
+        else:
+            base_text = "{:>10s}".format('-')
+            change_text = "{:>8s}".format('-')
+            status = ' NO BASELINE'
+        if status:
+            regressions += 1
+        print("{:28s} {:10.0f} {:10.1f} {} {}{}".format(name, ns, alloc, base_text, change_text, status))
+
+    if options['save']:
+        save_baseline(options['baseline'], baseline, results)
+        print("Baseline saved to " + options['baseline'])
+    elif not reference:
+        print("No {} baseline in {}; record one with --save".format(IMPLEMENTATION, options['baseline']))
+        return 1
+    elif regressions:
+        print("{} case(s) regressed or have no baseline in {}".format(regressions, options['baseline']))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
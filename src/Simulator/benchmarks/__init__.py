@@ -0,0 +1,3 @@
+"""
+Hot-path micro-benchmarks for the Main controller (CPython and MicroPython).
+"""
@@ -0,0 +1,157 @@
+"""
+Benchmark Cases
+Per-tick hot paths of the Main controller, set up against the fake
+`machine` module and a virtual clock. Each case is a zero-argument callable
+that returns the number of operations it performed.
+"""
+
+import sys
+
+from . import fake_machine
+
+SONAR_PACKET = bytes((30, 100, 60, 150))   # left, rear, right, front
+CAMERA_BYTE = b'3'
+EDGES_PER_TICK = 34                        # ~0.5 cm per control tick
+
+
+class FakeClock:
+    """Clock service with virtual time; sleeps advance it and run a hook."""
+
+    def __init__(self):
+        self.us = 0
+        self.on_sleep = None
+        self.ticks = 0
+
+    def monotonic_us(self):
+        # Reads advance time slightly so polling loops terminate
+        self.us += 1
+        return self.us
+
+    def time(self):
+        return self.monotonic_us() / 1000000
+
+    def ticks_ms(self):
+        return self.monotonic_us() // 1000
+
+    def ticks_us(self):
+        return self.monotonic_us()
+
+    def ticks_diff(self, new, old):
+        return new - old
+
+    def ticks_add(self, ticks, delta):
+        return ticks + delta
+
+    def sleep(self, seconds):
+        if seconds == 0.01:
+            self.ticks += 1  # One control-loop period
+        self.us += int(seconds * 1000000) or 100
+        if self.on_sleep is not None:
+            self.on_sleep()
+
+    def sleep_ms(self, ms):
+        self.sleep(ms / 1000)
+
+    def sleep_us(self, us):
+        self.sleep(us / 1000000)
+
+    def yield_now(self):
+        self.sleep(0)
+
+
+def install(main_dir):
+    """Route `import machine` to the fake module and make src/Main importable."""
+    sys.modules['machine'] = fake_machine
+    if main_dir not in sys.path:
+        sys.path.insert(0, main_dir)
+
+
+def make_robot(main_dir):
+    """Create an initialized RobotController on the fake board."""
+    install(main_dir)
+    from config import RobotConfig
+    from robot_controller import RobotController
+
+    clock = FakeClock()
+    robot = RobotController(RobotConfig(), clock=clock)
+    robot.initialize()
+    return robot, clock
+
+
+def build_cases(main_dir):
+    """
+    Build the benchmark cases.
+
+    Args:
+        main_dir: Path of src/Main
+
+    Returns:
+        list: (name, callable) pairs in report order
+    """
+    robot, clock = make_robot(main_dir)
+    config = robot._config
+    compass = robot._compass_hal
+    servo = robot._servo_hal
+    camera = robot._camera_hal
+    sonar_uart = config.get('hardware.communication.uart_id', 0)
+    camera_uart = config.get('hardware.camera.uart_id', 1)
+    encoder_pin = config.get('hardware.encoder.pin_a', 7)
+
+    def control_tick():
+        fake_machine.feed_uart(sonar_uart, SONAR_PACKET)
+        fake_machine.fire_edges(encoder_pin, EDGES_PER_TICK)
+
+    def move_lane():
+        clock.on_sleep = control_tick
+        start = clock.ticks
+        robot.move_lane(target_cm=20, use_sonar=True, use_compass=True)
+        clock.on_sleep = None
+        return clock.ticks - start
+
+    def get_sensor_data():
+        fake_machine.feed_uart(sonar_uart, SONAR_PACKET)
+        robot._get_sensor_data()
+        return 1
+
+    def relative_heading():
+        compass.get_relative_heading()
+        return 1
+
+    def angle_to_duty():
+        servo._angle_to_u16_duty(95.5)
+        return 1
+
+    def record_servo_command():
+        servo._record_command(clock.ticks, 91, 95.5)
+        return 1
+
+    def config_get():
+        config.get('navigation.wall_distance')
+        return 1
+
+    def read_color():
+        fake_machine.feed_uart(camera_uart, CAMERA_BYTE)
+        camera.read_color()
+        return 1
+
+    from localizer import ParticleFilter
+    localizer = ParticleFilter(count=config.get('localization.particles', 48), seed=1)
+    localizer.reset(0.0, 150.0, 50.0, mat_heading=270.0, distance_cm=0.0)
+    odometry = [0.0]
+
+    def localizer_update():
+        # One sonar packet after half a centimetre of travel (back and forth, so the car stays put)
+        odometry[0] = 0.5 - odometry[0]
+        localizer.update(odometry[0], 0.0, (50, 100, 50, 100))
+        return 1
+
+    return [
+        ('move_lane_iteration', move_lane),
+        ('get_sensor_data', get_sensor_data),
+        ('compass_relative_heading', relative_heading),
+        ('servo_angle_to_duty', angle_to_duty),
+        ('servo_record_command', record_servo_command),
+        ('config_get', config_get),
+        ('camera_read_color', read_color),
+        ('localizer_update', localizer_update)
+    ]
@@ -0,0 +1,153 @@
+"""
+Fake `machine` Module for Benchmarks
+Minimal Pin, PWM, UART and I2C stand-ins with canned data, so the HAL runs
+under CPython and the MicroPython unix port without a board or the
+simulator.
+
+Peripherals register themselves here; benchmark cases feed UART bytes and
+encoder edges through the module-level helpers.
+"""
+
+pins = {}
+uarts = {}
+pwms = {}
+
+# CMPS12 bearing returned by every I2C register read (0.1 degree units)
+bearing = 900
+
+
+class Pin:
+    IN = 0
+    OUT = 1
+    OPEN_DRAIN = 2
+    PULL_UP = 1
+    PULL_DOWN = 2
+    IRQ_RISING = 4
+    IRQ_FALLING = 8
+
+    def __init__(self, id, mode=-1, pull=-1, value=None):
+        self.id = id
+        self._value = 1 if pull == Pin.PULL_UP else 0
+        if value is not None:
+            self._value = 1 if value else 0
+        self.handler = None
+        pins[id] = self
+
+    def value(self, value=None):
+        if value is None:
+            return self._value
+        self._value = 1 if value else 0
+        return None
+
+    def __call__(self, value=None):
+        return self.value(value)
+
+    def on(self):
+        self._value = 1
+
+    def off(self):
+        self._value = 0
+
+    def irq(self, handler=None, trigger=0, **kwargs):
+        self.handler = handler
+
+
+class PWM:
+    def __init__(self, pin, freq=None, duty_u16=None):
+        self.pin = pin
+        self._freq = freq or 0
+        self._duty = duty_u16 or 0
+        pwms[pin.id] = self
+
+    def freq(self, value=None):
+        if value is None:
+            return self._freq
+        self._freq = value
+        return None
+
+    def duty_u16(self, value=None):
+        if value is None:
+            return self._duty
+        self._duty = int(value)
+        return None
+
+    def deinit(self):
+        self._duty = 0
+
+
+class UART:
+    def __init__(self, id, baudrate=9600, tx=None, rx=None, **kwargs):
+        self.id = id
+        self.rx = bytearray()
+        uarts[id] = self
+
+    def init(self, baudrate=9600, **kwargs):
+        pass
+
+    def any(self):
+        return len(self.rx)
+
+    def read(self, nbytes=None):
+        rx = self.rx
+        if not rx:
+            return None
+        if nbytes is None or nbytes > len(rx):
+            nbytes = len(rx)
+        data = bytes(rx[:nbytes])
+        self.rx = rx[nbytes:]
+        return data
+
+    def readinto(self, buf, nbytes=None):
+        rx = self.rx
+        if not rx:
+            return None
+        if nbytes is None:
+            nbytes = len(buf)
+        nbytes = min(nbytes, len(buf), len(rx))
+        buf[:nbytes] = rx[:nbytes]
+        self.rx = rx[nbytes:]
+        return nbytes
+
+    def write(self, data):
+        return len(data)
+
+    def deinit(self):
+        pass
+
+
+class I2C:
+    def __init__(self, id, scl=None, sda=None, freq=400000):
+        self.id = id
+
+    def scan(self):
+        return [0x60]
+
+    def readfrom_mem(self, addr, memaddr, nbytes, **kwargs):
+        return bytes((bearing >> 8, bearing & 0xFF))[:nbytes]
+
+    def writeto_mem(self, addr, memaddr, buf, **kwargs):
+        pass
+
+
+def time_pulse_us(pin, pulse_level, timeout_us=1000000):
+    return -1
+
+
+# === Feeding helpers used by benchmark cases ===
+
+def feed_uart(uart_id, data):
+    """Queue receive bytes on a UART."""
+    uart = uarts.get(uart_id)
+    if uart is not None:
+        uart.rx.extend(data)
+
+
+def fire_edges(pin_id, count):
+    """Toggle a pin and call its IRQ handler once per edge."""
+    pin = pins.get(pin_id)
+    if pin is None:
+        return
+    for _ in range(count):
+        pin._value ^= 1
+        if pin.handler is not None:
+            pin.handler(pin)
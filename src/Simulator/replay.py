@@ -0,0 +1,81 @@
+"""
+Replay a recorded flight log through the Main controller and diff its commands.
+
+Usage:
+    python replay.py logs/flight_0003.bin
+    python replay.py logs/ --challenge obstacle --speed 1 --set navigation.wall_distance=40
+    python replay.py logs/flight_0003.bin --config robot_config.json --json
+
+Exits with 1 if the replayed commands diverge from the recorded ones.
+"""
+
+import argparse
+import json
+import sys
+
+from sim import run_replay
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a flight log and diff the controller commands")
+    parser.add_argument('log', nargs='+', help="Flight log files, directories or glob patterns")
+    parser.add_argument('--challenge', choices=['open', 'obstacle'], default='open')
+    parser.add_argument('--config', default=None, help="RobotConfig JSON the car was running")
+    parser.add_argument('--set', action='append', default=[], metavar='KEY=VALUE',
+                        help="RobotConfig override, e.g. navigation.wall_distance=40 (repeatable)")
+    parser.add_argument('--speed', type=float, default=None,
+                        help="Playback speed as a multiple of real time (default: as fast as possible)")
+    parser.add_argument('--speed-tolerance', type=float, default=0.05, help="Allowed speed difference (duty)")
+    parser.add_argument('--servo-tolerance', type=float, default=2.0, help="Allowed servo difference (degrees)")
+    parser.add_argument('--time-tolerance', type=float, default=0.05,
+                        help="Seconds a command may be early or late")
+    parser.add_argument('--verbose', action='store_true', help="Print controller output while replaying")
+    parser.add_argument('--json', action='store_true', help="Print the result as JSON")
+    args = parser.parse_args()
+
+    overrides = {}
+    if args.config:
+        with open(args.config) as f:
+            overrides.update(_flatten(json.load(f)))
+    for item in args.set:
+        key, _, value = item.partition('=')
+        try:
+            overrides[key] = json.loads(value)
+        except ValueError:
+            overrides[key] = value
+
+    result = run_replay(
+        args.log,
+        challenge=args.challenge,
+        config_overrides=overrides,
+        realtime_factor=args.speed,
+        speed_tolerance=args.speed_tolerance,
+        servo_tolerance=args.servo_tolerance,
+        time_tolerance=args.time_tolerance,
+        quiet=not args.verbose
+    )
+
+    if args.json:
+        print(json.dumps(result.as_dict()))
+    else:
+        for key, value in result.as_dict().items():
+            print(f"{key:20s} {value}")
+        print(f"{'speedup':20s} {result.speedup:.1f}x")
+
+    return 0 if result.matched else 1
+
+
+def _flatten(tree, prefix=''):
+    """Turn a nested config dict into dotted-path overrides."""
+    flat = {}
+    for key, value in tree.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(_flatten(value, path + '.'))
+        else:
+            flat[path] = value
+    return flat
+
+
+if __name__ == "__main__":
+    sys.exit(main())
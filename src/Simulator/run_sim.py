@@ -0,0 +1,67 @@
+"""
+Run a challenge of the Main controller in the host simulator.
+
+Usage:
+    python run_sim.py --challenge open
+    python run_sim.py --challenge obstacle --anticlockwise --seed 3 --verbose
+"""
+
+import argparse
+import json
+import sys
+
+from sim import run_challenge, CarModel
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate a WRO challenge with the unmodified Main controller")
+    parser.add_argument('--challenge', choices=['open', 'obstacle'], default='open')
+    parser.add_argument('--anticlockwise', action='store_true', help="Start facing the anticlockwise direction")
+    parser.add_argument('--seed', type=int, default=0, help="Pillar layout and sensor noise seed")
+    parser.add_argument('--time-limit', type=float, default=240.0, help="Virtual seconds before aborting")
+    parser.add_argument('--set', action='append', default=[], metavar='KEY=VALUE',
+                        help="RobotConfig override, e.g. navigation.wall_distance=40 (repeatable)")
+    parser.add_argument('--steer-gain', type=float, default=None, help="Wheel degrees per servo degree")
+    parser.add_argument('--top-speed', type=float, default=None, help="Speed at full duty in cm/s")
+    parser.add_argument('--physics-dt', type=float, default=0.001, help="Physics step in seconds")
+    parser.add_argument('--verbose', action='store_true', help="Print controller output while running")
+    parser.add_argument('--json', action='store_true', help="Print the result as JSON")
+    args = parser.parse_args()
+
+    overrides = {}
+    for item in args.set:
+        key, _, value = item.partition('=')
+        try:
+            overrides[key] = json.loads(value)
+        except ValueError:
+            overrides[key] = value
+
+    car_kwargs = {}
+    if args.steer_gain is not None:
+        car_kwargs['steer_gain'] = args.steer_gain
+    if args.top_speed is not None:
+        car_kwargs['top_speed'] = args.top_speed
+
+    result = run_challenge(
+        args.challenge,
+        clockwise=not args.anticlockwise,
+        config_overrides=overrides,
+        car=CarModel(**car_kwargs),
+        seed=args.seed,
+        time_limit=args.time_limit,
+        quiet=not args.verbose,
+        sim_options={'physics_dt': args.physics_dt}
+    )
+
+    if args.json:
+        print(json.dumps(result.as_dict()))
+    else:
+        for key, value in result.as_dict().items():
+            print(f"{key:16s} {value}")
+        print(f"{'speedup':16s} {result.speedup:.1f}x")
+
+    return 0 if result.success else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
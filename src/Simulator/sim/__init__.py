@@ -0,0 +1,44 @@
+"""
+Host Simulator for the Main Controller
+Runs src/Main unmodified on CPython against a simulated car and WRO mat.
+"""
+
+from .world import Mat, Pillar, Segment, RED, GREEN
+from .board import Board
+from .simulation import Simulation, CarModel
+from .clock import VirtualClock, SimulationTimeout
+from .harness import run_challenge, make_config, random_layout, start_pose, SimResult
+from .flight_log import load_flight_log, iter_records, FlightLogError
+from .replay import run_replay, load_records, ReplayBoard, ReplayResult, ReplayFinished
+from .tuning import Tuner, Score, Parameter, DEFAULT_SPACE, parse_parameter
+
+__all__ = [
+    'Mat',
+    'Pillar',
+    'Segment',
+    'RED',
+    'GREEN',
+    'Board',
+    'Simulation',
+    'CarModel',
+    'VirtualClock',
+    'SimulationTimeout',
+    'run_challenge',
+    'make_config',
+    'random_layout',
+    'start_pose',
+    'SimResult',
+    'load_flight_log',
+    'iter_records',
+    'FlightLogError',
+    'run_replay',
+    'load_records',
+    'ReplayBoard',
+    'ReplayResult',
+    'ReplayFinished',
+    'Tuner',
+    'Score',
+    'Parameter',
+    'DEFAULT_SPACE',
+    'parse_parameter'
+]
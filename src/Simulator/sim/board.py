@@ -0,0 +1,216 @@
+"""
+Simulated Board
+Pin, PWM, UART and I2C state behind the simulated `machine` module, plus
+helpers that read the commands the controller is driving into them. Both the
+physics simulation and log replay are boards.
+"""
+
+
+class PinState:
+    """Shared state behind simulated Pin objects."""
+
+    def __init__(self):
+        self.value = 0
+        self.driven = None
+        self.irq_handler = None
+        self.irq_trigger = 0
+        self.irq_pin = None
+
+
+class PWMState:
+    """Shared state behind simulated PWM objects."""
+
+    def __init__(self):
+        self.freq = 0
+        self.duty = 0
+
+
+class UARTChannel:
+    """Byte queues of one simulated UART."""
+
+    def __init__(self):
+        self.baudrate = 9600
+        self.rx = bytearray()
+        self.tx = bytearray()
+
+
+class CompassDevice:
+    """CMPS12 register model: bearing at register 0x02 as 0-3599."""
+
+    def __init__(self, board):
+        self._board = board
+
+    def read_mem(self, reg, nbytes):
+        if reg == 0x02:
+            raw = int(round(self._board.compass_bearing() * 10)) % 3600
+            return bytes([raw >> 8, raw & 0xFF])[:nbytes]
+        return bytes(nbytes)
+
+    def write_mem(self, reg, buf):
+        pass
+
+
+class Board:
+    """Peripheral state wired like the car; subclasses implement _step()."""
+
+    # Virtual time charged per peripheral access, so busy loops make progress
+    ACCESS_COST = {
+        'i2c': 0.0004,
+        'uart': 0.00002
+    }
+
+    def __init__(self, config, physics_dt=0.001):
+        """
+        Initialize the board.
+
+        Args:
+            config: RobotConfig used by the controller (pin numbers, servo mapping...)
+            physics_dt: Time step in seconds
+        """
+        self.config = config
+        self.physics_dt = physics_dt
+        self.time = 0.0
+        self._pending_cost = 0.0
+
+        self._pins = {}
+        self._pwms = {}
+        self._uarts = {}
+        self._i2c = {}
+
+        compass = config.get_hardware_config('compass')
+        self.i2c_bus(compass.get('i2c_id', 1))[compass.get('addr') or 0x60] = CompassDevice(self)
+
+        # Wiring and servo mapping are read once; steps run every millisecond
+        motor = config.get_hardware_config('motor')
+        self._motor_pins = (self.pin_state(motor.get('dir_pin1', 1)), self.pin_state(motor.get('dir_pin2', 2)),
+                            self.pwm_state(motor.get('pwm_pin', 0)))
+        servo = config.get_hardware_config('servo')
+        self._servo_pwm = self.pwm_state(servo.get('pin', 3))
+        self._servo_center = servo.get('center_steering', 91)
+        self._servo_map = (servo.get('center_steering', 91) - servo.get('max_steering_offset', 11),
+                           servo.get('min_u16_duty', 1802),
+                           2 * servo.get('max_steering_offset', 11) /
+                           (servo.get('max_u16_duty', 7864) - servo.get('min_u16_duty', 1802)))
+        encoder = config.get_hardware_config('encoder')
+        self._encoder_pin = self.pin_state(encoder.get('pin_a', 7))
+        self._steps_per_cm = encoder.get('steps_per_cm', 67.28)
+        self._sonar_channel = self.uart_channel(config.get_hardware_config('communication').get('uart_id', 0))
+        self._camera_config = config.get_hardware_config('camera')
+        self._camera_channel = self.uart_channel(self._camera_config.get('uart_id', 1))
+        self._camera_frame_id = 0
+
+    # === Interface used by the simulated machine module ===
+
+    def pin_state(self, pin_id):
+        if pin_id not in self._pins:
+            self._pins[pin_id] = PinState()
+        return self._pins[pin_id]
+
+    def pwm_state(self, pin_id):
+        if pin_id not in self._pwms:
+            self._pwms[pin_id] = PWMState()
+        return self._pwms[pin_id]
+
+    def uart_channel(self, uart_id):
+        if uart_id not in self._uarts:
+            self._uarts[uart_id] = UARTChannel()
+        return self._uarts[uart_id]
+
+    def i2c_bus(self, bus_id):
+        if bus_id not in self._i2c:
+            self._i2c[bus_id] = {}
+        return self._i2c[bus_id]
+
+    def charge_access(self, kind):
+        """Charge virtual time for a peripheral access."""
+        self._pending_cost += self.ACCESS_COST.get(kind, 0.0)
+        if self._pending_cost >= self.physics_dt:
+            cost = self._pending_cost
+            self._pending_cost = 0.0
+            self.advance(cost)
+
+    # === Time ===
+
+    def advance(self, seconds):
+        """Advance the board by a duration in fixed steps."""
+        end = self.time + seconds
+        while self.time + self.physics_dt <= end + 1e-12:
+            self._step(self.physics_dt)
+        remainder = end - self.time
+        if remainder > 1e-9:
+            self._step(remainder)
+
+    def _step(self, dt):
+        raise NotImplementedError("Subclasses must implement _step()")
+
+    def compass_bearing(self):
+        """Bearing reported by the CMPS12 in degrees."""
+        raise NotImplementedError("Subclasses must implement compass_bearing()")
+
+    # === Commands driven by the controller ===
+
+    def commanded_speed(self):
+        """
+        Motor command read back from the H-bridge pins and PWM.
+
+        Returns:
+            float: Duty cycle, negative when reversing, 0 when stopped or braking
+        """
+        dir1_pin, dir2_pin, pwm = self._motor_pins
+        if dir1_pin.value == dir2_pin.value:
+            return 0.0
+        duty = pwm.duty / 65535
+        return duty if dir2_pin.value else -duty
+
+    def commanded_servo_angle(self):
+        """
+        Servo command read back from its PWM duty.
+
+        Returns:
+            float: Angle in degrees, or None before the servo is driven
+        """
+        duty = self._servo_pwm.duty
+        if duty <= 0:
+            return None
+        low_angle, min_duty, scale = self._servo_map
+        return low_angle + (duty - min_duty) * scale
+
+    # === Sensor outputs ===
+
+    def emit_encoder_edges(self, edges):
+        """Toggle the encoder A pin and fire its IRQ handler once per edge."""
+        pin = self._encoder_pin
+        pin.driven = True
+        for _ in range(edges):
+            pin.value = 0 if pin.value else 1
+            if pin.irq_handler is not None:
+                pin.irq_handler(pin.irq_pin)
+
+    def emit_sonar_packet(self, left, rear, right, front):
+        """Queue one SonarSlave packet on the communication UART."""
+        self._sonar_channel.rx.extend(bytes((left, rear, right, front)))
+
+    def emit_camera(self, color_byte, x_offset=0, distance_mm=0, confidence=0, fps=30.0):
+        """
+        Queue one camera detection in the configured protocol.
+
+        Args:
+            color_byte: 1 = red, 2 = green, 3 = unknown
+            x_offset: Horizontal offset (-100 to 100, framed protocol only)
+            distance_mm: Distance estimate (framed protocol only)
+            confidence: Detection confidence 0-255 (framed protocol only)
+            fps: Detection rate of the framed protocol
+
+        Returns:
+            float: Seconds until the link can carry the next detection
+        """
+        camera = self._camera_config
+        baudrate = camera.get('baudrate', 50)
+        if camera.get('protocol', 'ascii') == 'framed':
+            from hal.camera_hal import CameraHAL
+            self._camera_channel.rx.extend(CameraHAL.encode_frame(
+                self._camera_frame_id, str(color_byte), x_offset, distance_mm, confidence))
+            self._camera_frame_id += 1
+            return max(1.0 / fps, 90.0 / baudrate)
+        self._camera_channel.rx.append(48 + color_byte)
+        return 10.0 / baudrate
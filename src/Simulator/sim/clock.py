@@ -0,0 +1,75 @@
+"""
+Virtual Time
+A clock with the interface of the Main `hal.clock.Clock` service whose
+sleeps advance the simulation, so runs are deterministic and faster than
+real time.
+"""
+
+
+class SimulationTimeout(BaseException):
+    """Raised from a sleep when the virtual time limit is reached.
+
+    Derives from BaseException so the controller's `except Exception`
+    handlers do not swallow it.
+    """
+
+
+class VirtualClock:
+    """Clock whose sleeps advance the simulation instead of waiting."""
+
+    def __init__(self, simulation, time_limit=None):
+        """
+        Initialize the virtual clock.
+
+        Args:
+            simulation: Simulation to advance
+            time_limit: Virtual seconds after which SimulationTimeout is raised
+        """
+        self._sim = simulation
+        self.time_limit = time_limit
+
+    def now(self):
+        """Virtual time in seconds."""
+        return self._sim.time
+
+    def monotonic_us(self):
+        """Virtual time in microseconds."""
+        return int(self._sim.time * 1000000)
+
+    def sleep(self, seconds):
+        """Advance the simulation by a duration."""
+        if seconds > 0:
+            self._sim.advance(seconds)
+        else:
+            self._sim.advance(self._sim.physics_dt / 10)
+        if self.time_limit is not None and self._sim.time >= self.time_limit:
+            raise SimulationTimeout(f"Virtual time limit of {self.time_limit}s reached")
+
+    def yield_now(self):
+        """Let the simulation run for a moment, like an interrupt window."""
+        self.sleep(0)
+
+    # Clock service API
+
+    def time(self):
+        return self._sim.time
+
+    def ticks_ms(self):
+        return int(self._sim.time * 1000)
+
+    def ticks_us(self):
+        return int(self._sim.time * 1000000)
+
+    @staticmethod
+    def ticks_diff(new, old):
+        return new - old
+
+    @staticmethod
+    def ticks_add(ticks, delta):
+        return ticks + delta
+
+    def sleep_ms(self, ms):
+        self.sleep(ms / 1000)
+
+    def sleep_us(self, us):
+        self.sleep(us / 1000000)
@@ -0,0 +1,210 @@
+"""
+Flight Log Decoder
+Loads flight recorder files written by `src/Main/flight_recorder.py` into
+NumPy structured arrays. The record layout is read from each file header.
+
+Usage:
+    python -m sim.flight_log logs/flight_0003.bin
+"""
+
+import glob
+import os
+import struct
+import sys
+
+MAGIC = b'WFR1'
+HEADER_FORMAT = '<4sHHH'
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+
+# Fixed-point fields and the factor that converts them to physical units
+SCALES = {
+    'heading': 0.1,     # degrees
+    'speed': 0.0001,    # signed duty
+    'servo': 0.1        # degrees
+}
+
+PRIMITIVE_NAMES = {
+    0: 'none',
+    1: 'move_distance',
+    2: 'move_lane',
+    3: 'rotate',
+    4: 'corner_turn'
+}
+
+_NUMPY_CODES = {
+    'b': 'i1', 'B': 'u1', 'h': 'i2', 'H': 'u2', 'i': 'i4', 'I': 'u4',
+    'l': 'i4', 'L': 'u4', 'q': 'i8', 'Q': 'u8', 'f': 'f4', 'd': 'f8'
+}
+
+
+class FlightLogError(ValueError):
+    """Raised for files that are not flight recorder logs."""
+
+
+def read_header(f):
+    """
+    Read a flight log header.
+
+    Args:
+        f: Binary file positioned at the start
+
+    Returns:
+        (record_format, field_names)
+    """
+    raw = f.read(HEADER_SIZE)
+    if len(raw) < HEADER_SIZE:
+        raise FlightLogError("File too short for a flight log header")
+    magic, record_size, fmt_len, names_len = struct.unpack(HEADER_FORMAT, raw)
+    if magic != MAGIC:
+        raise FlightLogError(f"Bad magic {magic!r}")
+    record_format = f.read(fmt_len).decode()
+    names = tuple(f.read(names_len).decode().split(','))
+    if struct.calcsize(record_format) != record_size:
+        raise FlightLogError("Record size does not match record format")
+    return record_format, names
+
+
+def _expand_format(record_format):
+    """Split a struct format into (byte order, [single-value codes])."""
+    order = record_format[0] if record_format[0] in '<>=!@' else '<'
+    body = record_format[1:] if record_format[0] in '<>=!@' else record_format
+    codes = []
+    count = ''
+    for ch in body:
+        if ch.isdigit():
+            count += ch
+        else:
+            codes.extend(ch * int(count or 1))
+            count = ''
+    return order, codes
+
+
+def record_dtype(record_format, names):
+    """
+    Build the NumPy structured dtype for a record format.
+
+    Returns:
+        numpy.dtype
+    """
+    import numpy as np
+
+    order, codes = _expand_format(record_format)
+    if len(codes) != len(names):
+        raise FlightLogError("Field names do not match record format")
+    byte_order = '>' if order in '>!' else '<'
+    return np.dtype([(name, byte_order + _NUMPY_CODES[code]) for name, code in zip(names, codes)])
+
+
+def _expand_paths(paths):
+    if isinstance(paths, (str, os.PathLike)):
+        paths = [paths]
+    files = []
+    for path in paths:
+        path = os.fspath(path)
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, 'flight_*.bin'))))
+        else:
+            files.extend(sorted(glob.glob(path)) or [path])
+    return files
+
+
+def load_flight_log(paths, scaled=True):
+    """
+    Load one or more flight log files into a NumPy structured array.
+
+    Args:
+        paths: File, directory (all flight_*.bin in order), glob pattern, or a list of them
+        scaled: Convert fixed-point fields (heading, speed, servo) to floats and
+            add a 't' field in seconds since the first record
+
+    Returns:
+        numpy.ndarray: One element per control tick
+    """
+    import numpy as np
+
+    arrays = []
+    for path in _expand_paths(paths):
+        with open(path, 'rb') as f:
+            record_format, names = read_header(f)
+            dtype = record_dtype(record_format, names)
+            data = f.read()
+        usable = len(data) - len(data) % dtype.itemsize  # Drop a torn final record
+        arrays.append(np.frombuffer(data[:usable], dtype=dtype))
+
+    if not arrays:
+        raise FlightLogError("No flight log files found")
+    raw = np.concatenate(arrays) if len(arrays) > 1 else arrays[0].copy()
+    if not scaled:
+        return raw
+
+    fields = []
+    for name in raw.dtype.names:
+        if name in SCALES:
+            fields.append((name, 'f4'))
+        else:
+            fields.append((name, raw.dtype[name]))
+    fields.append(('t', 'f8'))
+
+    out = np.empty(len(raw), dtype=fields)
+    for name in raw.dtype.names:
+        if name in SCALES:
+            values = raw[name].astype('f4') * SCALES[name]
+            if name == 'heading':
+                values[raw[name] < 0] = np.nan
+            out[name] = values
+        else:
+            out[name] = raw[name]
+
+    # Unwrap the 32-bit microsecond counter
+    t_us = raw['t_us'].astype('i8')
+    steps = np.diff(t_us)
+    steps[steps < 0] += 1 << 32
+    out['t'] = np.concatenate(([0], np.cumsum(steps))) / 1e6 if len(t_us) else []
+    return out
+
+
+def iter_records(path):
+    """
+    Iterate over the records of one file as dicts (no NumPy needed).
+
+    Args:
+        path: Flight log file
+
+    Yields:
+        dict: Raw field values of one record
+    """
+    with open(path, 'rb') as f:
+        record_format, names = read_header(f)
+        size = struct.calcsize(record_format)
+        while True:
+            chunk = f.read(size)
+            if len(chunk) < size:
+                return
+            yield dict(zip(names, struct.unpack(record_format, chunk)))
+
+
+def summarize(path):
+    """Print a per-primitive summary of a flight log file."""
+    counts = {}
+    first = last = None
+    total = 0
+    for record in iter_records(path):
+        total += 1
+        name = PRIMITIVE_NAMES.get(record['primitive'], str(record['primitive']))
+        counts[name] = counts.get(name, 0) + 1
+        if first is None:
+            first = record['t_us']
+        last = record['t_us']
+
+    print(f"{path}: {total} records")
+    if total:
+        duration = ((last - first) % (1 << 32)) / 1e6
+        print(f"  duration {duration:.2f}s, {total / duration if duration else 0:.0f} ticks/s")
+        for name, count in sorted(counts.items(), key=lambda item: -item[1]):
+            print(f"  {name:14s} {count}")
+
+
+if __name__ == "__main__":
+    for arg in sys.argv[1:]:
+        for file in _expand_paths(arg):
+            summarize(file)
@@ -0,0 +1,204 @@
+"""
+Simulation Harness
+Runs the unmodified `src/Main` RobotController against the simulated car.
+"""
+
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import time
+
+from . import machine as sim_machine
+from .clock import VirtualClock, SimulationTimeout
+from .simulation import Simulation, CarModel
+from .world import Mat, RED, GREEN
+
+MAIN_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'Main'))
+
+CHALLENGE_OPEN = 'open'
+CHALLENGE_OBSTACLE = 'obstacle'
+
+
+def install_machine_module():
+    """Make `import machine` and the src/Main modules resolve to the simulation."""
+    sys.modules['machine'] = sim_machine
+    if MAIN_DIR not in sys.path:
+        sys.path.insert(0, MAIN_DIR)
+
+
+def make_config(overrides=None):
+    """
+    Create a fresh RobotConfig with dotted-path overrides applied.
+
+    Args:
+        overrides: Dict like {"navigation.wall_distance": 40}
+
+    Returns:
+        RobotConfig
+    """
+    install_machine_module()
+    from config import RobotConfig
+
+    config = RobotConfig()
+    # DEFAULT_CONFIG is only shallow-copied by RobotConfig; isolate each run
+    config.config = json.loads(json.dumps(RobotConfig.DEFAULT_CONFIG))
+    for key, value in (overrides or {}).items():
+        config.set(key, value)
+    return config
+
+
+def random_layout(seed=0):
+    """
+    Random pillar layout: one or two pillars per side on the corridor centre line.
+
+    Args:
+        seed: Layout seed
+
+    Returns:
+        dict: Layout for Mat.standard
+    """
+    rng = random.Random(seed)
+    layout = {}
+    for side in range(4):
+        slots = [100, 200]
+        count = rng.choice([1, 2])
+        chosen = sorted(rng.sample(slots, count))
+        layout[side] = [(along, 50, rng.choice([RED, GREEN])) for along in chosen]
+    return layout
+
+
+def start_pose(mat, challenge, clockwise, car=None):
+    """
+    Starting pose of the car for a challenge.
+
+    Open challenge: middle of the south corridor facing the driving direction.
+    Obstacle challenge: inside the parking lot against the south outer wall.
+    """
+    car = car or CarModel()
+    heading = 270.0 if clockwise else 90.0
+    if challenge == CHALLENGE_OBSTACLE:
+        return mat.parking_offset, 2.0 + car.width / 2, heading
+    return 150.0, mat.corridor_widths[Mat.SOUTH] / 2, heading
+
+
+class SimResult:
+    """Outcome and metrics of one simulated run."""
+
+    def __init__(self, challenge, success, sim, wall_time, timed_out=False, error=None, log=None):
+        self.challenge = challenge
+        self.success = success
+        self.sim_time = sim.time
+        self.wall_time = wall_time
+        self.laps = abs(sim.laps)
+        self.wall_contacts = sim.wall_contacts
+        self.pillar_contacts = sim.pillar_contacts
+        self.rear_contacts = sim.rear_contacts
+        self.distance_cm = sim.distance_travelled
+        self.final_pose = sim.pose()
+        self.timed_out = timed_out
+        self.error = error
+        self.log = log
+
+    @property
+    def speedup(self):
+        """Virtual seconds simulated per wall-clock second."""
+        return self.sim_time / self.wall_time if self.wall_time > 0 else 0.0
+
+    @property
+    def lap_time(self):
+        """Average virtual seconds per lap of a successful run (None otherwise)."""
+        if not self.success or self.laps <= 0:
+            return None
+        return self.sim_time / self.laps
+
+    def as_dict(self):
+        return {
+            'challenge': self.challenge,
+            'success': self.success,
+            'sim_time': round(self.sim_time, 3),
+            'wall_time': round(self.wall_time, 3),
+            'laps': round(self.laps, 3),
+            'wall_contacts': self.wall_contacts,
+            'pillar_contacts': self.pillar_contacts,
+            'rear_contacts': self.rear_contacts,
+            'distance_cm': round(self.distance_cm, 1),
+            'final_pose': tuple(round(v, 1) for v in self.final_pose),
+            'timed_out': self.timed_out,
+            'error': self.error
+        }
+
+    def __repr__(self):
+        return f"SimResult({self.as_dict()})"
+
+
+def run_challenge(challenge=CHALLENGE_OPEN, clockwise=True, mat=None, config_overrides=None,
+                  car=None, seed=0, time_limit=240.0, quiet=True, sim_options=None):
+    """
+    Run a full challenge of the unmodified RobotController in the simulation.
+
+    Args:
+        challenge: 'open' or 'obstacle'
+        clockwise: Driving direction encoded in the start pose
+        mat: world.Mat (default: empty mat for open, random pillars for obstacle)
+        config_overrides: Dotted-path RobotConfig overrides
+        car: CarModel
+        seed: Seed for the default layout and sensor noise
+        time_limit: Virtual seconds before the run is aborted
+        quiet: Capture controller output instead of printing it
+        sim_options: Extra keyword arguments for Simulation
+
+    Returns:
+        SimResult
+    """
+    install_machine_module()
+    config = make_config(config_overrides)
+    car = car or CarModel()
+
+    if mat is None:
+        if challenge == CHALLENGE_OBSTACLE:
+            mat = Mat.standard(random_layout(seed), parking_side=Mat.SOUTH)
+        else:
+            mat = Mat()
+
+    sim = Simulation(mat, config, start_pose(mat, challenge, clockwise, car), car=car, seed=seed,
+                     **(sim_options or {}))
+    sim_machine.attach(sim)
+    clock = VirtualClock(sim, time_limit=time_limit)
+
+    from hal import set_default_clock
+    from robot_controller import RobotController
+
+    output = io.StringIO()
+    redirect = contextlib.redirect_stdout(output) if quiet else contextlib.nullcontext()
+    success = False
+    timed_out = False
+    error = None
+    wall_start = time.perf_counter()
+
+    try:
+        set_default_clock(clock)
+        with redirect:
+            robot = RobotController(config, clock=clock)
+            robot.initialize()
+            try:
+                if challenge == CHALLENGE_OBSTACLE:
+                    success = bool(robot.run_obstacle_challenge())
+                else:
+                    success = bool(robot.run_open_challenge())
+            except SimulationTimeout as e:
+                timed_out = True
+                error = str(e)
+            finally:
+                robot.stop()
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    finally:
+        set_default_clock(None)
+        sim_machine.detach()
+
+    wall_time = time.perf_counter() - wall_start
+    return SimResult(challenge, success, sim, wall_time, timed_out=timed_out, error=error,
+                     log=output.getvalue() if quiet else None)
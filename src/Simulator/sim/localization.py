@@ -0,0 +1,454 @@
+"""
+Localization on the Host
+Vectorised NumPy version of the particle filter in `src/Main/localizer.py`
+(same map, motion and range model, same interface), plus helpers that run
+either filter over a flight log or against the simulator's true pose.
+
+Usage:
+    python -m sim.localization                   # open challenge, both filters
+    python -m sim.localization --particles 1000 --sonar-noise 2
+    python -m sim.localization --log logs/flight_0003.bin --mat-heading 270
+"""
+
+import argparse
+import math
+import sys
+
+import numpy as np
+
+from .harness import MAIN_DIR, CHALLENGE_OPEN, run_challenge
+
+if MAIN_DIR not in sys.path:
+    sys.path.insert(0, MAIN_DIR)
+
+from localizer import TrackMap, ParticleFilter, DEFAULT_MOUNTS  # noqa: E402
+
+STEPS_PER_CM = 67.28
+
+
+def track_for(mat):
+    """Build the localizer's TrackMap from a world.Mat."""
+    return TrackMap(inner=(mat.inner_min_x, mat.inner_min_y, mat.inner_max_x, mat.inner_max_y))
+
+
+def cast_rays(track, x, y, dx, dy):
+    """
+    Vectorised TrackMap.ray().
+
+    Args:
+        track: TrackMap
+        x, y: Ray origins (arrays)
+        dx, dy: Unit direction (scalars or arrays)
+
+    Returns:
+        numpy.ndarray: Distance to the first wall per ray
+    """
+    size = track.size
+    with np.errstate(divide='ignore', invalid='ignore'):
+        inv_x = np.where(np.abs(dx) > 1e-9, 1.0 / np.where(dx == 0, 1.0, dx), np.inf)
+        inv_y = np.where(np.abs(dy) > 1e-9, 1.0 / np.where(dy == 0, 1.0, dy), np.inf)
+
+        # Outer square, seen from inside
+        tx = np.where(dx > 0, (size - x) * inv_x, -x * inv_x)
+        ty = np.where(dy > 0, (size - y) * inv_y, -y * inv_y)
+        tx = np.where(np.isfinite(inv_x), tx, np.inf)
+        ty = np.where(np.isfinite(inv_y), ty, np.inf)
+        best = np.minimum(tx, ty)
+
+        # Inner square, seen from outside (slab test)
+        t1 = (track.inner_min_x - x) * inv_x
+        t2 = (track.inner_max_x - x) * inv_x
+        inside_x = (x >= track.inner_min_x) & (x <= track.inner_max_x)
+        tx_near = np.where(np.isfinite(inv_x), np.minimum(t1, t2), np.where(inside_x, -np.inf, np.inf))
+        tx_far = np.where(np.isfinite(inv_x), np.maximum(t1, t2), np.where(inside_x, np.inf, -np.inf))
+        t1 = (track.inner_min_y - y) * inv_y
+        t2 = (track.inner_max_y - y) * inv_y
+        inside_y = (y >= track.inner_min_y) & (y <= track.inner_max_y)
+        ty_near = np.where(np.isfinite(inv_y), np.minimum(t1, t2), np.where(inside_y, -np.inf, np.inf))
+        ty_far = np.where(np.isfinite(inv_y), np.maximum(t1, t2), np.where(inside_y, np.inf, -np.inf))
+
+    near = np.maximum(tx_near, ty_near)
+    far = np.minimum(tx_far, ty_far)
+    hit = (near > 0) & (near <= far) & (near < best)
+    return np.where(hit, near, best)
+
+
+def drivable(track, x, y, margin=0.0):
+    """Vectorised TrackMap.is_drivable()."""
+    size = track.size
+    outside = (x < margin) | (y < margin) | (x > size - margin) | (y > size - margin)
+    inner = ((x > track.inner_min_x - margin) & (x < track.inner_max_x + margin) &
+             (y > track.inner_min_y - margin) & (y < track.inner_max_y + margin))
+    return ~(outside | inner)
+
+
+class VectorParticleFilter:
+    """NumPy particle filter with the interface of localizer.ParticleFilter."""
+
+    def __init__(self, track=None, count=500, mounts=DEFAULT_MOUNTS, sonar_sigma=4.0,
+                 max_range=200.0, outlier=0.02, odometry_noise=0.1, heading_noise=2.0,
+                 roughening=1.0, margin=5.0, alpha_slow=0.02, alpha_fast=0.3, inject_threshold=0.1,
+                 max_inject=0.25, seed=None):
+        """
+        Initialize the filter (call reset() before use).
+
+        Args:
+            track: TrackMap (default: 100cm corridors)
+            count: Number of particles
+            mounts: Sonar (forward, right, direction) offsets in packet order
+            sonar_sigma: Sonar range noise in cm
+            max_range: Readings at or above this (and 0) carry no information
+            outlier: Likelihood floor per reading, for pillars and echoes
+            odometry_noise: Relative odometry noise per prediction
+            heading_noise: Heading noise per prediction in degrees
+            roughening: Position jitter of resampled particles in cm (keeps copies apart)
+            margin: Clearance from the walls the car centre always keeps, in cm
+            alpha_slow, alpha_fast: Smoothing of the long and short term likelihood
+                averages; random particles are injected while the short term one is lower
+            inject_threshold: Relative likelihood drop ignored before injecting
+            max_inject: Largest fraction of particles replaced in one resampling
+            seed: Seed of the filter's random generator
+        """
+        self.track = track or TrackMap()
+        self.count = count
+        self.mounts = np.asarray(mounts, dtype=float)
+        self.sonar_sigma = sonar_sigma
+        self.max_range = max_range
+        self.outlier = outlier
+        self.odometry_noise = odometry_noise
+        self.heading_noise = heading_noise
+        self.roughening = roughening
+        self.margin = margin
+        self.alpha_slow = alpha_slow
+        self.alpha_fast = alpha_fast
+        self.inject_threshold = inject_threshold
+        self.max_inject = max_inject
+        self.random = np.random.default_rng(seed)
+
+        self.x = np.zeros(count)
+        self.y = np.zeros(count)
+        self.w = np.full(count, 1.0 / count)
+
+        self.heading_offset = 0.0
+        self._pending_x = self._pending_y = self._pending_path = 0.0
+        self._last_distance = None
+        self._slow = self._fast = 0.0
+        self._estimate = (0.0, 0.0, 0.0)
+        self.updates = 0
+        self.resamples = 0
+        self.recoveries = 0
+        self.injections = 0
+
+    def reset(self, compass_heading, x=None, y=None, mat_heading=0.0, spread=5.0, distance_cm=None):
+        """Fix the mat frame and scatter the particles (see ParticleFilter.reset)."""
+        self.heading_offset = (mat_heading - compass_heading) % 360.0
+        if x is None or y is None:
+            self._scatter()
+        else:
+            self.x = x + spread * self.random.standard_normal(self.count)
+            self.y = y + spread * self.random.standard_normal(self.count)
+            self.w = np.full(self.count, 1.0 / self.count)
+        self._pending_x = self._pending_y = self._pending_path = 0.0
+        self._last_distance = distance_cm
+        self._slow = self._fast = 0.0
+        self._update_estimate()
+
+    def _random_points(self, count):
+        """Uniformly random (x, y) arrays between the walls."""
+        low = self.margin
+        high = self.track.size - self.margin
+        x = np.empty(0)
+        y = np.empty(0)
+        while len(x) < count:
+            cx = self.random.uniform(low, high, count * 2)
+            cy = self.random.uniform(low, high, count * 2)
+            keep = drivable(self.track, cx, cy, self.margin)
+            x = np.concatenate((x, cx[keep]))
+            y = np.concatenate((y, cy[keep]))
+        return x[:count], y[:count]
+
+    def _scatter(self):
+        """Spread the particles uniformly between the walls."""
+        self.x, self.y = self._random_points(self.count)
+        self.w = np.full(self.count, 1.0 / self.count)
+
+    def mat_heading(self, compass_heading):
+        """Convert a compass heading to the mat frame."""
+        return (compass_heading + self.heading_offset) % 360.0
+
+    def move(self, step_cm, compass_heading):
+        """Accumulate one odometry step; particles move on the next predict()."""
+        if step_cm == 0:
+            return
+        rad = math.radians(self.mat_heading(compass_heading))
+        self._pending_x += step_cm * math.sin(rad)
+        self._pending_y += step_cm * math.cos(rad)
+        self._pending_path += abs(step_cm)
+
+    def predict(self):
+        """Move every particle by the accumulated odometry, with noise."""
+        if self._pending_path == 0:
+            return
+        dx, dy = self._pending_x, self._pending_y
+        self._pending_x = self._pending_y = self._pending_path = 0.0
+        x, y, spread = self._estimate
+        self._estimate = (x + dx, y + dy, spread)
+        angle = np.radians(self.heading_noise) * self.random.standard_normal(self.count)
+        scale = 1.0 + self.odometry_noise * self.random.standard_normal(self.count)
+        c = np.cos(angle) * scale
+        s = np.sin(angle) * scale
+        self.x += dx * c + dy * s
+        self.y += dy * c - dx * s
+
+    def correct(self, readings, compass_heading):
+        """Weight the particles by a sonar packet and resample if needed."""
+        rad = math.radians(self.mat_heading(compass_heading))
+        fx = math.sin(rad)
+        fy = math.cos(rad)
+        weights = self.w * drivable(self.track, self.x, self.y, self.margin)
+        inv_var = -0.5 / (self.sonar_sigma * self.sonar_sigma)
+
+        beams = 0
+        for reading, (forward, right, direction) in zip(readings, self.mounts):
+            if not 0 < reading < self.max_range:
+                continue
+            beam = rad + math.radians(direction)
+            expected = cast_rays(self.track, self.x + fx * forward + fy * right,
+                                 self.y + fy * forward - fx * right, math.sin(beam), math.cos(beam))
+            error = reading - np.minimum(expected, self.max_range)
+            weights = weights * (np.exp(error * error * inv_var) + self.outlier)
+            beams += 1
+
+        self.updates += 1
+        total = weights.sum()
+        if total <= 0.0:
+            self.recoveries += 1
+            self._scatter()
+            self._update_estimate()
+            return
+
+        # Augmented MCL, as in ParticleFilter.correct()
+        inject = 0.0
+        if beams:
+            quality = total ** (1.0 / beams)
+            if self._slow == 0.0:
+                self._slow = self._fast = quality
+            self._slow += self.alpha_slow * (quality - self._slow)
+            self._fast += self.alpha_fast * (quality - self._fast)
+            inject = min(1.0 - self._fast / self._slow - self.inject_threshold, self.max_inject)
+
+        self.w = weights / total
+        self._update_estimate()
+        if np.square(self.w).sum() * self.count > 2.0 or inject > 0.0:
+            self._resample(inject)
+
+    def _resample(self, inject=0.0):
+        """Systematic resampling with roughening and random injection."""
+        positions = (self.random.random() + np.arange(self.count)) / self.count
+        cumulative = np.cumsum(self.w)
+        cumulative[-1] = 1.0
+        index = np.searchsorted(cumulative, positions)
+        self.x = self.x[index] + self.roughening * self.random.standard_normal(self.count)
+        self.y = self.y[index] + self.roughening * self.random.standard_normal(self.count)
+        if inject > 0.0:
+            replace = self.random.random(self.count) < inject
+            self.x[replace], self.y[replace] = self._random_points(int(replace.sum()))
+            self.injections += 1
+        self.w = np.full(self.count, 1.0 / self.count)
+        self.resamples += 1
+
+    def update(self, distance_cm, compass_heading, readings=None):
+        """Accumulate the encoder travel; with a sonar packet, also predict and correct."""
+        if compass_heading is None:
+            return
+        if self._last_distance is not None:
+            self.move(distance_cm - self._last_distance, compass_heading)
+        self._last_distance = distance_cm
+        if readings is not None:
+            self.predict()
+            self.correct(readings, compass_heading)
+
+    def _update_estimate(self):
+        """Weighted mean and spread of the particles as they are now."""
+        mean_x = float(np.dot(self.w, self.x))
+        mean_y = float(np.dot(self.w, self.y))
+        variance = float(np.dot(self.w, (self.x - mean_x) ** 2 + (self.y - mean_y) ** 2))
+        self._estimate = (mean_x, mean_y, math.sqrt(variance))
+
+    def estimate(self):
+        """Get (x, y, spread) in cm as of the latest correction, moved by the odometry since."""
+        x, y, spread = self._estimate
+        return x + self._pending_x, y + self._pending_y, spread
+
+    def get_particles(self):
+        """Get (x, y, weight) of every particle."""
+        return list(zip(self.x.tolist(), self.y.tolist(), self.w.tolist()))
+
+
+def localize_log(log, mat_heading=0.0, x=None, y=None, steps_per_cm=STEPS_PER_CM, track=None,
+                 filter_class=VectorParticleFilter, **filter_options):
+    """
+    Run a particle filter over a flight log.
+
+    The recorder logs every control tick with the latest sonar packet, so a
+    packet is taken as new when any of the four ranges changed.
+
+    Args:
+        log: Array from flight_log.load_flight_log()
+        mat_heading: Mat heading the car faced at the first record
+        x, y: Start position in cm (None: anywhere between the walls)
+        steps_per_cm: Encoder steps per cm
+        track: TrackMap (default: 100cm corridors)
+        filter_class: VectorParticleFilter or localizer.ParticleFilter
+        **filter_options: Extra filter arguments (count, sonar_sigma...)
+
+    Returns:
+        numpy.ndarray: Structured array with t, x, y and spread per record
+    """
+    out = np.zeros(len(log), dtype=[('t', 'f8'), ('x', 'f4'), ('y', 'f4'), ('spread', 'f4')])
+    pf = None
+    last_sonar = None
+    for i, record in enumerate(log):
+        heading = float(record['heading'])
+        if math.isnan(heading):
+            heading = None
+        distance = record['encoder'] / steps_per_cm
+        if pf is None:
+            if heading is None:
+                out[i] = (record['t'], np.nan, np.nan, np.nan)
+                continue
+            pf = filter_class(track=track, **filter_options)
+            pf.reset(heading, x, y, mat_heading=mat_heading, distance_cm=distance)
+
+        sonar = (int(record['left']), int(record['rear']), int(record['right']), int(record['front']))
+        pf.update(distance, heading, sonar if sonar != last_sonar else None)
+        last_sonar = sonar
+        out[i] = (record['t'],) + pf.estimate()
+    return out
+
+
+def record_run(challenge=CHALLENGE_OPEN, clockwise=True, seed=0, sonar_noise=1.0, compass_noise=0.5,
+               compass_north=0.0, **run_options):
+    """
+    Run a simulated challenge and sample every sonar packet with the true pose.
+
+    Returns:
+        tuple: (SimResult, samples) where each sample is a dict with t, x, y,
+        heading (true pose), readings, compass and distance (signed odometry)
+    """
+    samples = []
+    state = {'distance': 0.0, 'travelled': 0.0}
+
+    def on_sonar(sim, readings):
+        step = sim.distance_travelled - state['travelled']
+        state['travelled'] = sim.distance_travelled
+        state['distance'] += step if sim.speed >= 0 else -step
+        samples.append({
+            't': sim.time,
+            'x': sim.x,
+            'y': sim.y,
+            'heading': sim.heading,
+            'readings': readings,
+            'compass': sim.compass_bearing(),
+            'distance': state['distance']
+        })
+
+    sim_options = dict(run_options.pop('sim_options', None) or {})
+    sim_options.update(sonar_noise=sonar_noise, compass_noise=compass_noise,
+                       compass_north=compass_north, on_sonar=on_sonar)
+    result = run_challenge(challenge, clockwise=clockwise, seed=seed, sim_options=sim_options, **run_options)
+    return result, samples
+
+
+def evaluate(samples, filter_class=VectorParticleFilter, known_start=False, settle=5.0, lock_error=10.0,
+             track=None, **filter_options):
+    """
+    Run a filter over recorded samples and compare it with the true pose.
+
+    The mat frame is fixed from the true start heading, so the estimate is
+    directly comparable with the simulator's coordinates.
+
+    Args:
+        samples: From record_run()
+        filter_class: VectorParticleFilter or localizer.ParticleFilter
+        known_start: Start from the true position instead of a global scatter
+        settle: Seconds excluded from the error statistics with a global start
+            (the mat is ambiguous until the first corner)
+        lock_error: Error in cm that counts as tracking for lock_time
+        track: TrackMap (default: 100cm corridors)
+        **filter_options: Extra filter arguments (count, sonar_sigma...)
+
+    Returns:
+        dict: rmse, p95 and max error in cm, mean spread, lock_time (seconds
+        until the error stays below lock_error) and updates per second
+    """
+    import time
+
+    first = samples[0]
+    pf = filter_class(track=track, **filter_options)
+    pf.reset(first['compass'], first['x'] if known_start else None, first['y'] if known_start else None,
+             mat_heading=first['heading'], distance_cm=first['distance'])
+
+    errors = []
+    spreads = []
+    lock_time = 0.0
+    start = time.perf_counter()
+    for sample in samples:
+        pf.update(sample['distance'], sample['compass'], sample['readings'])
+        x, y, spread = pf.estimate()
+        error = math.hypot(x - sample['x'], y - sample['y'])
+        if error >= lock_error:
+            lock_time = sample['t'] - first['t']
+        if known_start or sample['t'] - first['t'] >= settle:
+            errors.append(error)
+            spreads.append(spread)
+    elapsed = time.perf_counter() - start
+
+    errors = np.asarray(errors)
+    return {
+        'filter': filter_class.__name__,
+        'particles': pf.count,
+        'samples': len(samples),
+        'rmse': float(np.sqrt(np.mean(errors ** 2))),
+        'p95': float(np.percentile(errors, 95)),
+        'max': float(errors.max()),
+        'spread': float(np.mean(spreads)),
+        'lock_time': lock_time,
+        'recoveries': pf.recoveries,
+        'updates_per_s': len(samples) / elapsed if elapsed else 0.0
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Evaluate the particle filter localization")
+    parser.add_argument('--challenge', choices=['open', 'obstacle'], default='open')
+    parser.add_argument('--counterclockwise', action='store_true')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--particles', type=int, default=500, help="NumPy filter particle count")
+    parser.add_argument('--micro-particles', type=int, default=48, help="Fixed-size filter particle count")
+    parser.add_argument('--sonar-noise', type=float, default=1.0)
+    parser.add_argument('--known-start', action='store_true', help="Start from the true position")
+    parser.add_argument('--log', default=None, help="Localize a flight log instead of a simulated run")
+    parser.add_argument('--mat-heading', type=float, default=0.0, help="Mat heading at the first log record")
+    args = parser.parse_args(argv)
+
+    if args.log:
+        from .flight_log import load_flight_log
+        track = localize_log(load_flight_log(args.log), mat_heading=args.mat_heading, count=args.particles)
+        for row in track[::max(1, len(track) // 40)]:
+            print(f"{row['t']:7.2f}s  x {row['x']:6.1f}  y {row['y']:6.1f}  spread {row['spread']:5.1f}")
+        return 0
+
+    result, samples = record_run(args.challenge, clockwise=not args.counterclockwise, seed=args.seed,
+                                 sonar_noise=args.sonar_noise)
+    print(f"{args.challenge} run: {len(samples)} sonar packets over {result.sim_time:.1f}s")
+    for filter_class, count in ((VectorParticleFilter, args.particles), (ParticleFilter, args.micro_particles)):
+        stats = evaluate(samples, filter_class, known_start=args.known_start, count=count, seed=args.seed)
+        print(f"{stats['filter']:22s} n={stats['particles']:<5d} rmse {stats['rmse']:5.1f}cm  "
+              f"p95 {stats['p95']:5.1f}cm  max {stats['max']:5.1f}cm  spread {stats['spread']:5.1f}cm  "
+              f"lock {stats['lock_time']:4.1f}s  {stats['updates_per_s']:7.0f} updates/s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
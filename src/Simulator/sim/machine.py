@@ -0,0 +1,194 @@
+"""
+Simulated MicroPython `machine` module
+Stand-ins for Pin, PWM, UART and I2C that read and write the state of the
+currently attached simulated board instead of real hardware.
+
+The harness installs this module as `sys.modules['machine']` before the
+`src/Main` HAL is imported, so the HAL runs unmodified.
+"""
+
+_board = None
+
+
+def attach(board):
+    """Attach the simulated board that all peripherals talk to."""
+    global _board
+    _board = board
+
+
+def detach():
+    """Detach the simulated board."""
+    global _board
+    _board = None
+
+
+def _get_board():
+    if _board is None:
+        raise RuntimeError("No simulated board attached")
+    return _board
+
+
+class Pin:
+    """Simulated GPIO pin."""
+
+    IN = 0
+    OUT = 1
+    OPEN_DRAIN = 2
+    PULL_UP = 1
+    PULL_DOWN = 2
+    IRQ_RISING = 4
+    IRQ_FALLING = 8
+
+    def __init__(self, id, mode=-1, pull=-1, value=None):
+        self.id = id
+        self._state = _get_board().pin_state(id)
+        if pull == Pin.PULL_UP and self._state.driven is None:
+            self._state.value = 1
+        if value is not None:
+            self._state.value = 1 if value else 0
+
+    def value(self, value=None):
+        if value is None:
+            return self._state.value
+        self._state.value = 1 if value else 0
+        return None
+
+    def __call__(self, value=None):
+        return self.value(value)
+
+    def on(self):
+        self.value(1)
+
+    def off(self):
+        self.value(0)
+
+    def high(self):
+        self.value(1)
+
+    def low(self):
+        self.value(0)
+
+    def toggle(self):
+        self.value(0 if self._state.value else 1)
+
+    def irq(self, handler=None, trigger=IRQ_RISING | IRQ_FALLING, **kwargs):
+        self._state.irq_handler = handler
+        self._state.irq_trigger = trigger
+        self._state.irq_pin = self
+
+
+class PWM:
+    """Simulated PWM output."""
+
+    def __init__(self, pin, freq=None, duty_u16=None):
+        self.pin = pin
+        self._state = _get_board().pwm_state(pin.id)
+        if freq is not None:
+            self._state.freq = freq
+        if duty_u16 is not None:
+            self._state.duty = duty_u16
+
+    def freq(self, value=None):
+        if value is None:
+            return self._state.freq
+        self._state.freq = value
+        return None
+
+    def duty_u16(self, value=None):
+        if value is None:
+            return self._state.duty
+        self._state.duty = max(0, min(65535, int(value)))
+        return None
+
+    def deinit(self):
+        self._state.duty = 0
+
+
+class UART:
+    """Simulated UART; receive data is produced by the simulated peripherals."""
+
+    def __init__(self, id, baudrate=9600, tx=None, rx=None, **kwargs):
+        self.id = id
+        board = _get_board()
+        self._board = board
+        self._channel = board.uart_channel(id)
+        self._channel.baudrate = baudrate
+
+    def init(self, baudrate=9600, **kwargs):
+        self._channel.baudrate = baudrate
+
+    def any(self):
+        self._board.charge_access('uart')
+        return len(self._channel.rx)
+
+    def read(self, nbytes=None):
+        self._board.charge_access('uart')
+        rx = self._channel.rx
+        if not rx:
+            return None
+        if nbytes is None or nbytes > len(rx):
+            nbytes = len(rx)
+        data = bytes(rx[:nbytes])
+        del rx[:nbytes]
+        return data
+
+    def readinto(self, buf, nbytes=None):
+        self._board.charge_access('uart')
+        rx = self._channel.rx
+        if not rx:
+            return None
+        if nbytes is None:
+            nbytes = len(buf)
+        nbytes = min(nbytes, len(buf), len(rx))
+        buf[:nbytes] = rx[:nbytes]
+        del rx[:nbytes]
+        return nbytes
+
+    def write(self, data):
+        self._board.charge_access('uart')
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        self._channel.tx.extend(data)
+        return len(data)
+
+    def deinit(self):
+        pass
+
+
+class I2C:
+    """Simulated I2C bus; devices are registered by the simulation."""
+
+    def __init__(self, id, scl=None, sda=None, freq=400000):
+        self.id = id
+        self._board = _get_board()
+        self._bus = self._board.i2c_bus(id)
+
+    def scan(self):
+        return sorted(self._bus.keys())
+
+    def readfrom_mem(self, addr, memaddr, nbytes, **kwargs):
+        self._board.charge_access('i2c')
+        device = self._bus.get(addr)
+        if device is None:
+            raise OSError(19)  # ENODEV
+        return device.read_mem(memaddr, nbytes)
+
+    def writeto_mem(self, addr, memaddr, buf, **kwargs):
+        self._board.charge_access('i2c')
+        device = self._bus.get(addr)
+        if device is None:
+            raise OSError(19)
+        device.write_mem(memaddr, buf)
+
+    def readfrom(self, addr, nbytes, stop=True):
+        return self.readfrom_mem(addr, 0, nbytes)
+
+    def writeto(self, addr, buf, stop=True):
+        if buf:
+            self.writeto_mem(addr, buf[0], buf[1:])
+        return len(buf)
+
+
+def time_pulse_us(pin, pulse_level, timeout_us=1000000):
+    """Not modelled; the sonar slave is simulated at packet level."""
+    return -1
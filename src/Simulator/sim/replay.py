@@ -0,0 +1,388 @@
+"""
+Sensor Log Replay
+Feeds a recorded flight log back into the unmodified RobotController and
+diffs the actuator commands it produces against the recorded ones.
+
+The recorded sonar frames, compass headings, encoder counts and camera
+colors are played back through the simulated `machine` peripherals, so the
+HAL and controller run exactly as on the car. Playback is open loop: the
+sensors follow the log whatever the controller commands, so a replay is
+only meaningful up to the first divergence.
+
+Usage:
+    python replay.py logs/flight_0003.bin --challenge open
+"""
+
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+from . import machine as sim_machine
+from .board import Board
+from .clock import VirtualClock, SimulationTimeout
+from .flight_log import SCALES, PRIMITIVE_NAMES, iter_records, _expand_paths
+from .harness import install_machine_module, make_config, CHALLENGE_OPEN, CHALLENGE_OBSTACLE
+
+
+class ReplayFinished(SimulationTimeout):
+    """Raised from a sleep once the log has been played back completely."""
+
+
+def load_records(paths):
+    """
+    Load flight log records as dicts with the time unwrapped to seconds.
+
+    Args:
+        paths: File, directory, glob pattern, or a list of them
+
+    Returns:
+        list: Raw field values of each record plus 't' (seconds since the first record)
+    """
+    records = []
+    for path in _expand_paths(paths):
+        records.extend(iter_records(path))
+
+    first = None
+    last = 0
+    offset = 0
+    for record in records:
+        t_us = record['t_us']
+        if first is None:
+            first = t_us
+        elif t_us < last:
+            offset += 1 << 32  # 32-bit counter wrapped
+        last = t_us
+        record['t'] = (t_us + offset - first) / 1e6
+    return records
+
+
+class ReplayBoard(Board):
+    """Board whose sensors play back a flight log instead of simulating the car."""
+
+    def __init__(self, records, config, physics_dt=0.001, sonar_period=0.03, camera_fps=30.0,
+                 tail=0.5, interpolate_gap=0.05, realtime_factor=None):
+        """
+        Initialize the replay board.
+
+        Args:
+            records: Records from load_records()
+            config: RobotConfig used by the controller
+            physics_dt: Time step in seconds
+            sonar_period: Interval between sonar packets in seconds
+            camera_fps: Detection rate of the framed camera protocol
+            tail: Seconds to keep running after the last record
+            interpolate_gap: Interpolate sensors across record gaps longer than this
+                (shorter gaps hold the recorded frame, as the controller saw it)
+            realtime_factor: Pace playback at this multiple of real time (None: as fast as possible)
+        """
+        if not records:
+            raise ValueError("Cannot replay an empty flight log")
+        super().__init__(config, physics_dt=physics_dt)
+        self.records = records
+        self.sonar_period = sonar_period
+        self.camera_fps = camera_fps
+        self.interpolate_gap = interpolate_gap
+        self.realtime_factor = realtime_factor
+        self._end = records[-1]['t'] + tail
+        self.finished = False
+
+        # Playback starts at the controller's first recorded tick
+        self._start_time = None
+        self._index = 0
+        self._next_sonar = 0.0
+        self._next_camera = 0.0
+        self._wall_start = None
+
+        first = records[0]
+        self._sonar = (first['left'], first['rear'], first['right'], first['front'])
+        self._sent_sonar = None
+        self._encoder = first['encoder']
+        self._heading = first['heading'] * SCALES['heading'] if first['heading'] >= 0 else 0.0
+        self._camera = first.get('camera', 0)
+
+    def start_playback(self):
+        """Align record 0 with the current virtual time (idempotent)."""
+        if self._start_time is None:
+            self._start_time = self.time
+            self._wall_start = time.perf_counter()
+
+    def playback_time(self):
+        """Seconds since playback started (0 before the first tick)."""
+        if self._start_time is None:
+            return 0.0
+        return self.time - self._start_time
+
+    def _step(self, dt):
+        self.time += dt
+        playback = self.playback_time()
+        if playback > self._end and not self.finished:
+            self.finished = True
+            raise ReplayFinished(f"Flight log played back ({self._end:.2f}s)")
+
+        records = self.records
+        while self._index + 1 < len(records) and records[self._index + 1]['t'] <= playback:
+            self._index += 1
+        self._apply(playback)
+
+        # A changed frame is a packet the controller had already received at
+        # record time, so send it at once; unchanged frames keep the link fresh
+        if self._sonar != self._sent_sonar or self.time >= self._next_sonar:
+            self._next_sonar = self.time + self.sonar_period
+            self._sent_sonar = self._sonar
+            self.emit_sonar_packet(*self._sonar)
+
+        if self._camera and self.time >= self._next_camera:
+            self._next_camera = self.time + self.emit_camera(self._camera, confidence=200, fps=self.camera_fps)
+
+        if self.realtime_factor and self._wall_start is not None:
+            ahead = playback / self.realtime_factor - (time.perf_counter() - self._wall_start)
+            if ahead > 0.002:
+                time.sleep(ahead)
+
+    def _apply(self, playback):
+        """Make the sensor values at a playback time current.
+
+        The recorder only logs control-loop ticks, so sonar, heading and
+        encoder are interpolated across longer gaps (e.g. while the controller
+        averages sonar readings between primitives).
+        """
+        records = self.records
+        record = records[self._index]
+        following = records[self._index + 1] if self._index + 1 < len(records) else None
+        fraction = 0.0
+        if (following is not None and playback > record['t'] and
+                following['t'] - record['t'] > self.interpolate_gap):
+            fraction = min(1.0, (playback - record['t']) / (following['t'] - record['t']))
+        if fraction == 0.0:
+            following = record
+
+        self._sonar = tuple(int(round(record[name] + (following[name] - record[name]) * fraction))
+                            for name in ('left', 'rear', 'right', 'front'))
+        if record['heading'] >= 0:
+            heading = record['heading'] * SCALES['heading']
+            if following['heading'] >= 0:
+                delta = (following['heading'] * SCALES['heading'] - heading + 180) % 360 - 180
+                heading += delta * fraction
+            self._heading = heading % 360
+        self._camera = record.get('camera', 0)
+
+        # The controller counts the edges in its own motor direction
+        encoder = int(round(record['encoder'] + (following['encoder'] - record['encoder']) * fraction))
+        edges = abs(encoder - self._encoder)
+        self._encoder = encoder
+        if edges:
+            self.emit_encoder_edges(edges)
+
+    def compass_bearing(self):
+        """Recorded bearing held until the next record."""
+        return self._heading
+
+
+class ReplayResult:
+    """Actuator command diff between a recorded run and its replay."""
+
+    def __init__(self, samples, speed_errors, servo_errors, primitive_mismatches, first_divergence,
+                 replay_time, wall_time, log_duration, error=None, log=None):
+        self.samples = samples
+        self.max_speed_error = max(speed_errors) if speed_errors else 0.0
+        self.mean_speed_error = sum(speed_errors) / len(speed_errors) if speed_errors else 0.0
+        self.max_servo_error = max(servo_errors) if servo_errors else 0.0
+        self.mean_servo_error = sum(servo_errors) / len(servo_errors) if servo_errors else 0.0
+        self.primitive_mismatches = primitive_mismatches
+        self.first_divergence = first_divergence
+        self.replay_time = replay_time
+        self.wall_time = wall_time
+        self.log_duration = log_duration
+        self.error = error
+        self.log = log
+
+    @property
+    def matched(self):
+        """True if the replay reproduced the recorded commands within tolerance."""
+        return self.error is None and self.samples > 0 and self.first_divergence is None
+
+    @property
+    def speedup(self):
+        """Virtual seconds replayed per wall-clock second."""
+        return self.replay_time / self.wall_time if self.wall_time > 0 else 0.0
+
+    def as_dict(self):
+        return {
+            'matched': self.matched,
+            'samples': self.samples,
+            'max_speed_error': round(self.max_speed_error, 4),
+            'mean_speed_error': round(self.mean_speed_error, 4),
+            'max_servo_error': round(self.max_servo_error, 2),
+            'mean_servo_error': round(self.mean_servo_error, 2),
+            'primitive_mismatches': self.primitive_mismatches,
+            'first_divergence': self.first_divergence,
+            'log_duration': round(self.log_duration, 3),
+            'replay_time': round(self.replay_time, 3),
+            'wall_time': round(self.wall_time, 3),
+            'error': self.error
+        }
+
+    def __repr__(self):
+        return f"ReplayResult({self.as_dict()})"
+
+
+def compare_commands(recorded, replayed, speed_tolerance=0.05, servo_tolerance=2.0, time_tolerance=0.05):
+    """
+    Diff the commands of two record lists aligned on their 't' field.
+
+    Each replayed record is compared with the recorded records from
+    time_tolerance before to time_tolerance after it, plus the one the car
+    was holding at that moment; the closest match counts. This absorbs the
+    tick-level jitter of primitive transitions.
+
+    Args:
+        recorded: Records of the original run
+        replayed: Records of the replay
+        speed_tolerance: Largest speed difference (duty) that is not a divergence
+        servo_tolerance: Largest servo difference (degrees) that is not a divergence
+        time_tolerance: Seconds a command may be early or late
+
+    Returns:
+        (speed_errors, servo_errors, primitive_mismatches, first_divergence)
+    """
+    speed_errors = []
+    servo_errors = []
+    mismatches = 0
+    first_divergence = None
+    index = 0
+    end = recorded[-1]['t'] if recorded else 0.0
+
+    for record in replayed:
+        t = record['t']
+        if t > end:
+            break
+        while index + 1 < len(recorded) and recorded[index + 1]['t'] <= t:
+            index += 1
+
+        # Window of candidate references around the held one
+        low = index
+        while low > 0 and recorded[low - 1]['t'] >= t - time_tolerance:
+            low -= 1
+        high = index
+        while high + 1 < len(recorded) and recorded[high + 1]['t'] <= t + time_tolerance:
+            high += 1
+
+        best = None
+        for reference in recorded[low:high + 1]:
+            speed_error = abs(record['speed'] - reference['speed']) * SCALES['speed']
+            servo_error = abs(record['servo'] - reference['servo']) * SCALES['servo']
+            primitive_differs = record['primitive'] != reference['primitive']
+            score = (primitive_differs, speed_error / speed_tolerance + servo_error / servo_tolerance)
+            if best is None or score < best[0]:
+                best = (score, speed_error, servo_error, primitive_differs, reference)
+
+        _, speed_error, servo_error, primitive_differs, reference = best
+        speed_errors.append(speed_error)
+        servo_errors.append(servo_error)
+        if primitive_differs:
+            mismatches += 1
+
+        if first_divergence is None and (speed_error > speed_tolerance or servo_error > servo_tolerance or
+                                         primitive_differs):
+            first_divergence = {
+                't': round(t, 3),
+                'recorded': _describe(recorded[index]),
+                'replayed': _describe(record)
+            }
+
+    return speed_errors, servo_errors, mismatches, first_divergence
+
+
+def _describe(record):
+    return {
+        'primitive': PRIMITIVE_NAMES.get(record['primitive'], record['primitive']),
+        'speed': round(record['speed'] * SCALES['speed'], 4),
+        'servo': round(record['servo'] * SCALES['servo'], 1)
+    }
+
+
+def run_replay(log, challenge=CHALLENGE_OPEN, config_overrides=None, realtime_factor=None,
+               speed_tolerance=0.05, servo_tolerance=2.0, time_tolerance=0.05, quiet=True,
+               board_options=None):
+    """
+    Replay a flight log through the RobotController and diff its commands.
+
+    The replay records its own flight log with the same telemetry settings;
+    playback time 0 is the controller's first recorded tick.
+
+    Args:
+        log: Flight log path(s) accepted by load_flight_log, or records from load_records()
+        challenge: Challenge that produced the log ('open' or 'obstacle')
+        config_overrides: Dotted-path RobotConfig overrides (use the car's config)
+        realtime_factor: Pace playback at this multiple of real time (None: as fast as possible)
+        speed_tolerance: Largest speed difference (duty) that is not a divergence
+        servo_tolerance: Largest servo difference (degrees) that is not a divergence
+        time_tolerance: Seconds a command may be early or late
+        quiet: Capture controller output instead of printing it
+        board_options: Extra keyword arguments for ReplayBoard
+
+    Returns:
+        ReplayResult
+    """
+    records = log if isinstance(log, list) and log and isinstance(log[0], dict) else load_records(log)
+
+    install_machine_module()
+    with tempfile.TemporaryDirectory(prefix='replay_') as directory:
+        overrides = dict(config_overrides or {})
+        overrides['telemetry.enabled'] = True
+        overrides['telemetry.directory'] = directory
+        config = make_config(overrides)
+
+        board = ReplayBoard(records, config, realtime_factor=realtime_factor, **(board_options or {}))
+        sim_machine.attach(board)
+        clock = VirtualClock(board)
+
+        from hal import set_default_clock
+        from robot_controller import RobotController
+
+        output = io.StringIO()
+        redirect = contextlib.redirect_stdout(output) if quiet else contextlib.nullcontext()
+        error = None
+        wall_start = time.perf_counter()
+
+        try:
+            set_default_clock(clock)
+            with redirect:
+                robot = RobotController(config, clock=clock)
+                recorder = robot.get_flight_recorder()
+                record = recorder.record
+
+                def record_and_start(*args, **kwargs):
+                    board.start_playback()
+                    record(*args, **kwargs)
+
+                recorder.record = record_and_start
+                robot.initialize()
+                try:
+                    if challenge == CHALLENGE_OBSTACLE:
+                        robot.run_obstacle_challenge()
+                    else:
+                        robot.run_open_challenge()
+                except ReplayFinished:
+                    pass
+                except SimulationTimeout as e:
+                    error = str(e)
+                finally:
+                    recorder.flush(force=True)
+                    robot.stop()
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        finally:
+            set_default_clock(None)
+            sim_machine.detach()
+
+        wall_time = time.perf_counter() - wall_start
+        replayed = load_records(directory) if os.listdir(directory) else []
+
+    speed_errors, servo_errors, mismatches, first_divergence = compare_commands(
+        records, replayed, speed_tolerance, servo_tolerance, time_tolerance)
+    return ReplayResult(len(speed_errors), speed_errors, servo_errors, mismatches, first_divergence,
+                        board.playback_time(), wall_time, records[-1]['t'], error=error,
+                        log=output.getvalue() if quiet else None)
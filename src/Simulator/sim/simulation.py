@@ -0,0 +1,384 @@
+"""
+Vehicle Simulation
+Kinematic bicycle model of the car on the WRO mat, producing the same
+signals the Pico sees: sonar packets, CMPS12 bearings, encoder edges and
+camera detections.
+"""
+
+import math
+import random
+
+from .board import Board
+from .world import MAT_SIZE, RED, GREEN, segments_intersect
+
+
+class CarModel:
+    """Physical parameters of the car (centimeters, seconds, degrees)."""
+
+    def __init__(self, length=20.0, width=12.0, wheelbase=14.0, top_speed=119.0,
+                 motor_tau=0.2, motor_deadband=0.12, coast_decel=150.0, brake_decel=600.0,
+                 steer_gain=4.1, servo_dps=300.0, camera_fov=70.0, camera_range=200.0):
+        """
+        Initialize car parameters.
+
+        Args:
+            length: Body length
+            width: Body width
+            wheelbase: Distance between axles
+            top_speed: Speed at full duty in cm/s (350 rpm motor on 65 mm wheels)
+            motor_tau: First-order motor time constant
+            motor_deadband: Duty fraction below which the motor does not turn
+            coast_decel: Deceleration while coasting in cm/s²
+            brake_decel: Deceleration while short-braking in cm/s²
+            steer_gain: Front wheel degrees per servo degree (45 degrees at the 11 degree servo limit)
+            servo_dps: Servo slew rate in degrees per second
+            camera_fov: Horizontal camera field of view in degrees
+            camera_range: Maximum pillar detection range in cm
+        """
+        self.length = length
+        self.width = width
+        self.wheelbase = wheelbase
+        self.top_speed = top_speed
+        self.motor_tau = motor_tau
+        self.motor_deadband = motor_deadband
+        self.coast_decel = coast_decel
+        self.brake_decel = brake_decel
+        self.steer_gain = steer_gain
+        self.servo_dps = servo_dps
+        self.camera_fov = camera_fov
+        self.camera_range = camera_range
+
+        # Sonar mounts: (forward offset, right offset, beam direction relative to heading)
+        half = length / 2
+        self.sonar_mounts = {
+            'left': (half / 2, -width / 2, -90.0),
+            'rear': (-half, 0.0, 180.0),
+            'right': (half / 2, width / 2, 90.0),
+            'front': (half, 0.0, 0.0)
+        }
+
+
+class Simulation(Board):
+    """Simulated board and world; the clock advances it in fixed physics steps."""
+
+    # Seconds free of contact before a new touch counts as a separate contact
+    CONTACT_RELEASE = 0.2
+
+    def __init__(self, mat, config, start_pose, car=None, seed=0, physics_dt=0.001,
+                 sonar_period=0.03, sonar_noise=0.0, compass_noise=0.0, compass_north=0.0,
+                 camera_fps=30.0, on_sonar=None):
+        """
+        Initialize the simulation.
+
+        Args:
+            mat: world.Mat
+            config: RobotConfig used by the controller (pin numbers, servo mapping...)
+            start_pose: (x, y, heading_deg) of the car centre
+            car: CarModel (default parameters if None)
+            seed: Seed for sensor noise
+            physics_dt: Physics step in seconds
+            sonar_period: Interval between sonar packets in seconds
+            sonar_noise: Standard deviation of sonar noise in cm
+            compass_noise: Standard deviation of compass noise in degrees
+            compass_north: Compass bearing when the car faces mat north
+            camera_fps: Detection rate of the framed camera protocol
+            on_sonar: Called with (simulation, readings) after every sonar packet
+        """
+        super().__init__(config, physics_dt=physics_dt)
+        self.mat = mat
+        self.car = car or CarModel()
+        self.random = random.Random(seed)
+        self.sonar_period = sonar_period
+        self.sonar_noise = sonar_noise
+        self.compass_noise = compass_noise
+        self.compass_north = compass_north
+        self.camera_fps = camera_fps
+        self.on_sonar = on_sonar
+
+        # Car state
+        self.x, self.y, self.heading = start_pose
+        self.speed = 0.0
+        self.servo_angle = config.get('hardware.servo.center_steering', 91)
+
+        # Contact checks are skipped while the body circle is clear of everything
+        self._body_radius = math.hypot(self.car.length / 2, self.car.width / 2)
+
+        # Peripheral timing
+        self._next_sonar = 0.0
+        self._next_camera = 0.0
+        self._encoder_accum = 0.0
+
+        # Metrics
+        self.distance_travelled = 0.0
+        self.wall_contacts = 0
+        self.pillar_contacts = 0
+        self.rear_contacts = 0
+        self.max_speed = 0.0
+        self._in_contact = False
+        self._last_contact_time = -1.0
+        self._progress_deg = 0.0
+        self._last_polar = self._polar_angle()
+
+    def _step(self, dt):
+        self.time += dt
+        self._update_actuators(dt)
+        self._integrate(dt)
+        self._update_encoder()
+        self._update_progress()
+
+        if self.time >= self._next_sonar:
+            self._next_sonar += self.sonar_period
+            self._emit_sonar()
+
+        if self.time >= self._next_camera:
+            self._emit_camera()
+
+    # === Physics ===
+
+    def _update_actuators(self, dt):
+        car = self.car
+        dir1_pin, dir2_pin, pwm = self._motor_pins
+        dir1 = dir1_pin.value
+        dir2 = dir2_pin.value
+        duty = pwm.duty / 65535
+
+        if dir1 and dir2 and duty > 0:
+            self.speed = self._approach(self.speed, 0.0, car.brake_decel * dt)
+        elif dir1 == dir2 or duty <= car.motor_deadband:
+            self.speed = self._approach(self.speed, 0.0, car.coast_decel * dt)
+        else:
+            direction = 1 if dir2 else -1
+            target = direction * car.top_speed * (duty - car.motor_deadband) / (1 - car.motor_deadband)
+            self.speed += (target - self.speed) * min(1.0, dt / car.motor_tau)
+
+        target_angle = self.commanded_servo_angle()
+        if target_angle is not None:
+            if target_angle != self.servo_angle:
+                self.servo_angle = self._approach(self.servo_angle, target_angle, car.servo_dps * dt)
+
+    @staticmethod
+    def _approach(value, target, step):
+        if value < target:
+            return min(target, value + step)
+        return max(target, value - step)
+
+    def _integrate(self, dt):
+        ds = self.speed * dt
+        if ds == 0.0:
+            return
+        wheel_angle = math.radians((self.servo_angle - self._servo_center) * self.car.steer_gain)
+        rad = math.radians(self.heading)
+        new_heading = (self.heading + math.degrees(ds * math.tan(wheel_angle) / self.car.wheelbase)) % 360
+        new_rad = math.radians(new_heading)
+
+        # The rear axle, half a wheelbase behind the centre, moves along the heading
+        # and the body swings around it
+        axle = self.car.wheelbase / 2
+        new_x = self.x + ds * math.sin(rad) + axle * (math.sin(new_rad) - math.sin(rad))
+        new_y = self.y + ds * math.cos(rad) + axle * (math.cos(new_rad) - math.cos(rad))
+
+        contact = self._check_contact(new_x, new_y, new_heading)
+        if contact:
+            if not self._in_contact and self.time - self._last_contact_time > self.CONTACT_RELEASE:
+                if contact == 'pillar':
+                    self.pillar_contacts += 1
+                elif ds < 0:
+                    # Reversing up to a wall (the corner turns do it on purpose)
+                    self.rear_contacts += 1
+                else:
+                    self.wall_contacts += 1
+            self._in_contact = True
+            self._last_contact_time = self.time
+
+            # Scrape along the obstacle: keep whichever partial motion is free
+            for cx, cy, ch in ((new_x, self.y, new_heading), (self.x, new_y, new_heading),
+                               (self.x, self.y, new_heading), (new_x, self.y, self.heading),
+                               (self.x, new_y, self.heading)):
+                if not self._check_contact(cx, cy, ch):
+                    ds = math.hypot(cx - self.x, cy - self.y) * (1 if ds >= 0 else -1)
+                    self.x, self.y, self.heading = cx, cy, ch
+                    break
+            else:
+                self.speed = 0.0
+                return
+        else:
+            self._in_contact = False
+            self.x, self.y, self.heading = new_x, new_y, new_heading
+
+        self.distance_travelled += abs(ds)
+        self._encoder_accum += abs(ds)
+        self.max_speed = max(self.max_speed, abs(self.speed))
+
+    def footprint(self, x=None, y=None, heading=None):
+        """Corners of the car body as (x, y) tuples."""
+        x = self.x if x is None else x
+        y = self.y if y is None else y
+        heading = self.heading if heading is None else heading
+        rad = math.radians(heading)
+        fx, fy = math.sin(rad), math.cos(rad)
+        rx, ry = fy, -fx
+        hl, hw = self.car.length / 2, self.car.width / 2
+        return [
+            (x + fx * hl - rx * hw, y + fy * hl - ry * hw),
+            (x + fx * hl + rx * hw, y + fy * hl + ry * hw),
+            (x - fx * hl + rx * hw, y - fy * hl + ry * hw),
+            (x - fx * hl - rx * hw, y - fy * hl - ry * hw)
+        ]
+
+    def _is_clear(self, x, y):
+        """Check if the circle around the body touches nothing (fast path)."""
+        r = self._body_radius
+        mat = self.mat
+        if x < r or y < r or x > MAT_SIZE - r or y > MAT_SIZE - r:
+            return False
+        if (mat.inner_min_x - r < x < mat.inner_max_x + r and
+                mat.inner_min_y - r < y < mat.inner_max_y + r):
+            return False
+        reach = r + 4.0
+        for pillar in mat.pillars:
+            if abs(pillar.x - x) < reach and abs(pillar.y - y) < reach:
+                return False
+        for wall in mat.parking_walls():
+            if (min(wall.x1, wall.x2) - r < x < max(wall.x1, wall.x2) + r and
+                    min(wall.y1, wall.y2) - r < y < max(wall.y1, wall.y2) + r):
+                return False
+        return True
+
+    def _check_contact(self, x, y, heading):
+        if self._is_clear(x, y):
+            return None
+        corners = self.footprint(x, y, heading)
+        samples = list(corners)
+        for i in range(4):
+            ax, ay = corners[i]
+            bx, by = corners[(i + 1) % 4]
+            samples.append(((ax + bx) / 2, (ay + by) / 2))
+
+        for sx, sy in samples:
+            if not self.mat.is_drivable(sx, sy):
+                return 'wall'
+
+        for pillar in self.mat.pillars:
+            if abs(pillar.x - x) > self.car.length or abs(pillar.y - y) > self.car.length:
+                continue
+            for sx, sy in samples:
+                if pillar.contains(sx, sy):
+                    return 'pillar'
+            for px, py in pillar.corners():
+                if self._point_in_polygon(px, py, corners):
+                    return 'pillar'
+
+        for wall in self.mat.parking_walls():
+            for i in range(4):
+                ax, ay = corners[i]
+                bx, by = corners[(i + 1) % 4]
+                if segments_intersect(ax, ay, bx, by, wall.x1, wall.y1, wall.x2, wall.y2):
+                    return 'wall'
+
+        return None
+
+    @staticmethod
+    def _point_in_polygon(px, py, polygon):
+        inside = False
+        n = len(polygon)
+        for i in range(n):
+            ax, ay = polygon[i]
+            bx, by = polygon[(i + 1) % n]
+            if (ay > py) != (by > py):
+                cross = ax + (py - ay) * (bx - ax) / (by - ay)
+                if px < cross:
+                    inside = not inside
+        return inside
+
+    def _polar_angle(self):
+        return math.degrees(math.atan2(self.x - MAT_SIZE / 2, self.y - MAT_SIZE / 2))
+
+    def _update_progress(self):
+        angle = self._polar_angle()
+        delta = angle - self._last_polar
+        if delta > 180:
+            delta -= 360
+        elif delta < -180:
+            delta += 360
+        self._progress_deg += delta
+        self._last_polar = angle
+
+    @property
+    def laps(self):
+        """Laps driven around the mat centre (signed: + clockwise)."""
+        return self._progress_deg / 360.0
+
+    # === Sensors ===
+
+    def _update_encoder(self):
+        edges = int(self._encoder_accum * self._steps_per_cm)
+        if edges <= 0:
+            return
+        self._encoder_accum -= edges / self._steps_per_cm
+        self.emit_encoder_edges(edges)
+
+    def sonar_distances(self):
+        """Current (left, rear, right, front) sonar readings in cm."""
+        rad = math.radians(self.heading)
+        fx, fy = math.sin(rad), math.cos(rad)
+        rx, ry = fy, -fx
+        readings = {}
+        for name, (forward, right, direction) in self.car.sonar_mounts.items():
+            sx = self.x + fx * forward + rx * right
+            sy = self.y + fy * forward + ry * right
+            distance = self.mat.cast_ray(sx, sy, self.heading + direction, 250.0)
+            if self.sonar_noise:
+                distance += self.random.gauss(0, self.sonar_noise)
+            readings[name] = int(max(0, min(250, distance)))
+        return readings['left'], readings['rear'], readings['right'], readings['front']
+
+    def _emit_sonar(self):
+        readings = self.sonar_distances()
+        self.emit_sonar_packet(*readings)
+        if self.on_sonar is not None:
+            self.on_sonar(self, readings)
+
+    def compass_bearing(self):
+        """Current CMPS12 bearing in degrees."""
+        bearing = self.heading + self.compass_north
+        if self.compass_noise:
+            bearing += self.random.gauss(0, self.compass_noise)
+        return bearing % 360
+
+    def visible_pillar(self):
+        """
+        Nearest pillar inside the camera field of view.
+
+        Returns:
+            (pillar, distance_cm, bearing_offset_deg) or None
+        """
+        rad = math.radians(self.heading)
+        cam_x = self.x + math.sin(rad) * self.car.length / 2
+        cam_y = self.y + math.cos(rad) * self.car.length / 2
+        best = None
+        for pillar in self.mat.pillars:
+            dx = pillar.x - cam_x
+            dy = pillar.y - cam_y
+            distance = math.hypot(dx, dy)
+            if distance > self.car.camera_range:
+                continue
+            offset = (math.degrees(math.atan2(dx, dy)) - self.heading + 180) % 360 - 180
+            if abs(offset) > self.car.camera_fov / 2:
+                continue
+            if best is None or distance < best[1]:
+                best = (pillar, distance, offset)
+        return best
+
+    def _emit_camera(self):
+        seen = self.visible_pillar()
+        if seen is None:
+            interval = self.emit_camera(3, fps=self.camera_fps)
+        else:
+            color_byte = 1 if seen[0].color == RED else 2 if seen[0].color == GREEN else 3
+            interval = self.emit_camera(color_byte, seen[2] / (self.car.camera_fov / 2) * 100,
+                                        seen[1] * 10, 200, fps=self.camera_fps)
+        self._next_camera = self.time + interval
+
+    def pose(self):
+        """Current (x, y, heading_deg)."""
+        return self.x, self.y, self.heading
@@ -0,0 +1,366 @@
+"""
+Parameter Tuning
+Evaluates RobotConfig parameter sets over many simulated runs in a process
+pool and searches the parameter space (grid, random or Bayesian).
+"""
+
+import itertools
+import json
+import math
+import multiprocessing
+import random
+
+
+# Gains and distances that are otherwise hand-tuned on the mat
+DEFAULT_SPACE = {
+    'navigation.default_max_speed': (0.5, 0.9),
+    'navigation.sonar_multiplier': (0.1, 0.5),
+    'navigation.compass_multiplier': (0.05, 0.3),
+    'navigation.open_wall_distance': (20, 45),
+    'navigation.open_blind_distance': (150, 230),
+    'navigation.rotate_speed_min': (0.15, 0.3),
+    'navigation.rotate_speed_max': (0.3, 0.6),
+    'navigation.corner_speed_min': (0.18, 0.3),
+    'navigation.corner_speed_max': (0.3, 0.6)
+}
+
+
+class Parameter:
+    """One tunable config value: a continuous/integer range or a list of choices."""
+
+    def __init__(self, key, spec):
+        """
+        Initialize a parameter.
+
+        Args:
+            key: Dotted RobotConfig path
+            spec: (low, high) range, or list of explicit values
+        """
+        self.key = key
+        if isinstance(spec, tuple) and len(spec) == 2:
+            self.low, self.high = spec
+            self.values = None
+            self.is_int = isinstance(self.low, int) and isinstance(self.high, int)
+        else:
+            self.values = list(spec)
+            self.low = self.high = None
+            self.is_int = False
+
+    def grid(self, steps):
+        """Get evenly spaced values for grid search."""
+        if self.values is not None:
+            return list(self.values)
+        if steps <= 1:
+            return [self.cast((self.low + self.high) / 2)]
+        values = [self.cast(self.low + (self.high - self.low) * i / (steps - 1)) for i in range(steps)]
+        return sorted(set(values), key=values.index)
+
+    def sample(self, rng):
+        """Draw a uniform random value."""
+        if self.values is not None:
+            return rng.choice(self.values)
+        return self.cast(rng.uniform(self.low, self.high))
+
+    def to_unit(self, value):
+        """Map a value into [0, 1] for the surrogate model."""
+        if self.values is not None:
+            index = self.values.index(value)
+            return index / (len(self.values) - 1) if len(self.values) > 1 else 0.0
+        return (value - self.low) / (self.high - self.low) if self.high != self.low else 0.0
+
+    def cast(self, value):
+        if self.is_int:
+            return int(round(value))
+        return round(value, 4)
+
+
+def parse_parameter(text):
+    """
+    Parse a command line parameter spec.
+
+    "key=low:high" gives a range, "key=a,b,c" a list of values.
+
+    Returns:
+        (key, spec)
+    """
+    key, _, spec = text.partition('=')
+    if ':' in spec:
+        low, high = (json.loads(v) for v in spec.split(':', 1))
+        return key, (low, high)
+    return key, [json.loads(v) for v in spec.split(',')]
+
+
+class Score:
+    """Aggregated metrics of one parameter set over its runs."""
+
+    def __init__(self, params, results, contact_penalty=2.0, failure_penalty=120.0):
+        self.params = params
+        self.runs = len(results)
+        successes = [r for r in results if r['success']]
+        self.success_rate = len(successes) / self.runs if self.runs else 0.0
+        lap_times = [r['lap_time'] for r in successes if r['lap_time']]
+        self.lap_time = sum(lap_times) / len(lap_times) if lap_times else None
+        self.wall_contacts = sum(r['wall_contacts'] for r in results) / self.runs if self.runs else 0.0
+        self.pillar_contacts = sum(r['pillar_contacts'] for r in results) / self.runs if self.runs else 0.0
+        self.errors = sorted(set(r['error'] for r in results if r['error']))
+
+        # Lower is better: lap time, plus penalties for touching and failing
+        lap_time = self.lap_time if self.lap_time is not None else failure_penalty
+        self.cost = (lap_time + contact_penalty * (self.wall_contacts + self.pillar_contacts) +
+                     failure_penalty * (1.0 - self.success_rate))
+
+    def as_dict(self):
+        return {
+            'params': self.params,
+            'runs': self.runs,
+            'success_rate': round(self.success_rate, 3),
+            'lap_time': round(self.lap_time, 2) if self.lap_time is not None else None,
+            'wall_contacts': round(self.wall_contacts, 2),
+            'pillar_contacts': round(self.pillar_contacts, 2),
+            'cost': round(self.cost, 2),
+            'errors': self.errors
+        }
+
+
+def _run_job(job):
+    """Pool worker: one simulated run. Must stay top-level for pickling."""
+    from .harness import run_challenge
+    from .simulation import CarModel
+
+    index, params, challenge, clockwise, seed, time_limit, car_options, sim_options = job
+    result = run_challenge(challenge, clockwise=clockwise, config_overrides=params,
+                           car=CarModel(**car_options), seed=seed, time_limit=time_limit,
+                           sim_options=sim_options)
+    data = result.as_dict()
+    data['lap_time'] = result.lap_time
+    return index, data
+
+
+class Tuner:
+    """Evaluates parameter sets in parallel and keeps every score."""
+
+    def __init__(self, space=None, challenge='open', seeds=(0,), directions=(True, False),
+                 time_limit=240.0, workers=None, car_options=None, sim_options=None,
+                 contact_penalty=2.0, failure_penalty=120.0, fixed=None, log=print):
+        """
+        Initialize the tuner.
+
+        Args:
+            space: Dict of dotted key -> (low, high) or list of values (default: DEFAULT_SPACE)
+            challenge: 'open' or 'obstacle'
+            seeds: Layout/noise seeds every parameter set is run with
+            directions: Driving directions to run (True = clockwise)
+            time_limit: Virtual seconds per run
+            workers: Process count (default: CPU count)
+            car_options: CarModel keyword arguments
+            sim_options: Simulation keyword arguments
+            contact_penalty: Seconds added per wall or pillar contact
+            failure_penalty: Seconds added for a failed run
+            fixed: Overrides applied to every run but not searched
+            log: Progress callback (None to silence)
+        """
+        self.parameters = [Parameter(key, spec) for key, spec in (space or DEFAULT_SPACE).items()]
+        self.challenge = challenge
+        self.seeds = tuple(seeds)
+        self.directions = tuple(directions)
+        self.time_limit = time_limit
+        self.workers = workers or multiprocessing.cpu_count()
+        self.car_options = dict(car_options or {})
+        self.sim_options = dict(sim_options or {})
+        self.contact_penalty = contact_penalty
+        self.failure_penalty = failure_penalty
+        self.fixed = dict(fixed or {})
+        self.log = log
+        self.scores = []
+
+    # === Evaluation ===
+
+    def evaluate(self, param_sets):
+        """
+        Run every parameter set over all seeds and directions.
+
+        Args:
+            param_sets: List of {dotted key: value} dicts
+
+        Returns:
+            list: Score per parameter set, in input order
+        """
+        jobs = []
+        for index, params in enumerate(param_sets):
+            overrides = dict(self.fixed)
+            overrides.update(params)
+            for seed in self.seeds:
+                for clockwise in self.directions:
+                    jobs.append((index, overrides, self.challenge, clockwise, seed, self.time_limit,
+                                 self.car_options, self.sim_options))
+
+        results = [[] for _ in param_sets]
+        if self.workers > 1 and len(jobs) > 1:
+            with multiprocessing.Pool(min(self.workers, len(jobs))) as pool:
+                for index, data in pool.imap_unordered(_run_job, jobs):
+                    results[index].append(data)
+        else:
+            for job in jobs:
+                index, data = _run_job(job)
+                results[index].append(data)
+
+        scores = [Score(params, runs, self.contact_penalty, self.failure_penalty)
+                  for params, runs in zip(param_sets, results)]
+        for score in scores:
+            self.scores.append(score)
+            if self.log:
+                self.log(self._format(score))
+        return scores
+
+    def best(self):
+        """Get the lowest-cost score so far."""
+        return min(self.scores, key=lambda s: s.cost) if self.scores else None
+
+    def _format(self, score):
+        lap = f"{score.lap_time:6.1f}s" if score.lap_time is not None else "   -   "
+        params = ", ".join(f"{k.split('.')[-1]}={v}" for k, v in score.params.items())
+        return (f"cost {score.cost:7.1f} | success {score.success_rate:4.0%} | lap {lap} | "
+                f"contacts {score.wall_contacts + score.pillar_contacts:5.1f} | {params}")
+
+    # === Search strategies ===
+
+    def grid_search(self, steps=3):
+        """Evaluate the full grid (ranges split into `steps` values)."""
+        axes = [p.grid(steps) for p in self.parameters]
+        param_sets = [dict(zip((p.key for p in self.parameters), combo))
+                      for combo in itertools.product(*axes)]
+        self.evaluate(param_sets)
+        return self.best()
+
+    def random_search(self, trials=20, seed=0):
+        """Evaluate uniformly sampled parameter sets."""
+        rng = random.Random(seed)
+        self.evaluate([self._sample(rng) for _ in range(trials)])
+        return self.best()
+
+    def bayesian_search(self, trials=20, initial=None, batch=None, seed=0, candidates=500):
+        """
+        Gaussian-process search with expected improvement.
+
+        Starts with random samples, then repeatedly fits a GP to the costs so
+        far and evaluates the batch of candidates with the highest expected
+        improvement.
+
+        Args:
+            trials: Total parameter sets to evaluate
+            initial: Random sets before the model is used (default: max(5, trials // 4))
+            batch: Sets proposed per round (default: worker count)
+            seed: Sampling seed
+            candidates: Random candidates scored per round
+        """
+        rng = random.Random(seed)
+        initial = min(trials, initial or max(5, trials // 4))
+        batch = batch or max(1, self.workers // max(1, len(self.seeds) * len(self.directions)))
+        self.evaluate([self._sample(rng) for _ in range(initial)])
+
+        remaining = trials - initial
+        while remaining > 0:
+            x = [self._to_unit(s.params) for s in self.scores]
+            y = [s.cost for s in self.scores]
+            pool = [self._sample(rng) for _ in range(candidates)]
+            ei = _expected_improvement(x, y, [self._to_unit(p) for p in pool])
+            order = sorted(range(len(pool)), key=lambda i: -ei[i])
+            proposals = [pool[i] for i in order[:min(batch, remaining)]]
+            self.evaluate(proposals)
+            remaining -= len(proposals)
+
+        return self.best()
+
+    def _sample(self, rng):
+        return {p.key: p.sample(rng) for p in self.parameters}
+
+    def _to_unit(self, params):
+        return [p.to_unit(params[p.key]) for p in self.parameters]
+
+    # === Output ===
+
+    def write_config(self, filename, score=None):
+        """
+        Write a parameter set as a RobotConfig JSON file.
+
+        Args:
+            filename: Output path (copy to the Pico as robot_config.json)
+            score: Score to write (default: best)
+        """
+        from .harness import make_config
+
+        score = score or self.best()
+        overrides = dict(self.fixed)
+        overrides.update(score.params)
+        make_config(overrides).save_to_file(filename)
+
+    def write_report(self, filename):
+        """Write every evaluated parameter set, best first, as JSON."""
+        ranked = sorted(self.scores, key=lambda s: s.cost)
+        with open(filename, 'w') as f:
+            json.dump([s.as_dict() for s in ranked], f, indent=2)
+
+
+def _expected_improvement(x, y, candidates, length_scale=0.25, noise=1e-3, xi=0.01):
+    """
+    Expected improvement of candidates under a GP (RBF kernel) fitted to (x, y).
+
+    Plain Python: the sample counts are small and the simulator stays
+    dependency-free.
+    """
+    mean = sum(y) / len(y)
+    std = math.sqrt(sum((v - mean) ** 2 for v in y) / len(y)) or 1.0
+    y_norm = [(v - mean) / std for v in y]
+
+    def kernel(a, b):
+        d2 = sum((ai - bi) ** 2 for ai, bi in zip(a, b))
+        return math.exp(-0.5 * d2 / length_scale ** 2)
+
+    n = len(x)
+    k = [[kernel(x[i], x[j]) + (noise if i == j else 0.0) for j in range(n)] for i in range(n)]
+    chol = _cholesky(k)
+    alpha = _solve_upper(chol, _solve_lower(chol, y_norm))
+    best = min(y_norm)
+
+    scores = []
+    for c in candidates:
+        k_star = [kernel(c, xi_) for xi_ in x]
+        mu = sum(ks * a for ks, a in zip(k_star, alpha))
+        v = _solve_lower(chol, k_star)
+        sigma = math.sqrt(max(1.0 - sum(vi * vi for vi in v), 1e-9))
+        z = (best - mu - xi) / sigma
+        cdf = 0.5 * (1 + math.erf(z / math.sqrt(2)))
+        pdf = math.exp(-0.5 * z * z) / math.sqrt(2 * math.pi)
+        scores.append((best - mu - xi) * cdf + sigma * pdf)
+    return scores
+
+
+def _cholesky(a):
+    """Lower-triangular L with L L^T = a."""
+    n = len(a)
+    low = [[0.0] * n for _ in range(n)]
+    for i in range(n):
+        for j in range(i + 1):
+            total = a[i][j] - sum(low[i][k] * low[j][k] for k in range(j))
+            if i == j:
+                low[i][j] = math.sqrt(max(total, 1e-12))
+            else:
+                low[i][j] = total / low[j][j]
+    return low
+
+
+def _solve_lower(low, b):
+    """Solve L z = b."""
+    z = []
+    for i, row in enumerate(low):
+        z.append((b[i] - sum(row[k] * z[k] for k in range(i))) / row[i])
+    return z
+
+
+def _solve_upper(low, b):
+    """Solve L^T z = b."""
+    n = len(low)
+    z = [0.0] * n
+    for i in range(n - 1, -1, -1):
+        z[i] = (b[i] - sum(low[k][i] * z[k] for k in range(i + 1, n))) / low[i][i]
+    return z
@@ -0,0 +1,233 @@
+"""
+WRO Mat Geometry
+Walls, pillars and parking zone of the Future Engineers mat, with ray casting.
+
+Coordinates are in centimeters with the origin at the south-west corner of
+the mat, x pointing east and y pointing north. Headings are compass style:
+0° = north, 90° = east, increasing clockwise.
+"""
+
+import math
+
+
+MAT_SIZE = 300.0
+PILLAR_SIZE = 5.0
+
+RED = 'red'
+GREEN = 'green'
+
+
+class Segment:
+    """A straight wall segment."""
+
+    def __init__(self, x1, y1, x2, y2, kind='wall'):
+        self.x1 = x1
+        self.y1 = y1
+        self.x2 = x2
+        self.y2 = y2
+        self.kind = kind
+
+    def __repr__(self):
+        return f"Segment(({self.x1}, {self.y1}) -> ({self.x2}, {self.y2}), {self.kind})"
+
+
+class Pillar:
+    """A 5cm square traffic sign pillar."""
+
+    def __init__(self, x, y, color):
+        self.x = x
+        self.y = y
+        self.color = color
+
+    def contains(self, x, y, margin=0.0):
+        """Check if a point lies inside the pillar footprint."""
+        half = PILLAR_SIZE / 2 + margin
+        return abs(x - self.x) <= half and abs(y - self.y) <= half
+
+    def corners(self):
+        """Get the four footprint corners."""
+        half = PILLAR_SIZE / 2
+        return [
+            (self.x - half, self.y - half),
+            (self.x + half, self.y - half),
+            (self.x + half, self.y + half),
+            (self.x - half, self.y + half)
+        ]
+
+    def segments(self):
+        """Get the footprint as wall segments (for ray casting)."""
+        c = self.corners()
+        return [Segment(c[i][0], c[i][1], c[(i + 1) % 4][0], c[(i + 1) % 4][1], 'pillar')
+                for i in range(4)]
+
+    def __repr__(self):
+        return f"Pillar({self.x}, {self.y}, {self.color})"
+
+
+class Mat:
+    """
+    The WRO Future Engineers mat.
+
+    The outer walls form a 3m x 3m square. The inner walls form a square whose
+    distance to each outer wall is the corridor width of that side (60 or 100cm).
+    Sides are indexed 0=south, 1=west, 2=north, 3=east.
+    """
+
+    SOUTH = 0
+    WEST = 1
+    NORTH = 2
+    EAST = 3
+
+    def __init__(self, corridor_widths=(100, 100, 100, 100), pillars=None, parking_side=None,
+                 parking_length=30, parking_depth=20, parking_offset=None):
+        """
+        Initialize the mat.
+
+        Args:
+            corridor_widths: Corridor width in cm for (south, west, north, east)
+            pillars: List of Pillar objects
+            parking_side: Side index holding the parking lot (None for no parking lot)
+            parking_length: Distance between the parking lot walls in cm
+            parking_depth: How far the parking walls stick out from the outer wall in cm
+            parking_offset: Position of the lot centre along the side (default: middle)
+        """
+        self.corridor_widths = tuple(corridor_widths)
+        self.pillars = list(pillars or [])
+        self.parking_side = parking_side
+        self.parking_length = parking_length
+        self.parking_depth = parking_depth
+        self.parking_offset = parking_offset if parking_offset is not None else MAT_SIZE / 2
+
+        south, west, north, east = self.corridor_widths
+        self.inner_min_x = west
+        self.inner_min_y = south
+        self.inner_max_x = MAT_SIZE - east
+        self.inner_max_y = MAT_SIZE - north
+
+        self.walls = self._build_walls()
+        self._parking_walls = [w for w in self.walls if w.kind == 'parking']
+        self._ray_segments = self.walls + [seg for p in self.pillars for seg in p.segments()]
+
+    @classmethod
+    def standard(cls, layout=None, corridor_widths=(100, 100, 100, 100), parking_side=None):
+        """
+        Build a mat from a compact pillar layout.
+
+        Args:
+            layout: Dict mapping side index to a list of (along_cm, from_outer_cm, color).
+                along_cm is measured along the side from its west/south end,
+                from_outer_cm from the outer wall towards the inner wall.
+            corridor_widths: Corridor width in cm for (south, west, north, east)
+            parking_side: Side index holding the parking lot
+
+        Returns:
+            Mat
+        """
+        pillars = []
+        for side, entries in (layout or {}).items():
+            for along, from_outer, color in entries:
+                x, y = cls.side_to_world(side, along, from_outer)
+                pillars.append(Pillar(x, y, color))
+        return cls(corridor_widths=corridor_widths, pillars=pillars, parking_side=parking_side)
+
+    @staticmethod
+    def side_to_world(side, along, from_outer):
+        """Convert side-relative coordinates into world coordinates."""
+        if side == Mat.SOUTH:
+            return along, from_outer
+        if side == Mat.NORTH:
+            return along, MAT_SIZE - from_outer
+        if side == Mat.WEST:
+            return from_outer, along
+        return MAT_SIZE - from_outer, along
+
+    def side_of(self, x, y):
+        """Get the side index whose corridor contains a point (corners count for both)."""
+        distances = (y, x, MAT_SIZE - y, MAT_SIZE - x)
+        return min(range(4), key=lambda i: distances[i])
+
+    def _build_walls(self):
+        """Create outer, inner and parking wall segments."""
+        s = MAT_SIZE
+        walls = [
+            Segment(0, 0, s, 0, 'outer'),
+            Segment(s, 0, s, s, 'outer'),
+            Segment(s, s, 0, s, 'outer'),
+            Segment(0, s, 0, 0, 'outer'),
+            Segment(self.inner_min_x, self.inner_min_y, self.inner_max_x, self.inner_min_y, 'inner'),
+            Segment(self.inner_max_x, self.inner_min_y, self.inner_max_x, self.inner_max_y, 'inner'),
+            Segment(self.inner_max_x, self.inner_max_y, self.inner_min_x, self.inner_max_y, 'inner'),
+            Segment(self.inner_min_x, self.inner_max_y, self.inner_min_x, self.inner_min_y, 'inner'),
+        ]
+
+        if self.parking_side is not None:
+            half = self.parking_length / 2
+            for along in (self.parking_offset - half, self.parking_offset + half):
+                x1, y1 = self.side_to_world(self.parking_side, along, 0)
+                x2, y2 = self.side_to_world(self.parking_side, along, self.parking_depth)
+                walls.append(Segment(x1, y1, x2, y2, 'parking'))
+
+        return walls
+
+    def is_drivable(self, x, y):
+        """Check if a point lies in the corridor between outer and inner walls."""
+        if x <= 0 or y <= 0 or x >= MAT_SIZE or y >= MAT_SIZE:
+            return False
+        if self.inner_min_x < x < self.inner_max_x and self.inner_min_y < y < self.inner_max_y:
+            return False
+        return True
+
+    def pillar_at(self, x, y):
+        """Get the pillar covering a point, if any."""
+        for pillar in self.pillars:
+            if pillar.contains(x, y):
+                return pillar
+        return None
+
+    def parking_walls(self):
+        """Get the parking lot wall segments."""
+        return self._parking_walls
+
+    def cast_ray(self, x, y, heading_deg, max_range):
+        """
+        Distance from a point to the first wall or pillar along a heading.
+
+        Args:
+            x, y: Ray origin in cm
+            heading_deg: Compass heading of the ray
+            max_range: Returned when nothing is hit closer
+
+        Returns:
+            float: Distance in cm
+        """
+        rad = math.radians(heading_deg)
+        dx = math.sin(rad)
+        dy = math.cos(rad)
+        best = max_range
+
+        for seg in self._ray_segments:
+            ex = seg.x2 - seg.x1
+            ey = seg.y2 - seg.y1
+            denom = dx * ey - dy * ex
+            if abs(denom) < 1e-12:
+                continue
+            wx = seg.x1 - x
+            wy = seg.y1 - y
+            t = (wx * ey - wy * ex) / denom
+            u = (wx * dy - wy * dx) / denom
+            if 0 < t < best and 0.0 <= u <= 1.0:
+                best = t
+
+        return best
+
+
+def segments_intersect(ax, ay, bx, by, cx, cy, dx, dy):
+    """Check if segment AB intersects segment CD."""
+    def orient(px, py, qx, qy, rx, ry):
+        return (qx - px) * (ry - py) - (qy - py) * (rx - px)
+
+    o1 = orient(ax, ay, bx, by, cx, cy)
+    o2 = orient(ax, ay, bx, by, dx, dy)
+    o3 = orient(cx, cy, dx, dy, ax, ay)
+    o4 = orient(cx, cy, dx, dy, bx, by)
+    return (o1 > 0) != (o2 > 0) and (o3 > 0) != (o4 > 0)
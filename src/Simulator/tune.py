@@ -0,0 +1,88 @@
+"""
+Tune navigation parameters over simulated runs.
+
+Usage:
+    python tune.py --search random --trials 40
+    python tune.py --search grid --steps 3 --param navigation.sonar_multiplier=0.1:0.4 \
+        --param navigation.open_wall_distance=25,30,35
+    python tune.py --search bayes --trials 30 --seeds 0 1 2 --out robot_config.json
+
+The best parameter set is written as a RobotConfig JSON file; copy it to the
+Pico as robot_config.json.
+"""
+
+import argparse
+import json
+import sys
+
+from sim import Tuner, DEFAULT_SPACE, parse_parameter
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search navigation parameters in the simulator")
+    parser.add_argument('--search', choices=['grid', 'random', 'bayes'], default='random')
+    parser.add_argument('--challenge', choices=['open', 'obstacle'], default='open')
+    parser.add_argument('--param', action='append', default=[], metavar='KEY=LOW:HIGH|A,B,C',
+                        help="Parameter to search (repeatable, default: built-in navigation space)")
+    parser.add_argument('--set', action='append', default=[], metavar='KEY=VALUE',
+                        help="Fixed RobotConfig override for every run (repeatable)")
+    parser.add_argument('--trials', type=int, default=20, help="Parameter sets for random/bayes search")
+    parser.add_argument('--steps', type=int, default=3, help="Values per range for grid search")
+    parser.add_argument('--seeds', type=int, nargs='+', default=[0], help="Seeds each set is run with")
+    parser.add_argument('--direction', choices=['both', 'cw', 'ccw'], default='both')
+    parser.add_argument('--time-limit', type=float, default=240.0, help="Virtual seconds per run")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument('--contact-penalty', type=float, default=2.0, help="Seconds added per contact")
+    parser.add_argument('--failure-penalty', type=float, default=120.0, help="Seconds added per failed run")
+    parser.add_argument('--random-seed', type=int, default=0, help="Seed for random/bayes sampling")
+    parser.add_argument('--out', default='robot_config.json', help="Best RobotConfig JSON")
+    parser.add_argument('--report', default=None, help="Write all results as JSON")
+    args = parser.parse_args()
+
+    space = dict(parse_parameter(p) for p in args.param) if args.param else DEFAULT_SPACE
+
+    fixed = {}
+    for item in args.set:
+        key, _, value = item.partition('=')
+        try:
+            fixed[key] = json.loads(value)
+        except ValueError:
+            fixed[key] = value
+
+    directions = {'both': (True, False), 'cw': (True,), 'ccw': (False,)}[args.direction]
+
+    tuner = Tuner(
+        space=space,
+        challenge=args.challenge,
+        seeds=args.seeds,
+        directions=directions,
+        time_limit=args.time_limit,
+        workers=args.workers,
+        contact_penalty=args.contact_penalty,
+        failure_penalty=args.failure_penalty,
+        fixed=fixed
+    )
+
+    if args.search == 'grid':
+        best = tuner.grid_search(steps=args.steps)
+    elif args.search == 'bayes':
+        best = tuner.bayesian_search(trials=args.trials, seed=args.random_seed)
+    else:
+        best = tuner.random_search(trials=args.trials, seed=args.random_seed)
+
+    if best is None:
+        print("No parameter sets evaluated")
+        return 1
+
+    print("\n=== Best parameter set ===")
+    for key, value in best.as_dict().items():
+        print(f"{key:16s} {value}")
+
+    tuner.write_config(args.out, best)
+    if args.report:
+        tuner.write_report(args.report)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
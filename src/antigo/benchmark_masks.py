@@ -0,0 +1,148 @@
+"""
+Benchmark of the colour masks: the previous inRange chain against the
+lookup-table classifier in Camera.get_color_masks.
+
+Usage:
+	python benchmark_masks.py                    # synthetic 1441x604 crop
+	python benchmark_masks.py frame1.png ...     # recorded frames (cropped/padded to 1441x604)
+	python benchmark_masks.py --runs 50
+
+Run from this directory so the thresholds come from config.json. Both
+pipelines start from the BGR crop (cvtColor included) and end with cleaned
+masks for every colour; the masks are checked to be identical.
+"""
+
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from camera import Camera
+from config import Config
+
+WIDTH = 1441
+HEIGHT = 604
+
+
+def inrange_classify(hsv, config):
+	# The previous Camera.get_hsv_mask thresholding: up to six inRange per colour
+	h_min, s_min, v_min = config["lower"]
+	h_max, s_max, v_max = config["upper"]
+
+	if h_min > h_max:
+		mask = cv2.bitwise_or(cv2.inRange(hsv, (0, 0, 0), (h_max, 255, 255)), cv2.inRange(hsv, (h_min, 0, 0), (179, 255, 255)))
+	else:
+		mask = cv2.inRange(hsv, (h_min, 0, 0), (h_max, 255, 255))
+
+	if s_min > s_max:
+		mask3 = cv2.bitwise_or(cv2.inRange(hsv, (0, 0, 0), (179, s_max, 255)), cv2.inRange(hsv, (0, s_min, 0), (179, 255, 255)))
+		mask = cv2.bitwise_and(mask, mask3)
+	else:
+		mask = cv2.bitwise_and(mask, cv2.inRange(hsv, (0, s_min, 0), (179, s_max, 255)))
+
+	if v_min > v_max:
+		mask3 = cv2.bitwise_or(cv2.inRange(hsv, (0, 0, 0), (179, 255, v_max)), cv2.inRange(hsv, (0, 0, v_min), (179, 255, 255)))
+		mask = cv2.bitwise_and(mask, mask3)
+	else:
+		mask = cv2.bitwise_and(mask, cv2.inRange(hsv, (0, 0, v_min), (179, 255, v_max)))
+
+	return mask
+
+
+def inrange_mask(hsv, config):
+	# The previous Camera.get_hsv_mask, morphology included
+	mask = inrange_classify(hsv, config)
+
+	kernel = np.ones((3, 3), np.uint8)
+	mask = cv2.erode(mask, kernel, iterations=1)
+	mask = cv2.dilate(mask, kernel, iterations=1)
+	return cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel)
+
+
+def synthetic_frame(seed=0):
+	# White mat, black walls along the top, red and green pillars, sensor noise
+	rng = np.random.default_rng(seed)
+	img = np.full((HEIGHT, WIDTH, 3), 205, dtype=np.uint8)
+	img[:120] = (30, 30, 30)
+
+	for x, y, w, h, color in ((200, 180, 70, 220, (40, 30, 200)), (650, 140, 50, 160, (60, 170, 40)),
+							  (1050, 220, 90, 300, (45, 40, 190)), (1300, 130, 40, 120, (70, 160, 50))):
+		img[y:y + h, x:x + w] = color
+
+	noise = rng.normal(0, 8, img.shape)
+	return np.clip(img + noise, 0, 255).astype(np.uint8)
+
+
+def load_frame(path):
+	img = cv2.imread(path)
+	if img is None:
+		raise SystemExit(f"Cannot read {path}")
+
+	out = np.zeros((HEIGHT, WIDTH, 3), dtype=np.uint8)
+	h = min(HEIGHT, img.shape[0])
+	w = min(WIDTH, img.shape[1])
+	out[:h, :w] = img[:h, :w]
+	return out
+
+
+def time_ms(func, runs):
+	func()
+	best = None
+	total = 0.0
+
+	for _ in range(runs):
+		start = time.perf_counter()
+		func()
+		elapsed = (time.perf_counter() - start) * 1000
+		total += elapsed
+		best = elapsed if best is None else min(best, elapsed)
+
+	return total / runs, best
+
+
+def main(argv):
+	runs = 20
+	paths = []
+	args = iter(argv)
+
+	for arg in args:
+		if arg == "--runs":
+			runs = int(next(args))
+		else:
+			paths.append(arg)
+
+	Config.init()
+	frames = [load_frame(path) for path in paths] or [synthetic_frame()]
+	colors = Config.config["camera"]["colors"]
+
+	print(f"{len(frames)} frame(s) of {WIDTH}x{HEIGHT}, colours: {', '.join(colors)}, OpenCV {cv2.__version__}")
+
+	for index, frame in enumerate(frames):
+		def before():
+			hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
+			return {name: inrange_mask(hsv, colors[name]) for name in colors}
+
+		def after():
+			hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
+			return Camera.get_color_masks(hsv, colors)
+
+		old_masks = before()
+		new_masks = after()
+		mismatch = sum(int(np.count_nonzero(old_masks[name] != new_masks[name])) for name in colors)
+
+		hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
+		old_classify = lambda: [inrange_classify(hsv, colors[name]) for name in colors]
+		new_classify = lambda: Camera.classify(hsv, Camera.get_color_lut(colors)[1])
+
+		print(f"\nFrame {index}: mask pixels differing {mismatch}")
+		print(f"{'':28s} {'mean ms':>8s} {'best ms':>8s}")
+
+		for label, func in (("inRange chain + morphology", before), ("LUT classifier + morphology", after),
+							("classification only: inRange", old_classify), ("classification only: LUT", new_classify)):
+			mean, best = time_ms(func, runs)
+			print(f"{label:28s} {mean:8.2f} {best:8.2f}")
+
+
+if __name__ == "__main__":
+	main(sys.argv[1:])
@@ -0,0 +1,446 @@
+"""
+Offline benchmark and regression check of the traffic sign pipeline over recorded frames.
+
+Usage:
+	python benchmark_vision.py frames/                     # every .png/.jpg in frames/
+	python benchmark_vision.py --synthetic 40              # generated frames with known pillars
+	python benchmark_vision.py frames/ --variant half:processing.scale=0.5 --variant 'lo:capture="yuv",lores=[640,360]'
+	python benchmark_vision.py frames/ --runs 5 --workers 4
+	python benchmark_vision.py frames/ --save              # store the results as baseline
+	python benchmark_vision.py frames/                     # ... and compare later runs with it
+
+Frames are main stream captures (1537x864) or crops as /video_feed serves them.
+Optional frames/labels.json holds the pillars of each frame in crop pixels:
+	{"frame_001.png": [{"color": "red", "box": [x, y, w, h]}, ...]}
+
+Every variant overrides keys of Config.config["camera"] (dotted paths, JSON values);
+without --variant the full, half scale and lores YUV pipelines are compared. Frames
+are split among a process pool; fps and latency are per frame on one core (capture
+copy, preparation and detection). pool fps is the throughput of the whole pool: the
+frames are loaded before the pool starts, the workers start together and only the
+detection passes are timed.
+walls ms is the p50 of the wall detection alone, part of the latency when enabled.
+
+With a baseline (--baseline, default vision_baseline.json next to this file) every
+variant is compared with its saved results: the run exits with 1 if fps or pool fps
+drop, or p50 or p99 rise, by more than --tolerance (default 0.3), or if precision or
+recall drop by more than --score-tolerance (default 0.02). --save stores the results
+instead. Timings only compare on the machine and frames the baseline was saved with.
+
+Run from this directory so the thresholds come from config.json.
+"""
+
+import copy
+import json
+import os
+import re
+import sys
+import time
+from multiprocessing import Barrier, Pool
+
+import cv2
+import numpy as np
+
+from camera import Camera
+from config import Config
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "vision_baseline.json")
+
+VARIANTS = [
+	("full", {"capture": "rgb", "processing.scale": 1}),
+	("half", {"capture": "rgb", "processing.scale": 0.5}),
+	("yuv", {"capture": "yuv"}),
+]
+
+
+def parse_variant(text):
+	# "name:key=value,key=value", values may hold commas (lists)
+	name, _, settings = text.partition(":")
+	overrides = {}
+
+	for setting in filter(None, re.split(r",(?=[\w.]+=)", settings)):
+		key, _, value = setting.partition("=")
+		try:
+			overrides[key] = json.loads(value)
+		except json.JSONDecodeError:
+			overrides[key] = value
+
+	return name, overrides
+
+
+def apply_overrides(camera_config, overrides):
+	camera_config = copy.deepcopy(camera_config)
+
+	for key, value in overrides.items():
+		target = camera_config
+		*path, last = key.split(".")
+		for part in path:
+			target = target.setdefault(part, {})
+		target[last] = value
+
+	return camera_config
+
+
+def get_crop_box():
+	# Crop (left, top, right, bottom) in the main stream
+	crop = Config.config["camera"]["crop"]
+	return crop["left"], crop["top"], min(crop["width"], Camera.size[0]), min(crop["height"], Camera.size[1])
+
+
+def to_main_frame(img):
+	# Recorded crops are put back where the crop takes them from
+	width, height = Camera.size
+	if img.shape[:2] == (height, width):
+		return img
+
+	left, top, right, bottom = get_crop_box()
+	main = np.zeros((height, width, 3), dtype=np.uint8)
+	h = min(bottom - top, img.shape[0])
+	w = min(right - left, img.shape[1])
+	main[top:top + h, left:left + w] = img[:h, :w]
+	return main
+
+
+def to_lores(main):
+	# The lores YUV420 buffer picamera2 would give for this frame, (height * 3 / 2, width)
+	width, height = Camera.get_lores_size()
+	ycrcb = cv2.cvtColor(cv2.resize(main, (width, height), interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2YCrCb)
+
+	buffer = np.empty((height * 3 // 2, width), dtype=np.uint8)
+	buffer[:height] = ycrcb[:, :, 0]
+
+	chroma = buffer[height:].reshape(-1)
+	plane = (height // 2) * (width // 2)
+	for index, channel in enumerate((2, 1)):
+		chroma[index * plane:(index + 1) * plane] = cv2.resize(ycrcb[:, :, channel], (width // 2, height // 2), interpolation=cv2.INTER_AREA).reshape(-1)
+
+	return buffer
+
+
+def capture_frame(main, lores):
+	# The frame capture() publishes
+	if Camera.yuv_mode():
+		top, bottom, left, right = Camera.get_yuv_crop()[:4]
+		y, u, v = Camera.get_yuv_planes(lores, Camera.get_lores_size())
+		return cv2.merge((y[top:bottom, left:right], v[top:bottom, left:right], u[top:bottom, left:right]))
+
+	crop = Config.config["camera"]["crop"]
+	return main.copy()[crop["top"]:crop["height"], crop["left"]:crop["width"]]
+
+
+def detect_frame(main, lores):
+	# One frame through the pipeline, as capture() and get_traffic_signs() run it
+	pixels, view = Camera.prepare(capture_frame(main, lores))
+	return Camera.detect(pixels, view, Config.config["camera"]["colors"], Camera.colors)[1]
+
+
+def synthetic_scene(seed):
+	"""
+	Generate a main stream frame with pillars in the configured colours.
+
+	Returns:
+		main: BGR frame
+		labels: Pillars as in labels.json
+	"""
+	rng = np.random.default_rng(seed)
+	width, height = Camera.size
+	left, top, right, bottom = get_crop_box()
+
+	main = np.full((height, width, 3), 205, dtype=np.uint8)
+	main[:top + 40] = (30, 30, 30)
+
+	labels = []
+	for _ in range(rng.integers(1, 5)):
+		color = str(rng.choice(list(Camera.colors)))
+		w = int(rng.integers(20, 90))
+		h = int(min(bottom - top - 50, w * rng.uniform(1.5, 3)))
+		x = int(rng.integers(0, right - left - w))
+		y = int(rng.integers(40, bottom - top - h))
+
+		if any(x < box[0] + box[2] + 10 and box[0] < x + w + 10 for box in (label["box"] for label in labels)):
+			continue
+
+		main[top + y:top + y + h, left + x:left + x + w] = threshold_center(Config.config["camera"]["colors"][color])
+		labels.append({"color": color, "box": [x, y, w, h]})
+
+	noise = rng.normal(0, 6, main.shape)
+	return np.clip(main + noise, 0, 255).astype(np.uint8), labels
+
+
+def threshold_center(color_config):
+	# BGR colour in the middle of an HSV threshold box (hue may wrap around)
+	center = []
+	for lower, upper, period in zip(color_config["lower"], color_config["upper"], (180, 256, 256)):
+		if lower > upper:
+			upper += period
+		center.append(int((lower + upper) / 2) % period)
+
+	return cv2.cvtColor(np.uint8([[center]]), cv2.COLOR_HSV2BGR)[0, 0].tolist()
+
+
+def iou(a, b):
+	x = max(0, min(a[0] + a[2], b[0] + b[2]) - max(a[0], b[0]))
+	y = max(0, min(a[1] + a[3], b[1] + b[3]) - max(a[1], b[1]))
+	overlap = x * y
+	union = a[2] * a[3] + b[2] * b[3] - overlap
+	return overlap / union if union > 0 else 0
+
+
+def match(blobs, labels, threshold):
+	"""
+	Match detections to labelled pillars of the same colour, greedily by overlap.
+
+	Returns:
+		tp, fp, fn: Matched detections, unmatched detections, missed pillars
+	"""
+	detections = [(color, box) for color, color_blobs in blobs.items() for _, box, _ in color_blobs]
+	used = set()
+	tp = 0
+
+	for label in labels:
+		best, best_iou = None, threshold
+		for index, (color, box) in enumerate(detections):
+			if index in used or color != label["color"]:
+				continue
+
+			overlap = iou(box, label["box"])
+			if overlap >= best_iou:
+				best, best_iou = index, overlap
+
+		if best is not None:
+			used.add(best)
+			tp += 1
+
+	return tp, len(detections) - tp, len(labels) - tp
+
+
+def init_worker(camera_config, barrier, chunks):
+	global start_barrier, frame_chunks
+	Config.config["camera"] = camera_config
+	start_barrier = barrier
+	frame_chunks = chunks
+	cv2.setNumThreads(1)
+
+
+def load_frame(source, labels):
+	if isinstance(source, int):
+		return synthetic_scene(source)
+
+	img = cv2.imread(source)
+	if img is None:
+		raise ValueError(f"Cannot read {source}")
+	return to_main_frame(img), labels
+
+
+def bench_chunk(task):
+	"""
+	Benchmark one worker's share of the frames.
+
+	Returns:
+		frames: (latencies, wall_latencies, scores) per frame
+		start, end: perf_counter() around the timed detection passes (system wide clock)
+	"""
+	index, overrides, runs, threshold = task
+
+	base = Config.config["camera"]
+	Config.config["camera"] = apply_overrides(base, overrides)
+
+	try:
+		try:
+			frames = []
+			for main, labels in frame_chunks[index]:
+				lores = to_lores(main) if Camera.yuv_mode() else None
+				frames.append((main, lores, labels, detect_frame(main, lores)))
+		except Exception:
+			# Release the workers waiting at the barrier, the error reaches the parent through pool.map
+			start_barrier.abort()
+			raise
+
+		# Every worker starts the timed passes together, so the pool is busy with detection only
+		start_barrier.wait()
+		start = time.perf_counter()
+
+		latencies = [[] for _ in frames]
+		for _ in range(runs):
+			for index, (main, lores, _, _) in enumerate(frames):
+				frame_start = time.perf_counter()
+				detect_frame(main, lores)
+				latencies[index].append((time.perf_counter() - frame_start) * 1000)
+
+		end = time.perf_counter()
+
+		results = []
+		for index, (main, lores, labels, blobs) in enumerate(frames):
+			# Share of the wall detection (included in the latencies when enabled)
+			pixels, view = Camera.prepare(capture_frame(main, lores))
+			wall_latencies = []
+			for _ in range(runs):
+				wall_start = time.perf_counter()
+				Camera.detect_walls(pixels, view)
+				wall_latencies.append((time.perf_counter() - wall_start) * 1000)
+
+			scores = match(blobs, labels, threshold) if labels is not None else None
+			results.append((latencies[index], wall_latencies, scores))
+	finally:
+		Config.config["camera"] = base
+
+	return results, start, end
+
+
+def load_frames(paths, synthetic):
+	# Loaded here so an unreadable frame is reported before the pool starts
+	tasks = [(seed, None) for seed in range(synthetic)]
+
+	for path in paths:
+		if os.path.isdir(path):
+			labels = {}
+			labels_path = os.path.join(path, "labels.json")
+			if os.path.exists(labels_path):
+				with open(labels_path) as f:
+					labels = json.load(f)
+
+			for name in sorted(os.listdir(path)):
+				if name.lower().endswith((".png", ".jpg", ".jpeg")):
+					tasks.append((os.path.join(path, name), labels.get(name)))
+		else:
+			tasks.append((path, None))
+
+	return [load_frame(source, labels) for source, labels in tasks]
+
+
+def load_baseline(path):
+	try:
+		with open(path) as f:
+			return json.load(f)
+	except (OSError, ValueError):
+		return {}
+
+
+def compare(result, base, tolerance, score_tolerance):
+	# Regressions of a variant against its baseline, as text
+	problems = []
+
+	for key in ("fps", "pool_fps"):
+		if base.get(key) and result[key] < base[key] * (1 - tolerance):
+			problems.append(f"{key} {result[key]:.1f} < {base[key]:.1f}")
+
+	for key in ("p50_ms", "p99_ms"):
+		if base.get(key) and result[key] > base[key] * (1 + tolerance):
+			problems.append(f"{key} {result[key]:.2f} > {base[key]:.2f}")
+
+	for key in ("precision", "recall"):
+		if base.get(key) is not None and (result[key] is None or result[key] < base[key] - score_tolerance):
+			problems.append(f"{key} {result[key]} < {base[key]:.3f}")
+
+	return problems
+
+
+def main(argv):
+	runs = 3
+	workers = os.cpu_count()
+	synthetic = 0
+	threshold = 0.5
+	variants = []
+	paths = []
+	baseline_path = BASELINE
+	save = False
+	tolerance = 0.3
+	score_tolerance = 0.02
+	args = iter(argv)
+
+	for arg in args:
+		if arg == "--save":
+			save = True
+		elif arg == "--baseline":
+			baseline_path = next(args)
+		elif arg == "--tolerance":
+			tolerance = float(next(args))
+		elif arg == "--score-tolerance":
+			score_tolerance = float(next(args))
+		elif arg == "--runs":
+			runs = int(next(args))
+		elif arg == "--workers":
+			workers = int(next(args))
+		elif arg == "--synthetic":
+			synthetic = int(next(args))
+		elif arg == "--iou":
+			threshold = float(next(args))
+		elif arg == "--variant":
+			variants.append(parse_variant(next(args)))
+		elif arg in ("-h", "--help"):
+			print(__doc__)
+			return 0
+		elif arg.startswith("-"):
+			print(f"Unknown option {arg}", file=sys.stderr)
+			print(__doc__, file=sys.stderr)
+			return 2
+		else:
+			paths.append(arg)
+
+	Config.init()
+	try:
+		frames = load_frames(paths, synthetic or (0 if paths else 20))
+	except (OSError, ValueError) as e:
+		print(e, file=sys.stderr)
+		return 2
+
+	# One chunk of frames per worker, every worker takes exactly one and waits for the others
+	workers = max(1, min(workers, len(frames)))
+	chunks = [frames[index::workers] for index in range(workers)]
+
+	baseline = load_baseline(baseline_path)
+	measured = {}
+	regressions = 0
+
+	print(f"{len(frames)} frame(s), {runs} run(s) each, {workers} worker(s), OpenCV {cv2.__version__}")
+	print(f"{'variant':10s} {'fps':>8s} {'pool fps':>9s} {'p50 ms':>8s} {'p99 ms':>8s} {'walls ms':>9s} {'precision':>10s} {'recall':>8s}")
+
+	with Pool(workers, initializer=init_worker, initargs=(Config.config["camera"], Barrier(workers), chunks)) as pool:
+		for name, overrides in variants or VARIANTS:
+			outputs = pool.map(bench_chunk, [(index, overrides, runs, threshold) for index in range(workers)], chunksize=1)
+
+			results = [frame for frames, _, _ in outputs for frame in frames]
+			elapsed = max(end for _, _, end in outputs) - min(start for _, start, _ in outputs)
+
+			latencies = np.array([latency for frame_latencies, _, _ in results for latency in frame_latencies])
+			wall_latencies = np.array([latency for _, frame_latencies, _ in results for latency in frame_latencies])
+			scored = [scores for _, _, scores in results if scores is not None]
+			tp, fp, fn = (sum(column) for column in zip(*scored)) if scored else (0, 0, 0)
+
+			result = {
+				"fps": 1000 / latencies.mean(),
+				"pool_fps": len(latencies) / elapsed,
+				"p50_ms": float(np.percentile(latencies, 50)),
+				"p99_ms": float(np.percentile(latencies, 99)),
+				"walls_ms": float(np.percentile(wall_latencies, 50)),
+				"precision": tp / (tp + fp) if tp + fp else None,
+				"recall": tp / (tp + fn) if tp + fn else None,
+			}
+			measured[name] = {key: round(value, 3) if value is not None else None for key, value in result.items()}
+
+			precision = f"{result['precision']:10.3f}" if result["precision"] is not None else f"{'n/a':>10s}"
+			recall = f"{result['recall']:8.3f}" if result["recall"] is not None else f"{'n/a':>8s}"
+
+			problems = [] if save or name not in baseline else compare(result, baseline[name], tolerance, score_tolerance)
+			status = f"  REGRESSED: {', '.join(problems)}" if problems else "" if save or name in baseline else "  (no baseline)"
+			regressions += bool(problems)
+
+			print(f"{name:10s} {result['fps']:8.1f} {result['pool_fps']:9.1f} {result['p50_ms']:8.2f} {result['p99_ms']:8.2f} {result['walls_ms']:9.2f} {precision} {recall}{status}")
+
+	if save:
+		baseline.update(measured)
+		with open(baseline_path, "w") as f:
+			json.dump(baseline, f, indent=2, sort_keys=True)
+			f.write("\n")
+		print(f"Baseline saved to {baseline_path}")
+		return 0
+
+	if regressions:
+		print(f"{regressions} variant(s) regressed against {baseline_path}")
+		return 1
+
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main(sys.argv[1:]))
@@ -1,11 +1,13 @@
 import math
-from time import sleep
+from time import monotonic, sleep
 import cv2
 
 import numpy as np
-from picamera2 import Picamera2
 
 from config import Config
+from frame_broadcaster import FrameBroadcaster
+from frame_exchange import FrameExchange
+from pillar_tracker import PillarTracker
 from ultis import printAngle
 
 import os
@@ -18,6 +20,20 @@ class Camera:
 
 	frame = 0
 
+	size = (1537, 864)
+
+	# Newest frame for the detection thread
+	frames = FrameExchange()
+
+	# JPEG streams for the server: "img", "visuals" and the colour masks
+	stream = FrameBroadcaster()
+
+	# Detection results from the worker processes (camera processes > 0)
+	results = None
+
+	# Smooths the traffic signs across frames (camera tracking enabled)
+	tracker = None
+
 	colors = {
 		"green": {
 			"detected": False,
@@ -25,6 +41,8 @@ class Camera:
 			"distance": 0,
 			"center": (0, 0),
 			"mask": None,
+			"blobs": [],
+			"tracks": [],
 		},
 		"red": {
 			"detected": False,
@@ -32,6 +50,8 @@ class Camera:
 			"distance": 0,
 			"center": (0, 0),
 			"mask": None,
+			"blobs": [],
+			"tracks": [],
 		}
 	}
 
@@ -39,14 +59,51 @@ class Camera:
 	right_wall = None
 	top_wall = None
 
+	# ROI offset and scale of the last processed frame, see get_processing_view()
+	view = None
+
+	# Colour classification tables, rebuilt when the thresholds change
+	color_lut = None
+	color_lut_key = None
+	color_names = ()
+	color_bit_luts = []
+	yuv_lut = None
+	yuv_lut_key = None
+
+	kernel = np.ones((3, 3), np.uint8)
+
 	@staticmethod
 	def init():
+		tracking = Config.config["camera"].get("tracking", {})
+		if tracking.get("enabled", False):
+			Camera.tracker = PillarTracker(
+				gate=tracking.get("gate", 120),
+				max_age=tracking.get("max_age", 0.5),
+				confirm=tracking.get("confirm", 2),
+				noise=tracking.get("noise", 6),
+				acceleration=tracking.get("acceleration", 500),
+			)
+
+		# Fork the detection processes before the camera and any thread start
+		if Config.config["camera"].get("processes", 0) > 0:
+			from vision_processes import start_workers
+
+			Camera.frames, Camera.results = start_workers(Config.config["camera"]["processes"], list(Camera.colors))
+
+		from libcamera import ColorSpace
+		from picamera2 import Picamera2
+
 		Camera.picam2 = Picamera2()
 		
+		# The lores capture mode reads a small YUV420 stream, full range BT.601 (sYCC) like COLOR_YCrCb2BGR
+		lores = {"format": "YUV420", "size": Camera.get_lores_size()} if Camera.yuv_mode() else None
+
 		Camera.picam2.configure(Camera.picam2.create_preview_configuration(main={
 				"format": 'RGB888', 
-				"size": (1537, 864)
+				"size": Camera.size
 			}, 
+			lores=lores,
+			colour_space=ColorSpace.Sycc(),
 			controls={
 				'FrameRate': 15, 
 				"AwbEnable": False, 
@@ -58,8 +115,59 @@ class Camera:
 		while Camera.img is None:
 			sleep(0.1)
 
+	@staticmethod
+	def yuv_mode():
+		return Config.config["camera"].get("capture", "rgb") == "yuv"
+
+	@staticmethod
+	def get_lores_size():
+		return tuple(Config.config["camera"].get("lores", (768, 432)))
+
+	@staticmethod
+	def get_yuv_crop():
+		# Crop (top, bottom, left, right) in chroma pixels of the lores stream, and chroma -> main stream pixel factors
+		crop = Config.config["camera"]["crop"]
+		lores = Camera.get_lores_size()
+
+		fx = Camera.size[0] / (lores[0] // 2)
+		fy = Camera.size[1] / (lores[1] // 2)
+
+		top = round(crop["top"] / fy)
+		bottom = round(min(crop["height"], Camera.size[1]) / fy)
+		left = round(crop["left"] / fx)
+		right = round(min(crop["width"], Camera.size[0]) / fx)
+
+		return top, bottom, left, right, fx, fy
+
+	@staticmethod
+	def get_yuv_planes(array, size):
+		"""
+		Get the Y, U and V planes of a YUV420 buffer, all at chroma resolution.
+
+		Args:
+			array: YUV420 image, (height * 3 / 2, stride) as picamera2's MappedArray gives it
+			size: Image (width, height)
+
+		Returns:
+			y, u, v: Views into array (Y takes every other pixel)
+		"""
+		width, height = size
+		stride = array.shape[1]
+
+		chroma = array[height:].reshape(-1)
+		plane = (height // 2) * (stride // 2)
+
+		y = array[:height:2, :width:2]
+		u = chroma[:plane].reshape(height // 2, stride // 2)[:, :width // 2]
+		v = chroma[plane:2 * plane].reshape(height // 2, stride // 2)[:, :width // 2]
+
+		return y, u, v
+
 	@staticmethod
 	def capture():
+		if Camera.yuv_mode():
+			return Camera.capture_yuv()
+
 		Camera.picam2.start()
 
 		while True:
@@ -73,17 +181,66 @@ class Camera:
 			# Scale image down to 1/2
 			Camera.img = im_cp #cv2.resize(im_cp, (0, 0), fx=0.3, fy=0.3)
 			Camera.frame += 1
+			Camera.stream.publish("img", Camera.img)
+
+			if Camera.results is not None:
+				Camera.results.set_colors(Config.config["camera"]["colors"])
+
+			Camera.frames.publish(im_cp)
+
+	@staticmethod
+	def capture_yuv():
+		from picamera2 import MappedArray
+
+		Camera.picam2.start()
+
+		while True:
+			top, bottom, left, right = Camera.get_yuv_crop()[:4]
+
+			# Read the lores planes straight from the request buffer, only the cropped chroma resolution frame is copied
+			request = Camera.picam2.capture_request()
+
+			try:
+				with MappedArray(request, "lores") as mapped:
+					y, u, v = Camera.get_yuv_planes(mapped.array, Camera.get_lores_size())
+					frame = cv2.merge((y[top:bottom, left:right], v[top:bottom, left:right], u[top:bottom, left:right]))
+			finally:
+				# Give the buffer back to the camera right away
+				request.release()
+
+			# BGR only while someone watches the "img" stream
+			if Camera.stream.watched("img"):
+				Camera.img = cv2.cvtColor(frame, cv2.COLOR_YCrCb2BGR)
+				Camera.stream.publish("img", Camera.img)
+			elif Camera.img is None:
+				# Placeholder so wait_load() returns, replaced by the first converted frame
+				Camera.img = np.zeros((1, 1, 3), dtype=np.uint8)
+
+			Camera.frame += 1
+
+			if Camera.results is not None:
+				Camera.results.set_colors(Config.config["camera"]["colors"])
+
+			Camera.frames.publish(frame)
 
 	@staticmethod
 	def visuals():
 		Camera.wait_load()
 
 		while True:
+			# Only drawn while someone watches
+			if not Camera.stream.watched("visuals"):
+				sleep(1/20)
+				continue
+
 			img = Camera.combine_colored_masks(
 				[Camera.colors[color]["mask"] for color in ["green", "red"]],
 				[(0, 255, 0), (0, 0, 255)]
 			)
 
+			# Masks are at processing resolution, the positions below at full resolution
+			img = Camera.to_full_image(img, Camera.view)
+
 			if Camera.left_wall is not None:
 				# Draw left wall
 				cv2.line(img, (Camera.left_wall[0], Camera.left_wall[1]), (Camera.left_wall[2], Camera.left_wall[3]), (255, 255, 0), 2)
@@ -98,6 +255,10 @@ class Camera:
 
 
 			for color in ["green", "red"]:
+				# Box every blob found, the biggest one is the traffic sign
+				for _, (x, y, w, h), _ in Camera.colors[color]["blobs"]:
+					cv2.rectangle(img, (x, y), (x + w, y + h), (255, 255, 255), 1)
+
 				if Camera.colors[color]["detected"]:
 					# Draw a point at the center of the detected traffic sign with it's color
 					cv2.circle(img, Camera.colors[color]["center"], 5, (255, 0, 0), -1)
@@ -113,7 +274,7 @@ class Camera:
 			cv2.putText(img, f"Frame: {Camera.frame}", (5, 10), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (0, 255, 0), 1)
 
 			Camera.visuals_img = img
-
+			Camera.stream.publish("visuals", img)
 
 			sleep(1/20)
 
@@ -129,60 +290,352 @@ class Camera:
 
 	@staticmethod
 	def get_traffic_signs():
+		if Camera.results is not None:
+			return Camera.receive_traffic_signs()
+
 		last_frame = 0
+		detect_every = Config.config["camera"].get("tracking", {}).get("detect_every", 1) if Camera.tracker is not None else 1
 
-		Camera.wait_load()
+		while True:
+			# Sleeps until a newer frame than the last one lands, skipping any missed in between
+			last_frame, img = Camera.frames.acquire(last_frame)
+			now = monotonic()
+
+			# Under load detect on every Nth frame only, the tracks are predicted in between
+			if last_frame % detect_every != 0 and Camera.view is not None:
+				Camera.frames.release(last_frame)
+				Camera.set_traffic_signs(None, None, Camera.view, now)
+				continue
+
+			# Read the frame in place, prepare() makes the first copy
+			try:
+				pixels, view = Camera.prepare(img)
+			finally:
+				Camera.frames.release(last_frame)
+
+			masks, blobs, walls = Camera.detect(pixels, view, Config.config["camera"]["colors"], Camera.colors)
+
+			Camera.set_traffic_signs(masks, blobs, view, now, walls)
+
+	@staticmethod
+	def receive_traffic_signs():
+		last_frame = 0
 
 		while True:
-			if Camera.frame != last_frame:
-				last_frame = Camera.frame
+			# Sleeps until a worker process finished a newer frame
+			last_frame, masks, blobs, view, walls = Camera.results.read(last_frame)
+
+			Camera.set_traffic_signs(masks, blobs, view, monotonic(), walls)
+
+	@staticmethod
+	def prepare(img):
+		"""
+		Get the pixels to classify from a published frame.
+
+		The result does not reference img, so the frame can be released right after.
+
+		Returns:
+			pixels: HSV processing image (YCrCb in the lores capture mode)
+			view: See get_processing_view()
+		"""
+		if not Camera.yuv_mode():
+			small, view = Camera.get_processing_view(img)
+			return cv2.cvtColor(small, cv2.COLOR_BGR2HSV), view
+
+		# Already at chroma resolution, only the ROI applies
+		fx, fy = Camera.get_yuv_crop()[4:]
+		width, height = round(img.shape[1] * fx), round(img.shape[0] * fy)
+		left, top, right, bottom, _ = Camera.get_processing_roi(width, height)
+
+		small = img[round(top / fy):round(bottom / fy), round(left / fx):round(right / fx)].copy()
+
+		return small, (left, top, fx, fy, width, height)
+
+	@staticmethod
+	def get_frame_shape():
+		# Shape of the frames capture() publishes
+		if Camera.yuv_mode():
+			top, bottom, left, right = Camera.get_yuv_crop()[:4]
+			return (bottom - top, right - left, 3)
+
+		crop = Config.config["camera"]["crop"]
+		return np.empty((Camera.size[1], Camera.size[0], 3), dtype=np.uint8)[crop["top"]:crop["height"], crop["left"]:crop["width"]].shape
+
+	@staticmethod
+	def get_processing_shape(frame_shape):
+		# Shape of the masks for frames of frame_shape, worked out without OpenCV (see vision_processes)
+		if Camera.yuv_mode():
+			return Camera.prepare(np.zeros(frame_shape, dtype=np.uint8))[0].shape[:2]
+
+		left, top, right, bottom, scale = Camera.get_processing_roi(frame_shape[1], frame_shape[0])
+		return round((bottom - top) * scale), round((right - left) * scale)
+
+	@staticmethod
+	def detect(pixels, view, colors_config, wanted):
+		# Masks and blobs of the wanted colours, and the walls, in pixels from prepare()
+		masks = Camera.get_color_masks(pixels, colors_config, wanted)
+
+		processing = Config.config["camera"].get("processing", {})
+		blobs = Camera.find_blobs(masks, processing.get("blobs", 3), processing.get("min_area", 0), view)
+
+		walls = Camera.detect_walls(pixels, view) if Config.config["camera"].get("walls", {}).get("enabled", False) else None
+
+		return masks, blobs, walls
+
+	@staticmethod
+	def detect_walls(pixels, view):
+		"""
+		Find the bottom edges of the black walls.
+
+		The lowest black pixel of every step-th column traces where the walls meet the mat.
+		The trace is split by its local slope into the left wall (rising to the right), the
+		top wall (flat) and the right wall (falling to the right), and a line is fitted to
+		each part.
+
+		Args:
+			pixels, view: From prepare()
+
+		Returns:
+			left_wall, right_wall, top_wall: (x1, y1, x2, y2, angle) in full crop pixels, or
+				None if not seen. angle is in degrees from the image x axis (y down), so the
+				left wall is negative and the right wall positive.
+		"""
+		walls = Config.config["camera"].get("walls", {})
+		step = walls.get("step", 4)
+		span = walls.get("span", 3)
+		flat = walls.get("flat", 5)
+
+		# Brightness is V in HSV, Y in YCrCb
+		black = pixels[:, ::step, 0 if Camera.yuv_mode() else 2] <= walls.get("black", 60)
+
+		seen = black.any(axis=0)
+		bottom = black.shape[0] - 1 - np.argmax(black[::-1], axis=0)
+
+		xs = np.flatnonzero(seen) * step
+		ys = bottom[seen]
+		if len(xs) <= 2 * span:
+			return None, None, None
+
+		# Slope across span traced columns each side
+		run = np.concatenate((xs[span:], np.full(span, xs[-1]))) - np.concatenate((np.full(span, xs[0]), xs[:-span]))
+		rise = np.concatenate((ys[span:], np.full(span, ys[-1]))) - np.concatenate((np.full(span, ys[0]), ys[:-span]))
+		slopes = rise / np.maximum(run, 1)
+		tilt = np.degrees(np.arctan2(rise * view[3], run * view[2]))
+
+		return tuple(
+			Camera.fit_wall(xs[part], ys[part], slopes[part], view, walls.get("min_points", 6))
+			for part in (tilt < -flat, tilt > flat, np.abs(tilt) <= flat)
+		)
+
+	@staticmethod
+	def fit_wall(xs, ys, slopes, view, min_points):
+		# Line through the trace points of one wall: medians first, so columns behind a pillar
+		# do not pull it, then least squares over the points near that line
+		if len(xs) < min_points:
+			return None
+
+		xs = xs.astype(np.float64)
+		ys = ys.astype(np.float64)
+		slope = np.median(slopes)
+		offset = np.median(ys - slope * xs)
+
+		inliers = np.abs(ys - (slope * xs + offset)) <= 3
+		if np.count_nonzero(inliers) < min_points:
+			return None
+
+		xs = xs[inliers]
+		slope, offset = np.polyfit(xs, ys[inliers], 1)
+
+		x1, y1 = Camera.to_full(view, xs.min(), slope * xs.min() + offset)
+		x2, y2 = Camera.to_full(view, xs.max(), slope * xs.max() + offset)
+
+		return x1, y1, x2, y2, math.degrees(math.atan2(y2 - y1, x2 - x1))
+
+	@staticmethod
+	def set_traffic_signs(masks, blobs, view, now, walls=None):
+		# masks and blobs are None on frames without detection, the tracks are only predicted
+		if walls is not None:
+			Camera.left_wall, Camera.right_wall, Camera.top_wall = walls
+
+		if Camera.tracker is not None:
+			if blobs is None:
+				Camera.tracker.predict(now)
 			else:
-				sleep(1/40)
-				continue
+				Camera.tracker.update(blobs, now)
+
+		for color in Camera.colors:
+			if blobs is not None:
+				Camera.colors[color]["mask"] = masks.get(color)
+				Camera.stream.publish(color, Camera.colors[color]["mask"])
+				Camera.colors[color]["blobs"] = blobs.get(color, [])
+
+			# Smoothed, with the same pillar (track id) kept across frames, when tracking
+			if Camera.tracker is not None:
+				Camera.colors[color]["tracks"] = [(track.id, track.get_blob()) for track in Camera.tracker.get_tracks(color)]
+				signs = [blob for _, blob in Camera.colors[color]["tracks"]]
+			else:
+				signs = Camera.colors[color]["blobs"]
+
+			if color in ["green", "red"]:
+				biggest = signs[0] if signs else None
+				Camera.colors[color]["detected"], Camera.colors[color]["distance"], Camera.colors[color]["angle"], Camera.colors[color]["center"]  = Camera.process_traffic_sign(biggest, view)
+
+		Camera.view = view
+
+
+		#closest_color = Camera.colors["green"] if Camera.colors["green"]["distance"] < Camera.colors["red"]["distance"] else Camera.colors["red"]
+
+	@staticmethod
+	def get_processing_view(img):
+		"""
+		Cut the processing ROI out of a frame and scale it down for detection.
+
+		Config.config["camera"]["processing"] holds the scale (e.g. 0.5 = half the width
+		and height, a quarter of the pixels) and the ROI in crop pixels; a width or height
+		of 0 reaches the edge of the crop.
 
-			hsv_img = cv2.cvtColor(Camera.img.copy(), cv2.COLOR_BGR2HSV)
+		Returns:
+			small: Image to run detection on
+			view: (left, top, x factor, y factor, width, height) maps small image pixels
+				back to the full crop, see to_full()
+		"""
+		height, width = img.shape[:2]
+		left, top, right, bottom, scale = Camera.get_processing_roi(width, height)
 
-			for color in Camera.colors:
-				Camera.colors[color]["mask"] = Camera.get_hsv_mask(hsv_img, Config.config["camera"]["colors"][color])
+		small = img[top:bottom, left:right]
 
+		if scale != 1:
+			small = cv2.resize(small, (0, 0), fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
 
-				if color in ["green", "red"]:
-					Camera.colors[color]["detected"], Camera.colors[color]["distance"], Camera.colors[color]["angle"], Camera.colors[color]["center"]  = Camera.process_traffic_sign(Camera.colors[color]["mask"])
+		view = (left, top, (right - left) / small.shape[1], (bottom - top) / small.shape[0], width, height)
 
+		return small, view
 
-			#closest_color = Camera.colors["green"] if Camera.colors["green"]["distance"] < Camera.colors["red"]["distance"] else Camera.colors["red"]
+	@staticmethod
+	def get_processing_roi(width, height):
+		# Processing ROI (left, top, right, bottom) in a width x height crop, and the scale
+		processing = Config.config["camera"].get("processing", {})
+		roi = processing.get("roi", {})
+
+		left = roi.get("left", 0)
+		top = roi.get("top", 0)
+		right = min(width, left + roi["width"]) if roi.get("width") else width
+		bottom = min(height, top + roi["height"]) if roi.get("height") else height
+
+		return left, top, right, bottom, processing.get("scale", 1)
+
+	@staticmethod
+	def to_full(view, x, y):
+		# Small image position -> full crop position
+		return int(view[0] + x * view[2]), int(view[1] + y * view[3])
+
+	@staticmethod
+	def to_full_image(img, view):
+		# Place a small image back into a crop sized one, e.g. to draw full resolution positions on the masks
+		if img is None or view is None:
+			return img
+
+		left, top, _, _, width, height = view
+		right = min(width, left + int(round(img.shape[1] * view[2])))
+		bottom = min(height, top + int(round(img.shape[0] * view[3])))
+
+		full = np.zeros((height, width) + img.shape[2:], dtype=img.dtype)
+		full[top:bottom, left:right] = cv2.resize(img, (right - left, bottom - top), interpolation=cv2.INTER_NEAREST)
+
+		return full
 
 	@staticmethod
-	def process_traffic_sign(mask):
-		biggest_contour = None
+	def find_blobs(masks, top_k=3, min_area=0, view=None):
+		"""
+		Find the biggest blobs of every colour with a single connected components pass.
 
-		# Find biggest countour
-		contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-		if len(contours) != 0:
-			biggest_contour = max(contours, key=cv2.contourArea)
+		The masks are laid side by side, one blank column apart, in one label image, so
+		touching pillars of different colours stay separate blobs and the colour of a blob
+		is the tile it is in.
 
-		if biggest_contour is None:
+		Args:
+			masks: Colour name -> cleaned mask, e.g. from get_color_masks()
+			top_k: Most blobs kept per colour
+			min_area: Smallest blob in processing pixels
+			view: From get_processing_view(), to report in full crop pixels (default: mask pixels)
+
+		Returns:
+			dict: Colour name -> list of (area, (x, y, w, h), (center x, center y)), biggest first
+		"""
+		names = [name for name in masks if masks[name] is not None]
+		blobs = {name: [] for name in masks}
+
+		if len(names) == 0:
+			return blobs
+
+		height, width = masks[names[0]].shape
+		tile = width + 1
+
+		labels = np.zeros((height, tile * len(names)), dtype=np.uint8)
+		for index, name in enumerate(names):
+			labels[:, index * tile:index * tile + width] = masks[name]
+
+		count, _, stats, centroids = cv2.connectedComponentsWithStatsWithAlgorithm(labels, 8, cv2.CV_32S, cv2.CCL_GRANA)
+
+		# Component 0 is the background
+		areas = stats[1:, cv2.CC_STAT_AREA]
+		full = 0
+
+		for index in np.argsort(-areas, kind="stable") + 1:
+			x, y, w, h, area = (int(value) for value in stats[index])
+			if area < min_area or full == len(names):
+				break
+
+			name = names[x // tile]
+			if len(blobs[name]) == top_k:
+				continue
+
+			# Back to mask pixels
+			offset = x // tile * tile
+			x -= offset
+			center_x = centroids[index][0] - offset
+			center_y = centroids[index][1]
+
+			if view is not None:
+				x, y = Camera.to_full(view, x, y)
+				w, h = int(w * view[2]), int(h * view[3])
+				area = int(area * view[2] * view[3])
+				center_x, center_y = view[0] + center_x * view[2], view[1] + center_y * view[3]
+
+			blobs[name].append((area, (x, y, w, h), (int(center_x), int(center_y))))
+
+			if len(blobs[name]) == top_k:
+				full += 1
+
+		return blobs
+
+	@staticmethod
+	def process_traffic_sign(blob, view):
+		width, height = view[4], view[5]
+
+		if blob is None:
 			return None, 9999999, None, None
 
-		x, y, w, h = cv2.boundingRect(biggest_contour)
+		# Bottom center of the sign
+		x, y, w, h = blob[1]
 		center_x = x + w // 2
 		center_y = y + h
 
-		if center_x == mask.shape[1] // 2:
+		if center_x == width // 2:
 			center_x += 1
 
-		if center_y == mask.shape[0]:
+		if center_y == height:
 			center_y += 1
 
-		A = (mask.shape[1] // 2, mask.shape[0])
-		B = (center_x, mask.shape[0])
+		A = (width // 2, height)
+		B = (center_x, height)
 		C = (center_x, center_y)
 
 		line_angle, _, _ = printAngle(A, B, C)
 
 		line_angle = 90 - line_angle
 
-		if (center_x - mask.shape[1] // 2) < 0:
+		if (center_x - width // 2) < 0:
 			line_angle = -line_angle
 
 		line_distance = Config.config["camera"]["crop"]["height"] - center_y
@@ -190,74 +643,134 @@ class Camera:
 		return True, line_distance, line_angle, (center_x, center_y)
 	
 	@staticmethod
-	def get_hsv_mask(hsv, config):
-		h_min, s_min, v_min = config["lower"]
-		h_max, s_max, v_max = config["upper"]
+	def build_color_lut(colors_config):
+		"""
+		Build per-channel lookup tables that classify HSV pixels for all colours at once.
 
-		mask = None
+		Every colour gets one bit (up to 8 colours). lut[c][i] holds the bits of the
+		colours whose range on channel c (hue, saturation, value) contains i; lower > upper
+		wraps around as before. A pixel has a colour when its bit is set on all three channels.
 
-		if h_min > h_max:
-			lower1 = (0, 0, 0)
-			upper1 = (h_max, 255, 255)
-			mask1 = cv2.inRange(hsv, lower1, upper1)
+		Returns:
+			names: Colour names in bit order
+			lut: (3, 256) uint8 tables for cv2.LUT, one per channel
+			bit_luts: Per colour, a (256,) table mapping a label to 255 if its bit is set
+		"""
+		names = tuple(colors_config)[:8]
+		values = np.arange(256)
+		lut = np.zeros((3, 256), dtype=np.uint8)
+		bit_luts = []
 
-			lower2 = (h_min, 0, 0)
-			upper2 = (179, 255, 255)
-			mask2 = cv2.inRange(hsv, lower2, upper2)
+		for bit, name in enumerate(names):
+			lower = colors_config[name]["lower"]
+			upper = colors_config[name]["upper"]
 
-			mask = cv2.bitwise_or(mask1, mask2)
-		else:
-			lower = (h_min, 0, 0)
-			upper = (h_max, 255, 255)
+			for channel in range(3):
+				if lower[channel] > upper[channel]:
+					inside = (values <= upper[channel]) | (values >= lower[channel])
+				else:
+					inside = (values >= lower[channel]) & (values <= upper[channel])
 
-			mask = cv2.inRange(hsv, lower, upper)
+				lut[channel, inside] |= 1 << bit
 
-		if s_min > s_max:
-			lower1 = (0, 0, 0)
-			upper1 = (179, s_max, 255)
-			mask1 = cv2.inRange(hsv, lower1, upper1)
+			bit_luts.append(np.where(values & (1 << bit), 255, 0).astype(np.uint8))
 
-			lower2 = (0, s_min, 0)
-			upper2 = (179, 255, 255)
-			mask2 = cv2.inRange(hsv, lower2, upper2)
+		return names, lut, bit_luts
 
-			mask3 = cv2.bitwise_or(mask1, mask2)
-			mask = cv2.bitwise_and(mask, mask3)
-		else:
-			lower = (0, s_min, 0)
-			upper = (179, s_max, 255)
-			mask1 = cv2.inRange(hsv, lower, upper)
-			mask = cv2.bitwise_and(mask, mask1)
-
-		if v_min > v_max:
-			lower1 = (0, 0, 0)
-			upper1 = (179, 255, v_max)
-			mask1 = cv2.inRange(hsv, lower1, upper1)
-
-			lower2 = (0, 0, v_min)
-			upper2 = (179, 255, 255)
-			mask2 = cv2.inRange(hsv, lower2, upper2)
-
-			mask3 = cv2.bitwise_or(mask1, mask2)
-			mask = cv2.bitwise_and(mask, mask3)
+	@staticmethod
+	def get_color_lut(colors_config):
+		# Rebuild only when a threshold changed (e.g. from the /hsv endpoint)
+		key = tuple((name, tuple(c["lower"]), tuple(c["upper"])) for name, c in colors_config.items())
+
+		if key != Camera.color_lut_key:
+			Camera.color_names, Camera.color_lut, Camera.color_bit_luts = Camera.build_color_lut(colors_config)
+			Camera.color_lut_key = key
+
+		return Camera.color_names, Camera.color_lut, Camera.color_bit_luts
+
+	@staticmethod
+	def build_yuv_lut(colors_config):
+		"""
+		Build a YCrCb lookup table that classifies pixels for all colours at once with the HSV thresholds.
+
+		YCrCb is quantised to 6 bits per channel (262144 entries). Every entry holds the colour
+		bits of its bin centre, converted to HSV and classified like build_color_lut().
+
+		Returns:
+			table: (262144,) uint8 labels, indexed by Y << 12 | Cr << 6 | Cb (6 bit values)
+		"""
+		centers = np.arange(2, 256, 4, dtype=np.uint8)
+		ycrcb = np.stack(np.meshgrid(centers, centers, centers, indexing="ij"), axis=-1).reshape(64, 4096, 3)
+
+		hsv = cv2.cvtColor(cv2.cvtColor(ycrcb, cv2.COLOR_YCrCb2BGR), cv2.COLOR_BGR2HSV)
+
+		return Camera.classify(hsv, Camera.build_color_lut(colors_config)[1]).reshape(-1)
+
+	@staticmethod
+	def get_yuv_lut(colors_config):
+		# Rebuild only when a threshold changed, like get_color_lut()
+		key = tuple((name, tuple(c["lower"]), tuple(c["upper"])) for name, c in colors_config.items())
+
+		if key != Camera.yuv_lut_key:
+			Camera.yuv_lut = Camera.build_yuv_lut(colors_config)
+			Camera.yuv_lut_key = key
+
+		return Camera.yuv_lut
+
+	@staticmethod
+	def classify_yuv(ycrcb, table):
+		# One lookup in the quantised YCrCb table for all colours
+		y, cr, cb = cv2.split(ycrcb)
+		index = (y >> 2).astype(np.int32) << 12 | (cr >> 2).astype(np.int32) << 6 | cb >> 2
+
+		return table[index]
+
+	@staticmethod
+	def classify(hsv, lut):
+		# One table lookup per channel for all colours, then AND the channel bits
+		h, s, v = cv2.split(hsv)
+		return cv2.bitwise_and(cv2.bitwise_and(cv2.LUT(h, lut[0]), cv2.LUT(s, lut[1])), cv2.LUT(v, lut[2]))
+
+	@staticmethod
+	def get_color_masks(hsv, colors_config, wanted=None):
+		"""
+		Get the cleaned mask of every colour from a single classification pass.
+
+		Args:
+			hsv: HSV image (YCrCb in the lores capture mode)
+			colors_config: Config.config["camera"]["colors"]
+			wanted: Colour names to build masks for (default: all)
+
+		Returns:
+			dict: Colour name -> mask
+		"""
+		names, lut, bit_luts = Camera.get_color_lut(colors_config)
+
+		if Camera.yuv_mode():
+			labels = Camera.classify_yuv(hsv, Camera.get_yuv_lut(colors_config))
 		else:
-			lower = (0, 0, v_min)
-			upper = (179, 255, v_max)
-			mask1 = cv2.inRange(hsv, lower, upper)
-			mask = cv2.bitwise_and(mask, mask1)
+			labels = Camera.classify(hsv, lut)
+
+		masks = {}
+		for name, bit_lut in zip(names, bit_luts):
+			if wanted is None or name in wanted:
+				masks[name] = Camera.clean_mask(cv2.LUT(labels, bit_lut))
+
+		return masks
 
+	@staticmethod
+	def get_hsv_mask(hsv, config):
+		names, lut, bit_luts = Camera.build_color_lut({"mask": config})
+
+		return Camera.clean_mask(cv2.LUT(Camera.classify(hsv, lut), bit_luts[0]))
+
+	@staticmethod
+	def clean_mask(mask):
 		# Erode and dilate to remove noise
-		kernel = np.ones((3, 3), np.uint8)
-		mask = cv2.erode(mask, kernel, iterations=1)
-		mask = cv2.dilate(mask, kernel, iterations=1)
+		mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, Camera.kernel)
 
 		#Close holes in mask
-		kernel = np.ones((3, 3), np.uint8)
-		mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel)
-		#kernel = np.ones((5, 5), np.uint8)
-		#mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel)
-
-		return mask
+		return cv2.morphologyEx(mask, cv2.MORPH_CLOSE, Camera.kernel)
 	
 	@staticmethod
 	def combine_colored_masks(masks, colors):
@@ -8,12 +8,43 @@ class Config:
 	config = {
 		"camera": {
 			"brightness": 0.3,
+			"processes": 0,
+			"capture": "rgb",
+			"lores": [768, 432],
+			"walls": {
+				"enabled": True,
+				"black": 60,
+				"step": 4,
+				"span": 3,
+				"flat": 5,
+				"min_points": 6
+			},
+			"tracking": {
+				"enabled": True,
+				"detect_every": 1,
+				"gate": 120,
+				"max_age": 0.5,
+				"confirm": 2,
+				"noise": 6,
+				"acceleration": 500
+			},
 			"crop": {
 				"left": 0,
 				"top": 236,
 				"width": 1537,
 				"height": 864
 			},
+			"processing": {
+				"scale": 0.5,
+				"blobs": 3,
+				"min_area": 20,
+				"roi": {
+					"left": 0,
+					"top": 0,
+					"width": 0,
+					"height": 0
+				}
+			},
 			"colors": {
 				"green": {
 					"lower": [
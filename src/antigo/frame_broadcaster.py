@@ -0,0 +1,94 @@
+import threading
+
+import cv2
+
+
+class FrameBroadcaster():
+	"""
+	Serves the newest frame of each stream (camera image, visuals, colour masks) as JPEG
+	to any number of clients.
+
+	Producers publish() a reference to every new frame, which costs nothing. Frames are
+	encoded on demand: the first client to ask for a new frame of a source encodes it,
+	the others wait for and reuse the same bytes. Sources nobody subscribes to are never
+	encoded, and producers can check watched() to skip building a frame at all.
+	"""
+
+	def __init__(self):
+		# Per source: newest frame and its id, encoded frame and its id, subscribers
+		self.images = {}
+		self.ids = {}
+		self.jpegs = {}
+		self.subscribers = {}
+
+		# One encoder per source at a time, the other clients wait for its bytes
+		self.encoders = {}
+
+		self.condition = threading.Condition()
+
+	def publish(self, source, img):
+		"""
+		Make img the newest frame of source.
+
+		Args:
+			source: Stream name
+			img: Frame, not changed after publishing (None: nothing to show yet)
+		"""
+		if img is None:
+			return
+
+		with self.condition:
+			self.images[source] = img
+			self.ids[source] = self.ids.get(source, 0) + 1
+			self.condition.notify_all()
+
+	def watched(self, source):
+		"""True if a client is subscribed to source."""
+		with self.condition:
+			return self.subscribers.get(source, 0) > 0
+
+	def subscribe(self, source):
+		with self.condition:
+			self.subscribers[source] = self.subscribers.get(source, 0) + 1
+			self.encoders.setdefault(source, threading.Lock())
+
+	def unsubscribe(self, source):
+		with self.condition:
+			self.subscribers[source] -= 1
+
+			# Drop the cached bytes, the frames keep being published
+			if self.subscribers[source] == 0:
+				self.jpegs.pop(source, None)
+
+	def get(self, source, last_id=0, timeout=None):
+		"""
+		Wait for a frame of source newer than last_id, JPEG encoded.
+
+		Args:
+			source: Stream name, subscribe() first
+			last_id: Id of the last frame this client sent
+			timeout: Seconds to wait (None: forever)
+
+		Returns:
+			frame_id, jpeg: The newest frame as bytes, or None, None on timeout
+		"""
+		with self.condition:
+			if not self.condition.wait_for(lambda: self.ids.get(source, 0) > last_id, timeout):
+				return None, None
+
+			frame_id = self.ids[source]
+			img = self.images[source]
+
+		with self.encoders[source]:
+			# Another client may have encoded this frame, or a newer one, meanwhile
+			encoded_id, jpeg = self.jpegs.get(source, (0, None))
+
+			if encoded_id < frame_id:
+				ret, encoded = cv2.imencode('.jpg', img)
+				if not ret:
+					return None, None
+
+				encoded_id, jpeg = frame_id, encoded.tobytes()
+				self.jpegs[source] = (encoded_id, jpeg)
+
+		return encoded_id, jpeg
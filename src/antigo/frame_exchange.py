@@ -0,0 +1,106 @@
+import threading
+
+import numpy as np
+
+
+class FrameExchange():
+	"""
+	Hands the newest camera frame from the capture thread to the detection threads.
+
+	A small ring of preallocated buffers: the writer copies each frame into a slot
+	nobody is reading and publishes it as the latest; readers wait on a condition
+	until a frame newer than their last one lands and read that slot in place. Frames
+	published while a reader is busy replace each other, so a reader always gets the
+	newest frame and never works through a queue of stale ones.
+	"""
+
+	def __init__(self, slots=3):
+		# One slot being written, one latest, the rest held by readers
+		self.buffers = [None] * slots
+		self.ids = [0] * slots
+		self.holds = [0] * slots
+
+		self.latest = None
+		self.frame_id = 0
+		self.dropped = 0
+
+		self.condition = threading.Condition()
+
+	def publish(self, img):
+		"""
+		Copy a frame into a free slot and make it the latest.
+
+		Args:
+			img: Frame (any layout, the slot is contiguous)
+
+		Returns:
+			int: Frame id, or None if every slot was held and the frame was dropped
+		"""
+		with self.condition:
+			slot = self.free_slot()
+
+			if slot is None:
+				self.dropped += 1
+				return None
+
+			# Not the latest and not held, so no reader can take it while it is written
+			self.ids[slot] = 0
+
+		np.copyto(self.get_buffer(slot, img), img)
+
+		with self.condition:
+			self.frame_id += 1
+			self.ids[slot] = self.frame_id
+			self.latest = slot
+			self.condition.notify_all()
+
+			return self.frame_id
+
+	def get_buffer(self, slot, img):
+		# Slot buffer for a frame like img, allocated on first use or when the frame size changes
+		buffer = self.buffers[slot]
+		if buffer is None or buffer.shape != img.shape or buffer.dtype != img.dtype:
+			buffer = self.buffers[slot] = np.empty(img.shape, dtype=img.dtype)
+
+		return buffer
+
+	def free_slot(self):
+		# Oldest slot that is neither the latest frame nor being read
+		free = None
+
+		for slot in range(len(self.buffers)):
+			if slot == self.latest or self.holds[slot] > 0:
+				continue
+
+			if free is None or self.ids[slot] < self.ids[free]:
+				free = slot
+
+		return free
+
+	def acquire(self, last_id=0, timeout=None):
+		"""
+		Wait for a frame newer than last_id and hold it until release().
+
+		Args:
+			last_id: Id of the last frame this reader processed
+			timeout: Seconds to wait (None: forever)
+
+		Returns:
+			frame_id, img: The newest frame (read only), or None, None on timeout
+		"""
+		with self.condition:
+			if not self.condition.wait_for(lambda: self.latest is not None and self.ids[self.latest] > last_id, timeout):
+				return None, None
+
+			slot = self.latest
+			self.holds[slot] += 1
+
+			return self.ids[slot], self.buffers[slot]
+
+	def release(self, frame_id):
+		"""Give back a frame taken with acquire()."""
+		with self.condition:
+			for slot in range(len(self.buffers)):
+				if self.ids[slot] == frame_id and self.holds[slot] > 0:
+					self.holds[slot] -= 1
+					return
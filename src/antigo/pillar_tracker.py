@@ -0,0 +1,151 @@
+import math
+
+
+class PillarTrack():
+	"""
+	One pillar followed across frames: a constant velocity Kalman filter on the bottom
+	center of its box (where process_traffic_sign measures from), per image axis.
+	"""
+
+	def __init__(self, track_id, blob, now, noise):
+		area, (x, y, w, h), _ = blob
+
+		self.id = track_id
+		self.position = [x + w / 2, y + h]
+		self.velocity = [0.0, 0.0]
+		# Covariance per axis: position, position/velocity, velocity
+		self.covariance = [[noise * noise, 0.0, 1e6], [noise * noise, 0.0, 1e6]]
+		self.size = [w, h]
+
+		self.time = now
+		self.last_seen = now
+		self.hits = 1
+
+	def predict(self, now, acceleration):
+		dt = now - self.time
+		if dt <= 0:
+			return
+
+		# White noise acceleration
+		q = acceleration * acceleration
+		for axis in range(2):
+			p, pv, v = self.covariance[axis]
+			self.position[axis] += self.velocity[axis] * dt
+			self.covariance[axis] = [
+				p + 2 * dt * pv + dt * dt * v + q * dt ** 4 / 4,
+				pv + dt * v + q * dt ** 3 / 2,
+				v + q * dt * dt,
+			]
+
+		self.time = now
+
+	def update(self, blob, noise):
+		_, (x, y, w, h), _ = blob
+
+		for axis, measured in enumerate((x + w / 2, y + h)):
+			p, pv, v = self.covariance[axis]
+			s = p + noise * noise
+			gain_p, gain_v = p / s, pv / s
+			residual = measured - self.position[axis]
+
+			self.position[axis] += gain_p * residual
+			self.velocity[axis] += gain_v * residual
+			self.covariance[axis] = [(1 - gain_p) * p, (1 - gain_p) * pv, v - gain_v * pv]
+
+		# The box size only smooths the jitter, it barely moves between frames
+		self.size = [self.size[0] + 0.5 * (w - self.size[0]), self.size[1] + 0.5 * (h - self.size[1])]
+
+		self.last_seen = self.time
+		self.hits += 1
+
+	def distance(self, blob):
+		_, (x, y, w, h), _ = blob
+		return math.hypot(x + w / 2 - self.position[0], y + h - self.position[1])
+
+	def get_blob(self):
+		# Smoothed (area, (x, y, w, h), center) like Camera.find_blobs() gives
+		x, bottom = self.position
+		w, h = self.size
+		return (int(w * h), (int(x - w / 2), int(bottom - h), int(w), int(h)), (int(x), int(bottom - h / 2)))
+
+
+class PillarTracker():
+	"""
+	Follows the pillars of every colour across frames.
+
+	Detections are matched to the predicted tracks of their colour, nearest first within
+	a gate. Unmatched detections start tentative tracks, confirmed after a few hits;
+	tracks unseen for max_age seconds are dropped. Between detections (dropped frames
+	or detection every Nth frame) the tracks keep moving with their velocity.
+	"""
+
+	def __init__(self, gate=120, max_age=0.5, confirm=2, noise=6, acceleration=500):
+		"""
+		Args:
+			gate: Largest distance in crop pixels between a track and its detection
+			max_age: Seconds a track survives without detections
+			confirm: Detections before a track is reported
+			noise: Measurement noise in crop pixels
+			acceleration: Process noise in crop pixels / s^2
+		"""
+		self.gate = gate
+		self.max_age = max_age
+		self.confirm = confirm
+		self.noise = noise
+		self.acceleration = acceleration
+
+		self.tracks = {}
+		self.next_id = 1
+
+	def predict(self, now):
+		"""Move every track to time now and drop the stale ones."""
+		for color, tracks in self.tracks.items():
+			for track in tracks:
+				track.predict(now, self.acceleration)
+
+			self.tracks[color] = [track for track in tracks if now - track.last_seen <= self.max_age]
+
+	def update(self, blobs, now):
+		"""
+		Add the detections of a frame.
+
+		Args:
+			blobs: Colour name -> blobs, from Camera.find_blobs()
+			now: Frame time in seconds
+		"""
+		self.predict(now)
+
+		for color, color_blobs in blobs.items():
+			tracks = self.tracks.setdefault(color, [])
+
+			pairs = sorted(
+				(track.distance(blob), index, number)
+				for index, track in enumerate(tracks)
+				for number, blob in enumerate(color_blobs)
+			)
+
+			matched_tracks = set()
+			matched_blobs = set()
+			for distance, index, number in pairs:
+				if distance > self.gate:
+					break
+				if index in matched_tracks or number in matched_blobs:
+					continue
+
+				tracks[index].update(color_blobs[number], self.noise)
+				matched_tracks.add(index)
+				matched_blobs.add(number)
+
+			for number, blob in enumerate(color_blobs):
+				if number not in matched_blobs:
+					tracks.append(PillarTrack(self.next_id, blob, now, self.noise))
+					self.next_id += 1
+
+	def get_tracks(self, color):
+		"""Confirmed tracks of a colour, biggest first."""
+		tracks = [track for track in self.tracks.get(color, []) if track.hits >= self.confirm]
+		return sorted(tracks, key=lambda track: track.size[0] * track.size[1], reverse=True)
+
+	def get_blobs(self, color):
+		"""Smoothed blobs of the confirmed tracks of a colour, biggest first."""
+		return [track.get_blob() for track in self.get_tracks(color)]
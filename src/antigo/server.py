@@ -1,7 +1,7 @@
 import json
 import logging
 import sys
-from time import sleep
+from time import monotonic, sleep
 from flask import Flask, Response, request
 from flask_cors import CORS
 
@@ -17,12 +17,29 @@ cli = sys.modules['flask.cli']
 cli.show_server_banner = lambda *x: None
 
 def feed(color=None, visuals=None):
-	while True:
-		sleep(1/15)
+	source = color if color is not None else "visuals" if visuals is not None else "img"
 
-		frame = Camera.get_frame( Camera.colors[color]["mask"] if color is not None else Camera.visuals_img if visuals is not None else Camera.img)
-		yield (b'--frame\r\n'
-			b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
+	# Every client of a stream gets the same JPEG, encoded once per frame
+	Camera.stream.subscribe(source)
+
+	try:
+		frame_id = 0
+		sent = 0
+
+		while True:
+			# At most 15 frames per second per client
+			sleep(max(0, sent + 1/15 - monotonic()))
+
+			new_id, frame = Camera.stream.get(source, frame_id, timeout=1)
+			if frame is None:
+				continue
+
+			frame_id, sent = new_id, monotonic()
+			yield (b'--frame\r\n'
+				b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
+	finally:
+		# Client gone, stop encoding for it
+		Camera.stream.unsubscribe(source)
 
 
 @app.route('/video_feed')
@@ -0,0 +1,294 @@
+import atexit
+import os
+from multiprocessing import get_context, shared_memory
+
+import cv2
+import numpy as np
+
+from camera import Camera
+from config import Config
+from frame_exchange import FrameExchange
+
+# Fork: the workers inherit the shared memory and the config without importing main.py again
+context = get_context("fork")
+
+# area, x, y, w, h, center x, center y
+BLOB_FIELDS = 7
+
+# seen, x1, y1, x2, y2, angle for the left, right and top wall
+WALL_FIELDS = 6
+
+
+def shared_array(shape, dtype, blocks):
+	# Zeroed numpy array in a new shared memory block, the block is kept in blocks
+	size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+	block = shared_memory.SharedMemory(create=True, size=max(1, size))
+	blocks.append(block)
+
+	array = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+	array.fill(0)
+	return array
+
+
+def close_blocks(blocks):
+	for block in blocks:
+		block.close()
+		block.unlink()
+
+
+class SharedFrameRing(FrameExchange):
+	"""
+	FrameExchange with the slots and their bookkeeping in shared memory.
+
+	The capture thread publishes as before. Worker processes take() frames instead of
+	acquire(): every frame goes to one worker only, always the newest one no worker
+	has taken yet, so the workers share the frames instead of repeating them.
+	"""
+
+	def __init__(self, shape, slots=3):
+		self.blocks = []
+
+		frames = shared_array((slots,) + tuple(shape), np.uint8, self.blocks)
+		self.buffers = [frames[slot] for slot in range(slots)]
+
+		# latest slot + 1 (0: none), frame id, dropped, taken, then ids and holds per slot
+		self.state = shared_array((4 + 2 * slots,), np.int64, self.blocks)
+		self.ids = self.state[4:4 + slots]
+		self.holds = self.state[4 + slots:]
+
+		self.condition = context.Condition()
+
+	@property
+	def latest(self):
+		return int(self.state[0]) - 1 if self.state[0] > 0 else None
+
+	@latest.setter
+	def latest(self, slot):
+		self.state[0] = 0 if slot is None else slot + 1
+
+	@property
+	def frame_id(self):
+		return int(self.state[1])
+
+	@frame_id.setter
+	def frame_id(self, value):
+		self.state[1] = value
+
+	@property
+	def dropped(self):
+		return int(self.state[2])
+
+	@dropped.setter
+	def dropped(self, value):
+		self.state[2] = value
+
+	def get_buffer(self, slot, img):
+		if img.shape != self.buffers[slot].shape:
+			raise ValueError(f"Frame of {img.shape} does not fit the shared slots of {self.buffers[slot].shape}")
+
+		return self.buffers[slot]
+
+	def take(self, timeout=None):
+		"""
+		Wait for a frame no worker has taken yet and hold it until release().
+
+		Args:
+			timeout: Seconds to wait (None: forever)
+
+		Returns:
+			frame_id, img: The newest frame (read only), or None, None on timeout
+		"""
+		with self.condition:
+			if not self.condition.wait_for(lambda: self.latest is not None and self.ids[self.latest] > self.state[3], timeout):
+				return None, None
+
+			slot = self.latest
+			self.state[3] = self.ids[slot]
+			self.holds[slot] += 1
+
+			return int(self.ids[slot]), self.buffers[slot]
+
+	def close(self):
+		close_blocks(self.blocks)
+
+
+class SharedResults():
+	"""
+	Newest detection of the worker processes, and the colour thresholds they use.
+
+	A small struct of floats (frame id, processing view, thresholds, walls, blobs per
+	colour) plus the masks as one label image with a bit per colour, both in shared memory.
+	"""
+
+	def __init__(self, names, mask_shape, max_blobs=3):
+		self.names = list(names)[:8]
+		self.max_blobs = max_blobs
+		self.blocks = []
+
+		self.colors_at = 7
+		self.walls_at = self.colors_at + 6 * len(self.names)
+		self.blobs_at = self.walls_at + 3 * WALL_FIELDS
+		self.color_size = 1 + max_blobs * BLOB_FIELDS
+
+		self.values = shared_array((self.blobs_at + self.color_size * len(self.names),), np.float64, self.blocks)
+		self.labels = shared_array(mask_shape, np.uint8, self.blocks)
+
+		self.condition = context.Condition()
+
+	def set_colors(self, colors_config):
+		# Thresholds for the workers, e.g. after a change from the /hsv endpoint
+		thresholds = [value for name in self.names for value in list(colors_config[name]["lower"]) + list(colors_config[name]["upper"])]
+
+		with self.condition:
+			self.values[self.colors_at:self.walls_at] = thresholds
+
+	def get_colors(self):
+		with self.condition:
+			thresholds = [int(value) for value in self.values[self.colors_at:self.walls_at]]
+
+		return {
+			name: {"lower": thresholds[index * 6:index * 6 + 3], "upper": thresholds[index * 6 + 3:index * 6 + 6]}
+			for index, name in enumerate(self.names)
+		}
+
+	def write(self, frame_id, masks, blobs, view, walls=None):
+		"""
+		Publish the detection of a frame, unless a newer frame was published already.
+
+		Args:
+			frame_id: Id of the frame the detection is for
+			masks, blobs, walls: From Camera.detect()
+			view: From Camera.prepare()
+
+		Returns:
+			bool: True if published
+		"""
+		labels = np.zeros(self.labels.shape, dtype=np.uint8)
+		for bit, name in enumerate(self.names):
+			if masks.get(name) is not None:
+				labels |= masks[name] & (1 << bit)
+
+		with self.condition:
+			# Workers can finish out of order
+			if frame_id <= self.values[0]:
+				return False
+
+			self.values[0] = frame_id
+			self.values[1:7] = view
+
+			self.values[self.walls_at] = walls is not None
+			for index, wall in enumerate(walls or ()):
+				start = self.walls_at + 1 + index * WALL_FIELDS
+				self.values[start] = wall is not None
+				if wall is not None:
+					self.values[start + 1:start + WALL_FIELDS] = wall
+
+			for index, name in enumerate(self.names):
+				at = self.blobs_at + index * self.color_size
+				color_blobs = blobs.get(name, [])[:self.max_blobs]
+
+				self.values[at] = len(color_blobs)
+				for number, (area, (x, y, w, h), (center_x, center_y)) in enumerate(color_blobs):
+					start = at + 1 + number * BLOB_FIELDS
+					self.values[start:start + BLOB_FIELDS] = (area, x, y, w, h, center_x, center_y)
+
+			np.copyto(self.labels, labels)
+			self.condition.notify_all()
+
+		return True
+
+	def read(self, last_id=0, timeout=None):
+		"""
+		Wait for a detection newer than last_id.
+
+		Args:
+			last_id: Frame id of the last detection read
+			timeout: Seconds to wait (None: forever)
+
+		Returns:
+			frame_id, masks, blobs, view, walls: As given to write(), or None on timeout
+		"""
+		with self.condition:
+			if not self.condition.wait_for(lambda: self.values[0] > last_id, timeout):
+				return None, None, None, None, None
+
+			values = self.values.copy()
+			labels = self.labels.copy()
+
+		view = (int(values[1]), int(values[2]), values[3], values[4], int(values[5]), int(values[6]))
+
+		masks = {}
+		blobs = {}
+		for bit, name in enumerate(self.names):
+			masks[name] = np.where(labels & (1 << bit), 255, 0).astype(np.uint8)
+
+			at = self.blobs_at + bit * self.color_size
+			blobs[name] = []
+			for number in range(int(values[at])):
+				area, x, y, w, h, center_x, center_y = (int(value) for value in values[at + 1 + number * BLOB_FIELDS:at + 1 + (number + 1) * BLOB_FIELDS])
+				blobs[name].append((area, (x, y, w, h), (center_x, center_y)))
+
+		walls = None
+		if values[self.walls_at]:
+			walls = []
+			for index in range(3):
+				start = self.walls_at + 1 + index * WALL_FIELDS
+				x1, y1, x2, y2, angle = values[start + 1:start + WALL_FIELDS]
+				walls.append((int(x1), int(y1), int(x2), int(y2), float(angle)) if values[start] else None)
+
+		return int(values[0]), masks, blobs, view, walls
+
+	def close(self):
+		close_blocks(self.blocks)
+
+
+def worker(frames, results, parent):
+	# Detection loop of a worker process, ends with the main process
+	cv2.setNumThreads(1)
+
+	while os.getppid() == parent:
+		frame_id, img = frames.take(timeout=1)
+		if frame_id is None:
+			continue
+
+		try:
+			pixels, view = Camera.prepare(img)
+		finally:
+			frames.release(frame_id)
+
+		masks, blobs, walls = Camera.detect(pixels, view, results.get_colors(), results.names)
+		results.write(frame_id, masks, blobs, view, walls)
+
+
+def start_workers(count, names):
+	"""
+	Start the detection worker processes.
+
+	Call before starting the camera or any thread, the workers are forked.
+
+	Args:
+		count: Number of worker processes
+		names: Colours to detect
+
+	Returns:
+		frames: SharedFrameRing to publish the crops into
+		results: SharedResults to read the detections from
+	"""
+	processing = Config.config["camera"].get("processing", {})
+
+	# Computed without OpenCV, so no OpenCV thread exists before the fork
+	frame_shape = Camera.get_frame_shape()
+	mask_shape = Camera.get_processing_shape(frame_shape)
+
+	# Every worker can hold a slot while one is written and one is the latest
+	frames = SharedFrameRing(frame_shape, count + 2)
+	results = SharedResults(names, mask_shape, processing.get("blobs", 3))
+	results.set_colors(Config.config["camera"]["colors"])
+
+	for _ in range(count):
+		context.Process(target=worker, args=(frames, results, os.getpid()), daemon=True).start()
+
+	atexit.register(frames.close)
+	atexit.register(results.close)
+
+	return frames, results